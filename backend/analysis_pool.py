@@ -0,0 +1,179 @@
+"""
+Multi-process email analysis pipeline for nightly scans.
+Fetch threads (I/O) push raw Gmail messages into a bounded queue; the
+pipeline groups them into chunks and runs analyze_gmail_message in a
+process pool (CPU), so fetching and regex work overlap across all cores.
+
+Daemonic processes can't have children, and Celery's prefork children are
+daemonic: there the pipeline analyzes in-process (fetches still overlap,
+on one core per mailbox). The nightly scan fans out one task per user, so
+a prefork worker's children still keep every core busy across mailboxes; a
+worker started with `--pool=solo` or `--pool=threads` also spreads a single
+big mailbox over the process pool (see tasks.py).
+"""
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from email_scanner import analyze_gmail_message
+from logging_config import log_warning
+from parse_cache import content_hash
+
+# (message_id, analysis result, content hash) - the shape ParsedEmailCache.set_many takes
+AnalyzedMessage = Tuple[str, Dict, str]
+
+_DONE = object()
+
+
+def analyze_chunk(messages: List[Dict]) -> List[AnalyzedMessage]:
+    """Runs inside a pool process"""
+    return [(m['id'], analyze_gmail_message(m), content_hash(m)) for m in messages]
+
+
+class AnalysisPipeline:
+    """Bounded fetch queue -> chunked process-pool analysis"""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        chunk_size: int = 25,
+        queue_size: int = 500,
+        fetch_threads: int = 8,
+        in_process: Optional[bool] = None
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.queue_size = queue_size
+        self.fetch_threads = fetch_threads
+        # None: decide per run (a daemonic process can't start the pool)
+        self._in_process = in_process
+        # Enough chunks queued to keep every process busy, no more
+        self.max_in_flight = self.workers * 2
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def in_process(self) -> bool:
+        if self._in_process is not None:
+            return self._in_process
+        return multiprocessing.current_process().daemon
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        # Spawned once and reused across users/tasks; process startup is the expensive part
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def run(self, message_ids: Iterable[str], fetch: Callable[[str], Dict]) -> Iterator[AnalyzedMessage]:
+        """
+        Fetch every message with `fetch` (called from several threads, so it must
+        be thread-safe) and yield analysis results as chunks complete.
+        """
+        fetched: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        errors: List[BaseException] = []
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce, args=(list(message_ids), fetch, fetched, errors, stop), daemon=True
+        )
+        producer.start()
+
+        in_process = self.in_process
+        if in_process and self._in_process is None:
+            log_warning("Analysis pool unavailable in a daemonic process - analyzing in-process")
+
+        def submit(chunk: List[Dict]) -> Future:
+            if not in_process:
+                return self.pool.submit(analyze_chunk, chunk)
+            # Fetch threads keep filling the queue while this thread analyzes
+            future: Future = Future()
+            future.set_result(analyze_chunk(chunk))
+            return future
+
+        in_flight: Set[Future] = set()
+        chunk: List[Dict] = []
+
+        def drain(block_until_below: int) -> Iterator[AnalyzedMessage]:
+            nonlocal in_flight
+            while len(in_flight) > block_until_below:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+
+        try:
+            while True:
+                item = fetched.get()
+                if item is _DONE:
+                    break
+                chunk.append(item)
+                if len(chunk) >= self.chunk_size:
+                    in_flight.add(submit(chunk))
+                    chunk = []
+                    # Backpressure: don't outrun the pool
+                    yield from drain(self.max_in_flight - 1)
+
+            if chunk:
+                in_flight.add(submit(chunk))
+            yield from drain(0)
+        finally:
+            # Abandoned part-way (a chunk raised, or the caller stopped iterating):
+            # stop the fetchers and empty the queue so none stays blocked on put()
+            stop.set()
+            for future in in_flight:
+                future.cancel()
+            while producer.is_alive():
+                try:
+                    fetched.get(timeout=0.05)
+                except queue.Empty:
+                    pass
+            producer.join()
+
+        if errors:
+            raise errors[0]
+
+    def _produce(
+        self,
+        message_ids: List[str],
+        fetch: Callable[[str], Dict],
+        out: "queue.Queue",
+        errors: List,
+        stop: threading.Event
+    ) -> None:
+        pending: "queue.SimpleQueue" = queue.SimpleQueue()
+        for message_id in message_ids:
+            pending.put(message_id)
+
+        def fetcher():
+            # Each thread holds at most one message outside the bounded queue
+            while not errors and not stop.is_set():
+                try:
+                    message_id = pending.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    out.put(fetch(message_id))
+                except BaseException as e:
+                    errors.append(e)
+
+        try:
+            threads = [threading.Thread(target=fetcher, daemon=True) for _ in range(self.fetch_threads)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            out.put(_DONE)
+
+
+# Global instance, sized from ANALYSIS_WORKERS (default: all cores)
+analysis_pipeline = AnalysisPipeline(workers=int(os.getenv('ANALYSIS_WORKERS', '0')) or None)
@@ -0,0 +1,96 @@
+"""
+Benchmark: does AnalysisPipeline overlap fetching with analysis?
+Every row uses the same fetch concurrency (--fetch-threads), so the only
+difference is overlap:
+stages:     fetch everything, then analyze everything (no overlap)
+pipeline:   fetches feed the process pool as they land
+in-process: the daemonic-worker fallback; fetch threads overlap with
+            analysis on the consuming thread, one core
+msg/s/core: pipeline throughput divided by the analysis processes used
+Fetches are simulated with a fixed latency; analysis is the real
+analyze_gmail_message on synthetic HTML receipts.
+Run from backend/:  python -m benchmarks.bench_analysis_pipeline [messages] [fetch_ms] [fetch_threads]
+"""
+import base64
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from analysis_pool import AnalysisPipeline
+
+VENDORS = ["Netflix", "Spotify", "Adobe", "Dropbox", "Canva", "Unknown Co"]
+
+
+def make_message(i: int) -> dict:
+    vendor = VENDORS[i % len(VENDORS)]
+    filler = "<tr><td>Recommended for you: something you might like to watch next.</td></tr>" * 200
+    html = (
+        f"<html><head><style>td{{color:red}}</style></head><body><table>{filler}</table>"
+        f"<p>Thanks for your {vendor} payment. Total: ${5 + i % 20}.99</p>"
+        f"<p>Your free trial ends in {i % 7 + 1} days. Next bill date: January {i % 28 + 1}, 2026</p>"
+        f"<a href='https://{vendor.lower()}.com/account/cancel'>Manage</a></body></html>"
+    )
+    data = base64.urlsafe_b64encode(html.encode()).decode().rstrip("=")
+    return {
+        "id": f"msg-{i}",
+        "payload": {
+            "mimeType": "multipart/alternative",
+            "headers": [
+                {"name": "Subject", "value": f"Your {vendor} receipt"},
+                {"name": "From", "value": f"{vendor} <billing@{vendor.lower()}.com>"},
+                {"name": "Date", "value": "Sat, 20 Dec 2025 10:00:00 +0000"},
+            ],
+            "parts": [{"mimeType": "text/html", "body": {"data": data}}],
+        },
+    }
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    fetch_latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 5.0) / 1000
+    fetch_threads = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    messages = {f"msg-{i}": make_message(i) for i in range(n)}
+    ids = list(messages)
+
+    def fetch(message_id):
+        time.sleep(fetch_latency)
+        return messages[message_id]
+
+    def run(pipeline, fetcher):
+        assert sum(1 for _ in pipeline.run(ids, fetcher)) == n
+
+    print(f"{n:,} messages, {fetch_latency * 1000:.0f} ms simulated fetch, "
+          f"{fetch_threads} fetch threads, {os.cpu_count()} cores\n")
+    print(f"{'':<16} {'fetch':>9} {'analyze':>9} {'stages':>9} {'pipeline':>9} {'overlap saved':>14} {'msg/s/core':>11}")
+
+    with ThreadPoolExecutor(max_workers=fetch_threads) as fetchers:
+        fetch_only = timed(lambda: list(fetchers.map(fetch, ids)))
+
+    configs = [("in-process", AnalysisPipeline(fetch_threads=fetch_threads, in_process=True))]
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        configs.append((f"{workers} proc", AnalysisPipeline(workers=workers, fetch_threads=fetch_threads, in_process=False)))
+        workers *= 2
+
+    for label, pipeline in configs:
+        # Warm the pool so process startup isn't timed
+        list(pipeline.run(ids[:pipeline.workers], messages.__getitem__))
+        analyze_only = timed(lambda: run(pipeline, messages.__getitem__))
+        overlapped = timed(lambda: run(pipeline, fetch))
+        pipeline.shutdown()
+
+        stages = fetch_only + analyze_only
+        cores = 1 if pipeline.in_process else pipeline.workers
+        print(f"{label:<16} {fetch_only * 1000:7.0f}ms {analyze_only * 1000:7.0f}ms {stages * 1000:7.0f}ms "
+              f"{overlapped * 1000:7.0f}ms {1 - overlapped / stages:13.0%} {n / overlapped / cores:11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
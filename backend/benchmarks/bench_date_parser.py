@@ -0,0 +1,57 @@
+"""
+Benchmark: renewal-date parsing vs dateutil.
+Run from backend/:  python -m benchmarks.bench_date_parser
+"""
+import random
+import time
+from datetime import date, datetime
+
+from email_scanner import parse_renewal_date, _split_renewal_date
+
+N = 100_000
+REFERENCE = date(2025, 12, 20)
+MONTH_FORMATS = ["%b %d, %Y", "%B %d, %Y", "%B %d %Y", "%b %d", "%B %d"]
+
+
+def make_inputs(n: int, pool_size: int) -> list:
+    rng = random.Random(42)
+    pool = []
+    for _ in range(pool_size):
+        d = date.fromordinal(date(2025, 1, 1).toordinal() + rng.randrange(730))
+        pool.append(d.strftime(rng.choice(MONTH_FORMATS)))
+    return [rng.choice(pool) for _ in range(n)]
+
+
+def run(label: str, fn, inputs: list) -> float:
+    start = time.perf_counter()
+    for s in inputs:
+        fn(s)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed * 1000:8.1f} ms  {len(inputs) / elapsed:12,.0f} strings/s")
+    return elapsed
+
+
+def main():
+    try:
+        from dateutil import parser as dateutil_parser
+    except ImportError:
+        dateutil_parser = None
+
+    default = datetime(REFERENCE.year, REFERENCE.month, REFERENCE.day)
+
+    for pool_size in (N, 500):
+        inputs = make_inputs(N, pool_size)
+        print(f"\n{N:,} strings, {len(set(inputs)):,} distinct")
+
+        _split_renewal_date.cache_clear()
+        run("parse_renewal_date (cold LRU)", lambda s: parse_renewal_date(s, REFERENCE), inputs)
+        run("parse_renewal_date (warm LRU)", lambda s: parse_renewal_date(s, REFERENCE), inputs)
+
+        if dateutil_parser:
+            run("dateutil.parser.parse", lambda s: dateutil_parser.parse(s, default=default), inputs)
+        else:
+            print("dateutil not installed - skipping comparison")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Idempotency keys: duplicate create-virtual-card requests from a retry storm.
+no key:    every duplicate reaches Lithic and issues a card (the old behaviour)
+same key:  one execution; the others wait for it and replay it, each
+           replay reading the card back from Lithic (no CVV is stored)
+Also two stores on one Redis (two API processes) racing on the same key,
+and the cost of a replayed response.
+Run from backend/:  python -m benchmarks.bench_idempotency [--duplicates 20] [--lithic-ms 200]
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.load_scenarios import install_fakes
+from cache import CacheService
+from idempotency import IdempotencyStore
+
+CARD = {"subscription_name": "Netflix", "merchant_name": "NETFLIX.COM", "spending_limit": 15.49, "user_id": "user-1"}
+
+
+async def storm(app, duplicates: int, key=None):
+    headers = {"Idempotency-Key": key} if key else {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post("/api/v1/cards/create-virtual", json=CARD, headers=headers) for _ in range(duplicates)
+        ])
+        elapsed = time.perf_counter() - start
+    cards = {r.json()["card_id"] for r in responses if r.status_code == 200}
+    replayed = sum(r.headers.get("idempotent-replayed") == "true" for r in responses)
+    return elapsed, cards, replayed, [r.status_code for r in responses]
+
+
+async def two_processes(redis_client, duplicates: int, work_seconds: float):
+    shared = CacheService()
+    shared.client, shared.enabled = redis_client, True
+    stores = [IdempotencyStore(cache_service=shared), IdempotencyStore(cache_service=shared)]
+    executions = []
+
+    async def handler():
+        executions.append(1)
+        await asyncio.sleep(work_seconds)
+        return {"card_id": f"card_{len(executions)}"}
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        stores[i % 2].run("bench", "key-2", CARD, handler) for i in range(duplicates)
+    ])
+    return time.perf_counter() - start, len(executions), {r["card_id"] for r in results}
+
+
+async def replay_cost(store: IdempotencyStore, requests: int):
+    async def handler():
+        return CARD
+
+    await store.run("bench", "key-3", CARD, handler)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await store.run("bench", "key-3", CARD, handler)
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--duplicates", type=int, default=20)
+    parser.add_argument("--lithic-ms", type=float, default=200)
+    args = parser.parse_args()
+
+    app, _ = install_fakes(args.lithic_ms / 1000)
+    import main as api
+    # Only Lithic is slow here
+    api.cache.client.latency = 0.0
+    api.db.client.latency = 0.0
+
+    print(f"{args.duplicates} concurrent duplicates, {args.lithic_ms:.0f} ms Lithic card creation\n")
+    for label, key in (("no key", None), ("same key", "key-1")):
+        issued_before = len(api.clients.lithic.issued)
+        elapsed, cards, replayed, statuses = asyncio.run(storm(app, args.duplicates, key))
+        issued = len(api.clients.lithic.issued) - issued_before
+        print(f"{label:<10} {elapsed * 1000:7.0f} ms  lithic cards issued {issued:>3}  distinct in responses {len(cards):>3}  "
+              f"replayed {replayed:>3}  statuses {sorted(set(statuses))}")
+
+    elapsed, executions, cards = asyncio.run(two_processes(api.cache.client, args.duplicates, args.lithic_ms / 1000))
+    print(f"{'2 stores':<10} {elapsed * 1000:7.0f} ms  executions {executions}  distinct results {len(cards)}")
+
+    local = CacheService()
+    local.enabled = False
+    redis = CacheService()
+    redis.client, redis.enabled = api.cache.client, True
+    for label, cache_service in (("in-memory", local), ("redis", redis)):
+        per_replay = asyncio.run(replay_cost(IdempotencyStore(cache_service=cache_service), 20000))
+        print(f"replay ({label}) {per_replay * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Streaming leak detector: event ingest throughput and /global-scan read cost.
+Replays a synthetic Lithic stream (purchases, $0 verification auths that convert
+to paid plans, holds that never settle) through per-card windows.
+Run from backend/:  python -m benchmarks.bench_leaks [--events 200000] [--cards 5000]
+"""
+import argparse
+import random
+import time
+
+from benchmarks.fakes import FakeRedis
+from cache import CacheService
+from leak_detector import LeakDetector, PENDING, SETTLED, VOIDED
+
+MERCHANTS = ["UBER TRIP", "SHOPRITE LEKKI", "STARBUCKS #1234", "SHELL OIL 5732 TX", "CHIPOTLE 2291"]
+TRIALS = ["NETFLIX.COM 866-579-7172 CA", "PARAMOUNT+ 888-274-5343", "HEADSPCE", "SQ *GYM LAGOS", "DRAFTKINGS 617-986-6744"]
+
+
+def synthetic_stream(n: int, cards: int, start: int, rng: random.Random):
+    """(user, event) pairs in time order over ~40 days"""
+    events = []
+    for i in range(n):
+        card = rng.randrange(cards)
+        ts = start + rng.randrange(40 * 86400)
+        roll = rng.random()
+        if roll < 0.03:
+            # Trial signup: $0 auth, reversed; half convert to a paid charge ~7 days later
+            merchant = rng.choice(TRIALS)
+            events.append((ts, card, f"t{i}a", 0, PENDING, merchant))
+            events.append((ts + 60, card, f"t{i}a", 0, VOIDED, merchant))
+            if rng.random() < 0.5:
+                events.append((ts + 7 * 86400, card, f"t{i}b", rng.choice([999, 1499, 2999]), SETTLED, merchant))
+        elif roll < 0.05:
+            # Hold that never settles
+            events.append((ts, card, f"h{i}", rng.randrange(2000, 20000), PENDING, rng.choice(MERCHANTS + TRIALS)))
+        else:
+            cents = rng.randrange(300, 8000)
+            merchant = rng.choice(MERCHANTS)
+            events.append((ts, card, f"p{i}", cents, PENDING, merchant))
+            events.append((ts + 86400, card, f"p{i}", cents, SETTLED, merchant))
+    events.sort()
+    return [
+        (f"user-{card % (cards // 2 or 1)}", {
+            "card_id": f"card_{card:06d}", "transaction_id": tx, "cents": cents,
+            "merchant": merchant, "status": status, "timestamp": ts,
+        })
+        for ts, card, tx, cents, status, merchant in events
+    ]
+
+
+def run(detector: LeakDetector, stream, users, label: str):
+    start = time.perf_counter()
+    for user_id, event in stream:
+        detector.ingest(user_id, event, now=event["timestamp"])
+    ingest = time.perf_counter() - start
+
+    end = stream[-1][1]["timestamp"] + 4 * 86400
+    start = time.perf_counter()
+    due = detector.rescore_due_holds(now=end)
+    sweep = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = [detector.leaks(user) for user in users]
+    read = time.perf_counter() - start
+
+    leaks = [leak for user_leaks in found for leak in user_leaks]
+    by_type = {}
+    for leak in leaks:
+        by_type[(leak["type"], leak["risk"])] = by_type.get((leak["type"], leak["risk"]), 0) + 1
+    print(f"[{label}] {len(stream):,} events  ingest {len(stream) / ingest:10,.0f} events/s  "
+          f"hold sweep {due:,} cards in {sweep * 1000:.0f} ms  "
+          f"/global-scan read {read / len(users) * 1e6:6.1f} us/user")
+    print("   " + ", ".join(f"{kind}/{risk}: {count:,}" for (kind, risk), count in sorted(by_type.items())))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--cards", type=int, default=5000)
+    args = parser.parse_args()
+
+    stream = synthetic_stream(args.events, args.cards, 1_790_000_000, random.Random(5))
+    users = sorted({user for user, _ in stream})
+
+    local = CacheService()
+    local.enabled = False
+    run(LeakDetector(cache_service=local), stream, users, "in-memory")
+
+    redis = CacheService()
+    redis.client, redis.enabled = FakeRedis(), True
+    run(LeakDetector(cache_service=redis), stream, users, "redis (fake)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Merchant-descriptor resolution throughput and hit rate.
+Cold: every descriptor distinct (memo misses, full noise-strip + index lookup).
+Stream: a transaction feed where descriptors repeat, as they do across users.
+Run from backend/:  python -m benchmarks.bench_merchants [--descriptors 1000000] [--distinct 20000]
+"""
+import argparse
+import random
+import time
+
+from merchants import MerchantIndex
+from signatures import SUBSCRIPTION_SIGNATURES
+
+TEMPLATES = [
+    ("NETFLIX.COM {phone} CA", "Netflix"), ("NETFLX {ref}", "Netflix"), ("SPOTIFY {ref}", "Spotify"),
+    ("PAYPAL *SPOTIFYUSA {ref}", "Spotify"), ("SQUARESPAC*{ref}", "Squarespace"), ("DROPBOX*{ref}", "Dropbox"),
+    ("AMZN PRIME VIDEO*{ref}", "Amazon Prime Video"), ("ADOBE *CREATIVE CLD {phone}", "Adobe Creative Cloud"),
+    ("HEADSPCE {ref} CA", "Headspace"), ("ZOOM.US {phone} CA", "Zoom"), ("DISNEYPLUS {phone}", "Disney+"),
+    ("OPENAI *CHATGPT SUBSCR {ref}", "ChatGPT Plus"), ("MICROSOFT*365 {ref}", "Microsoft 365"),
+    ("UBER TRIP {ref}", None), ("SHOPRITE LEKKI {ref}", None), ("STARBUCKS {store}", None),
+    ("SQ *GYM LAGOS {ref}", None), ("SHELL OIL {store} TX", None), ("CHIPOTLE {store}", None),
+]
+
+
+def descriptor(rng: random.Random):
+    template, vendor = rng.choice(TEMPLATES)
+    return template.format(
+        phone=f"{rng.randrange(800, 900)}-{rng.randrange(100, 999)}-{rng.randrange(1000, 9999)}",
+        ref=''.join(rng.choice("ABCDEFGHJKLMNPQRSTUVWXYZ0123456789") for _ in range(6)),
+        store=f"#{rng.randrange(10000)}",
+    ), vendor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--descriptors", type=int, default=1000000)
+    parser.add_argument("--distinct", type=int, default=20000)
+    args = parser.parse_args()
+    rng = random.Random(11)
+
+    labelled = [descriptor(rng) for _ in range(args.distinct)]
+    index = MerchantIndex(SUBSCRIPTION_SIGNATURES)
+    start = time.perf_counter()
+    resolved = [index.lookup(d) for d, _ in labelled]
+    cold = time.perf_counter() - start
+    correct = sum(r == v for r, (_, v) in zip(resolved, labelled))
+
+    stream = [labelled[rng.randrange(len(labelled))][0] for _ in range(args.descriptors)]
+    index = MerchantIndex(SUBSCRIPTION_SIGNATURES)
+    start = time.perf_counter()
+    for d in stream:
+        index.lookup(d)
+    warm = time.perf_counter() - start
+
+    print(f"accuracy {correct / len(labelled):.1%} on {len(labelled):,} labelled descriptors")
+    print(f"cold   (all distinct)            {len(labelled) / cold:12,.0f} descriptors/s")
+    print(f"stream ({args.distinct:,} distinct in {len(stream):,})  {len(stream) / warm:12,.0f} descriptors/s")
+
+
+if __name__ == "__main__":
+    main()
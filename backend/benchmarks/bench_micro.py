@@ -0,0 +1,72 @@
+"""
+Micro-benchmarks for the hot pure-Python paths.
+Run from backend/:  python -m benchmarks.bench_micro
+"""
+import random
+
+from benchmarks.harness import BenchmarkSession
+from email_scanner import EnhancedEmailScanner
+from notification_service import NotificationService
+from signatures import SUBSCRIPTION_SIGNATURES, detect_subscription_metadata, evaluate_tips, get_optimization_tip, normalize_currency
+
+RECEIPT = (
+    "Thanks for your payment. Total: $15.49 charged to Visa ending 4242. "
+    "Your free trial ends in 3 days. Next bill date: January 5, 2026. "
+    "Manage your subscription at https://www.example.com/account/cancel"
+)
+
+
+def sample_subscriptions(n: int) -> list:
+    rng = random.Random(7)
+    vendors = list(SUBSCRIPTION_SIGNATURES)
+    return [
+        {
+            "id": f"sub-{i}",
+            "name": rng.choice(vendors),
+            "price": round(rng.uniform(1, 60), 2),
+            "currency": "$",
+            "is_trial": rng.random() < 0.2,
+            "days_remaining": rng.randrange(0, 31),
+            "usage_level": rng.random(),
+            "price_increased": rng.random() < 0.05,
+            "old_price": 9.99,
+            "last_viewed_days_ago": rng.randrange(0, 120),
+        }
+        for i in range(n)
+    ]
+
+
+def register(session: BenchmarkSession):
+    scanner = EnhancedEmailScanner
+    notifications = NotificationService()
+    subs_100 = sample_subscriptions(100)
+
+    session.benchmark("detect_subscription_metadata[hit-first]", detect_subscription_metadata, "Netflix Premium")
+    session.benchmark("detect_subscription_metadata[hit-last]", detect_subscription_metadata, "Squarespace")
+    session.benchmark("detect_subscription_metadata[miss]", detect_subscription_metadata, "Unknown Vendor LLC")
+
+    session.benchmark("scanner.extract_price", scanner.extract_price, RECEIPT)
+    session.benchmark("scanner.detect_trial", scanner.detect_trial, "Your trial", RECEIPT)
+    session.benchmark("scanner.extract_renewal_date", scanner.extract_renewal_date, "Receipt", RECEIPT)
+    session.benchmark("scanner.extract_cancellation_link", scanner.extract_cancellation_link, "Example", RECEIPT)
+    session.benchmark("scanner.categorize_email_type", scanner.categorize_email_type, "Receipt", RECEIPT)
+
+    session.benchmark("normalize_currency[NGN->USD]", normalize_currency, 2900.0, "NGN")
+    session.benchmark("normalize_currency[same]", normalize_currency, 20.0, "USD")
+
+    session.benchmark("get_optimization_tip[vendor]", get_optimization_tip, "Netflix", 15.49)
+    session.benchmark("get_optimization_tip[unknown]", get_optimization_tip, "Iron Gym Lagos", 20.0)
+    portfolio = [(sub["name"], sub["price"]) for sub in subs_100]
+    session.benchmark("evaluate_tips[100]", evaluate_tips, portfolio)
+
+    session.benchmark("generate_all_notifications[100]", notifications.generate_all_notifications, subs_100)
+
+
+def main():
+    session = BenchmarkSession()
+    register(session)
+    session.save()
+
+
+if __name__ == "__main__":
+    main()
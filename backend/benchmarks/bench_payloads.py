@@ -0,0 +1,89 @@
+"""
+Dashboard payload: bytes on the wire and server CPU per /scan request, full
+vs. sparse fieldset (?fields=), uncompressed vs. gzip (and brotli when the
+module is installed).
+Drives the real router behind CompressionMiddleware over raw ASGI.
+Run from backend/:  python -m benchmarks.bench_payloads [--subs 200] [--fields name,price,renewal_date]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from fastapi import FastAPI
+
+import compression
+import main as api
+from benchmarks.bench_responses import portfolio
+from compression import CompressionMiddleware
+
+
+async def asgi_get(app, path: str, query: str, encoding: str) -> bytes:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "headers": [(b"accept-encoding", encoding.encode())], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    body = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(body)
+
+
+async def measure(app, query: str, encoding: str, requests: int):
+    for _ in range(5):
+        size = len(await asgi_get(app, "/scan", query, encoding))
+    # Best of 5 batches, this thread only: the log writer thread and GC pauses are noise here
+    best = float("inf")
+    for _ in range(5):
+        start = time.thread_time()
+        for _ in range(requests // 5):
+            await asgi_get(app, "/scan", query, encoding)
+        best = min(best, (time.thread_time() - start) / (requests // 5))
+    return size, best
+
+
+async def run(subs: int, fields: str, requests: int):
+    # Distinct names, prices and usage so the payload compresses like real data
+    rng = random.Random(7)
+    raw_subs, history = portfolio(subs)
+    api.DEMO_SUBSCRIPTIONS = [
+        {**item, "name": f"{item['name']} {rng.randrange(10 ** 6):06d}",
+         "price": round(item["price"] * rng.uniform(0.5, 2), 2), "usage": round(rng.random(), 3),
+         "days": rng.randrange(1, 31)}
+        for item in raw_subs
+    ]
+    api.DEMO_KILL_HISTORY = history
+    app = FastAPI(default_response_class=api.FastJSONResponse)
+    app.include_router(api.router)
+    app.add_middleware(CompressionMiddleware)
+
+    encodings = ["identity", "gzip"] + (["br"] if compression.brotli is not None else [])
+    baseline = None
+    print(f"{subs} subscriptions, {requests} requests each")
+    print(f"{'payload':<10} {'encoding':<9} {'bytes':>10} {'cpu/request':>12} {'vs full':>8}")
+    for label, query in (("full", ""), ("sparse", f"fields={fields}")):
+        for encoding in encodings:
+            size, cpu = await measure(app, query, encoding, requests)
+            baseline = baseline or size
+            print(f"{label:<10} {encoding:<9} {size:>10,} {cpu * 1000:>9.2f} ms {size / baseline:>7.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subs", type=int, default=200)
+    parser.add_argument("--fields", default="name,price,renewal_date")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.subs, args.fields, args.requests))
+
+
+if __name__ == "__main__":
+    main()
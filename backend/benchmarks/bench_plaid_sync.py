@@ -0,0 +1,88 @@
+"""
+Plaid /transactions/sync ingestion: initial history pull vs incremental refresh.
+A refresh should cost O(changes since the cursor), not O(history).
+Run from backend/:  python -m benchmarks.bench_plaid_sync [--history 20000] [--changes 50]
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, timedelta
+
+from benchmarks.fakes import FakePlaid, FakeSupabase
+from database import db
+from plaid_sync import PlaidTransactionSync
+
+MERCHANTS = ["NETFLIX.COM", "SPOTIFY USA", "UBER TRIP", "SHOPRITE LEKKI", "ADOBE CREATIVE", "STARBUCKS 1234"]
+
+
+def seed_history(plaid: FakePlaid, item_id: str, n: int, rng: random.Random, prefix: str = "tx"):
+    start = date(2025, 9, 1)
+    for i in range(n):
+        plaid.add(item_id, plaid.transaction(
+            item_id, f"{prefix}-{i}", round(rng.uniform(2, 120), 2), rng.choice(MERCHANTS),
+            (start + timedelta(days=i * 400 // max(n, 1))).isoformat(),
+        ))
+
+
+async def timed_sync(sync: PlaidTransactionSync, item_id: str):
+    item = await db.get_plaid_item(item_id)
+    start = time.perf_counter()
+    stats = await sync.sync_item(item)
+    return stats, time.perf_counter() - start
+
+
+async def run(history: int, changes: int):
+    rng = random.Random(7)
+    plaid = FakePlaid()
+    db.client, db.enabled = FakeSupabase(), True
+    sync = PlaidTransactionSync(plaid_client=plaid)
+
+    linked = await sync.link_item("user-1", "public-sandbox-token", "First Platypus Bank")
+    item_id = linked["item_id"]
+    seed_history(plaid, item_id, history, rng)
+
+    calls = plaid.calls
+    stats, elapsed = await timed_sync(sync, item_id)
+    print(f"initial sync      {elapsed * 1000:9.1f} ms  {plaid.calls - calls:4d} API pages  "
+          f"{stats['added'] + stats['modified']:7,d} upserts  {stats['removed']:5,d} deletes")
+
+    # A day of bank activity: new charges, pending->posted updates, reversals
+    for i in range(changes):
+        plaid.add(item_id, plaid.transaction(item_id, f"tx-new-{i}", 9.99, rng.choice(MERCHANTS), "2026-10-18"))
+    for i in range(changes // 5):
+        plaid.modify(item_id, plaid.transaction(item_id, f"tx-{history - 1 - i}", 10.49, "NETFLIX.COM", "2026-10-17"))
+    for i in range(changes // 10):
+        plaid.remove(item_id, f"tx-{i}")
+
+    calls = plaid.calls
+    stats, elapsed = await timed_sync(sync, item_id)
+    print(f"incremental sync  {elapsed * 1000:9.1f} ms  {plaid.calls - calls:4d} API pages  "
+          f"{stats['added'] + stats['modified']:7,d} upserts  {stats['removed']:5,d} deletes")
+
+    calls = plaid.calls
+    stats, elapsed = await timed_sync(sync, item_id)
+    print(f"no-op sync        {elapsed * 1000:9.1f} ms  {plaid.calls - calls:4d} API pages  "
+          f"{stats['added'] + stats['modified']:7,d} upserts  {stats['removed']:5,d} deletes")
+
+    # Plaid data changing mid-pagination restarts from the stored cursor
+    plaid.fail_with_mutation()
+    seed_history(plaid, item_id, 1200, rng, prefix="tx-late")
+    stats, elapsed = await timed_sync(sync, item_id)
+    print(f"restarted sync    {elapsed * 1000:9.1f} ms  {stats['pages']:4d} pages applied")
+
+    expected = history + changes - changes // 10 + 1200
+    stored = {row["transaction_id"] for row in db.client.tables["transactions"]}
+    print(f"stored {len(stored):,} transactions (expected {expected:,})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--history", type=int, default=20000)
+    parser.add_argument("--changes", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.history, args.changes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Rate-limit check overhead: the in-process token bucket, and (with --redis-url)
+the Lua token bucket against a real Redis, one EVALSHA round trip per check.
+Run from backend/:  python -m benchmarks.bench_rate_limit [--redis-url redis://localhost:6379/15]
+"""
+import argparse
+import itertools
+
+from benchmarks.harness import BenchmarkSession
+from cache import CacheService
+from token_bucket import TokenBucketLimiter, parse_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--redis-url", help="benchmark the Redis path against this server (use a scratch DB)")
+    args = parser.parse_args()
+
+    session = BenchmarkSession()
+    session.benchmark("parse_rate[cached]", parse_rate, "5/minute")
+
+    local_cache = CacheService()
+    local_cache.enabled = False
+    local = TokenBucketLimiter(local_cache)
+    session.benchmark("local bucket[hot key]", local.hit, "user:1", "1000000/second")
+    keys = itertools.cycle([f"user:{i}" for i in range(50000)])
+    session.benchmark("local bucket[50k keys]", lambda: local.hit(next(keys), "5/minute"))
+
+    if args.redis_url:
+        redis_cache = CacheService()
+        redis_cache.redis_url = args.redis_url
+        if not redis_cache.connect():
+            raise SystemExit(f"Cannot reach {args.redis_url}")
+        shared = TokenBucketLimiter(redis_cache, prefix="bench:ratelimit")
+        session.benchmark("redis lua bucket[hot key]", shared.hit, "user:1", "1000000/second")
+        session.benchmark("redis lua bucket[50k keys]", lambda: shared.hit(next(keys), "5/minute"))
+        # Round-trip floor for comparison
+        session.benchmark("redis PING", redis_cache.client.ping)
+
+    session.save()
+
+
+if __name__ == "__main__":
+    main()
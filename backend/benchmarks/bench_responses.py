@@ -0,0 +1,91 @@
+"""
+/scan response path: CPU per request at 10, 100 and 1,000 subscriptions.
+validated: models built with validation, returned through response_model
+           (FastAPI validates and serializes them again) - the previous path
+fast:      plain-dict payload + FastJSONResponse (orjson) returned directly
+Each app is driven over raw ASGI (no HTTP client, no middleware) so only the
+handler and FastAPI's response handling are measured.
+Run from backend/:  python -m benchmarks.bench_responses [--sizes 10 100 1000]
+"""
+import argparse
+import asyncio
+import itertools
+import time
+
+from fastapi import FastAPI
+
+from main import DEMO_KILL_HISTORY, DEMO_SUBSCRIPTIONS, ScanResult, build_scan_result
+from responses import FastJSONResponse
+
+
+def portfolio(n: int):
+    subs = list(itertools.islice(itertools.cycle(DEMO_SUBSCRIPTIONS), n))
+    history = list(itertools.islice(itertools.cycle(DEMO_KILL_HISTORY), max(1, n // 5)))
+    return subs, history
+
+
+def build_apps(subs, history):
+    validated, fast = FastAPI(), FastAPI()
+
+    @validated.get("/scan", response_model=ScanResult)
+    async def scan_validated():
+        # Equivalent of building every Subscription(...) with validation
+        return ScanResult.model_validate(build_scan_result(subs, history))
+
+    @fast.get("/scan", response_model=ScanResult)
+    async def scan_fast():
+        return FastJSONResponse(build_scan_result(subs, history))
+
+    return validated, fast
+
+
+async def asgi_get(app, path: str) -> bytes:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": [], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    body = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(body)
+
+
+async def cpu_per_request(app, requests: int) -> float:
+    for _ in range(5):
+        await asgi_get(app, "/scan")
+    start = time.process_time()
+    for _ in range(requests):
+        await asgi_get(app, "/scan")
+    return (time.process_time() - start) / requests
+
+
+async def run(sizes):
+    print(f"{'subs':>6} {'validated':>12} {'fast':>12} {'saved':>8} {'body':>10}")
+    for n in sizes:
+        subs, history = portfolio(n)
+        validated, fast = build_apps(subs, history)
+        requests = max(20, 20000 // n)
+        slow_cpu = await cpu_per_request(validated, requests)
+        fast_cpu = await cpu_per_request(fast, requests)
+        size = len(await asgi_get(fast, "/scan"))
+        print(f"{n:>6} {slow_cpu * 1000:>9.2f} ms {fast_cpu * 1000:>9.2f} ms "
+              f"{1 - fast_cpu / slow_cpu:>7.0%} {size / 1024:>7.1f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10, 100, 1000])
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes))
+
+
+if __name__ == "__main__":
+    main()
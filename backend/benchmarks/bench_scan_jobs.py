@@ -0,0 +1,104 @@
+"""
+Scan jobs: time to first result for a Gmail scan, blocking vs. streamed.
+blocking: the request itself runs scan_mailbox and answers when it finishes
+job:      POST /scan/jobs returns at once; a worker thread runs
+          scan_user_gmail and the client reads /scan/jobs/{id}/events
+Gmail calls are simulated with a fixed latency; analysis is the real
+analyze_gmail_message. 'warm' repeats the scan with every message in the
+parse cache.
+Run from backend/:  python -m benchmarks.bench_scan_jobs [--messages 20] [--fetch-ms 150]
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+from benchmarks.bench_analysis_pipeline import make_message
+from benchmarks.fakes import FakeGmail
+from benchmarks.load_scenarios import install_fakes
+
+
+async def asgi_call(app, method: str, path: str, body: bytes = b"", on_chunk=None) -> bytes:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "headers": [(b"content-type", b"application/json")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    chunks = []
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            # Stay connected until the response is done
+            await asyncio.sleep(3600)
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            chunks.append(message["body"])
+            if on_chunk:
+                on_chunk(message["body"])
+
+    await app(scope, receive, send)
+    return b"".join(chunks)
+
+
+async def run_job(app, user_id: str):
+    start = time.perf_counter()
+    created = json.loads(await asgi_call(app, "POST", "/scan/jobs", json.dumps({"user_id": user_id}).encode()))
+    accepted = time.perf_counter() - start
+
+    marks = {}
+
+    def on_chunk(chunk: bytes):
+        for line in chunk.decode().splitlines():
+            if line.startswith("event: "):
+                event = line[7:]
+                marks.setdefault(event, time.perf_counter() - start)
+                marks["results"] = marks.get("results", 0) + (event == "result")
+
+    await asgi_call(app, "GET", created["events_url"], on_chunk=on_chunk)
+    return accepted, marks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--fetch-ms", type=float, default=150)
+    args = parser.parse_args()
+
+    app, _ = install_fakes()
+    import main as api
+    import tasks
+    from gmail_scanner import scan_mailbox
+    from parse_cache import parse_cache
+
+    user_id = "user-1"
+    api.db.client.table("users").insert({"id": user_id, "metadata": {"gmail_token": {"token": "x"}}}).execute()
+    gmail = FakeGmail({f"msg-{i}": make_message(i) for i in range(args.messages)}, latency=args.fetch_ms / 1000)
+    tasks.build_gmail_service = lambda creds: gmail
+    tasks.credentials_from_token = lambda token: None
+    # The worker: a thread per enqueued task
+    tasks.scan_user_gmail.delay = lambda *a: threading.Thread(target=tasks.scan_user_gmail, args=a).start()
+
+    print(f"{args.messages} messages, {args.fetch_ms:.0f} ms per Gmail call, "
+          f"events polled every {api.SCAN_EVENTS_POLL_SECONDS * 1000:.0f} ms\n")
+    print(f"{'':<14} {'response':>10} {'1st result':>11} {'complete':>10} {'results':>8}")
+
+    start = time.perf_counter()
+    scan_mailbox(gmail, max_results=args.messages, cache=None)
+    blocking = time.perf_counter() - start
+    print(f"{'blocking':<14} {blocking * 1000:>7.0f} ms {blocking * 1000:>8.0f} ms {blocking * 1000:>7.0f} ms {args.messages:>8}")
+
+    parse_cache.cache.client.store.clear()
+    for label in ("job (cold)", "job (warm)"):
+        accepted, marks = asyncio.run(run_job(app, user_id))
+        print(f"{label:<14} {accepted * 1000:>7.1f} ms {marks.get('result', 0) * 1000:>8.0f} ms "
+              f"{marks.get('complete', 0) * 1000:>7.0f} ms {marks.get('results', 0):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Cold-start benchmark: wall time and peak RSS of a fresh interpreter importing
+the API (and building the app) or the Celery worker module.
+Run from backend/:  python -m benchmarks.bench_startup [--runs N] [--prelude FILE]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "import main": "import main",
+    "import tasks": "import tasks",
+}
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+{prelude}
+{statement}
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{"seconds": elapsed, "rss_mb": rss_kb / 1024, "modules": len(sys.modules),
+                  "fastapi": "fastapi" in sys.modules}}))
+"""
+
+
+def probe(statement: str, prelude: str = "") -> dict:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(prelude=prelude, statement=statement)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--prelude", help="file executed before the import (e.g. env overrides)")
+    args = parser.parse_args()
+
+    prelude = open(args.prelude).read() if args.prelude else ""
+    print(f"{'target':<16} {'median s':>10} {'min s':>8} {'rss MB':>8} {'modules':>8} {'fastapi':>8}")
+    for name, statement in TARGETS.items():
+        runs = [probe(statement, prelude) for _ in range(args.runs)]
+        seconds = [r["seconds"] for r in runs]
+        print(
+            f"{name:<16} {statistics.median(seconds):10.3f} {min(seconds):8.3f} "
+            f"{statistics.median(r['rss_mb'] for r in runs):8.1f} {runs[-1]['modules']:8d} {str(runs[-1]['fastapi']):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
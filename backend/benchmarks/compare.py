@@ -0,0 +1,45 @@
+"""
+Compare two benchmark result files and flag regressions.
+Run from backend/:  python -m benchmarks.compare BASELINE.json CANDIDATE.json [--threshold 10]
+Exits non-zero when any shared benchmark's mean slowed down by more than the threshold (%).
+"""
+import argparse
+import json
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline {baseline['commit']}  ->  candidate {candidate['commit']}\n")
+    print(f"{'benchmark':<48} {'base mean':>12} {'cand mean':>12} {'change':>9}")
+
+    regressions = 0
+    for name in sorted(set(baseline["benchmarks"]) | set(candidate["benchmarks"])):
+        base = baseline["benchmarks"].get(name)
+        cand = candidate["benchmarks"].get(name)
+        if not base or not cand:
+            print(f"{name:<48} {'(only in ' + ('baseline' if base else 'candidate') + ')':>35}")
+            continue
+
+        change = (cand["mean"] - base["mean"]) / base["mean"] * 100 if base["mean"] else 0.0
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:<48} {base['mean'] * 1e6:10.2f}us {cand['mean'] * 1e6:10.2f}us {change:+8.1f}%{flag}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,503 @@
+"""
+Local fakes for Redis, Supabase, Lithic, Plaid, Gmail and binlist used by load scenarios.
+Each supports just the surface the backend calls, with optional simulated latency.
+"""
+import fnmatch
+import itertools
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import httpx
+from cryptography.fernet import Fernet
+
+# Plaid access tokens are encrypted at rest; fakes run under a throwaway key
+os.environ.setdefault("PLAID_TOKEN_KEYS", Fernet.generate_key().decode())
+
+
+class FakeRedis:
+    """Dict-backed subset of redis-py (decode_responses=True semantics)"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.store: Dict[str, Any] = {}
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def ping(self):
+        return True
+
+    def get(self, key):
+        self._wait()
+        return self.store.get(key)
+
+    def mget(self, keys):
+        self._wait()
+        return [self.store.get(k) for k in keys]
+
+    def set(self, key, value, ex=None, px=None, nx=False):
+        self._wait()
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    def setex(self, key, ttl, value):
+        return self.set(key, value, ex=ttl)
+
+    def delete(self, *keys):
+        self._wait()
+        return sum(1 for k in keys if self.store.pop(k, None) is not None)
+
+    def exists(self, *keys):
+        self._wait()
+        return sum(1 for k in keys if self.store.get(k))
+
+    def rename(self, src, dst):
+        self._wait()
+        self.store[dst] = self.store.pop(src)
+        return True
+
+    def keys(self, pattern):
+        self._wait()
+        return [k for k in self.store if fnmatch.fnmatch(k, pattern)]
+
+    def expire(self, key, ttl):
+        return key in self.store
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        self._wait()
+        bucket = self.store.setdefault(key, {})
+        updates = {**(mapping or {}), **({field: value} if field is not None else {})}
+        bucket.update({f: str(v) for f, v in updates.items()})
+        return len(updates)
+
+    def hget(self, key, field):
+        self._wait()
+        return (self.store.get(key) or {}).get(field)
+
+    def hincrby(self, key, field, amount=1):
+        self._wait()
+        bucket = self.store.setdefault(key, {})
+        bucket[field] = str(int(bucket.get(field, 0)) + amount)
+        return int(bucket[field])
+
+    def rpush(self, key, *values):
+        self._wait()
+        items = self.store.setdefault(key, [])
+        items.extend(values)
+        return len(items)
+
+    def ltrim(self, key, start, end):
+        self._wait()
+        items = self.store.get(key) or []
+        self.store[key] = items[start:None if end == -1 else end + 1]
+        return True
+
+    def lrange(self, key, start, end):
+        self._wait()
+        return list((self.store.get(key) or [])[start:None if end == -1 else end + 1])
+
+    def hgetall(self, key):
+        self._wait()
+        return dict(self.store.get(key) or {})
+
+    def hdel(self, key, *fields):
+        self._wait()
+        bucket = self.store.get(key) or {}
+        return sum(1 for f in fields if bucket.pop(f, None) is not None)
+
+    def zadd(self, key, mapping):
+        self._wait()
+        self.store.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    def zrem(self, key, *members):
+        return self.hdel(key, *members)
+
+    def zrangebyscore(self, key, low, high):
+        self._wait()
+        scores = self.store.get(key) or {}
+        return sorted((m for m, s in scores.items() if low <= s <= high), key=scores.get)
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue_call(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return queue_call
+
+    def execute(self):
+        latency, self.redis.latency = self.redis.latency, 0.0
+        try:
+            return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+        finally:
+            self.redis.latency = latency
+            self.redis._wait()
+            self.calls = []
+
+
+_COMPARE = {
+    "eq": lambda a, b: a == b, "gt": lambda a, b: a > b, "gte": lambda a, b: a >= b,
+    "lt": lambda a, b: a < b, "lte": lambda a, b: a <= b,
+}
+
+
+def _split_top_level(expr: str) -> List[str]:
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, ch in enumerate(expr):
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append(expr[start:i])
+            start = i + 1
+    parts.append(expr[start:])
+    return parts
+
+
+def _logic_filter(op: str, expr: str):
+    terms = []
+    for term in _split_top_level(expr):
+        if term.startswith(("and(", "or(")):
+            inner_op = term[:term.index("(")]
+            terms.append(_logic_filter(inner_op, term[len(inner_op) + 1:-1]))
+            continue
+        column, cmp, value = term.split(".", 2)
+        value = value[1:-1] if value.startswith('"') else value
+
+        def check(r, column=column, cmp=cmp, value=value):
+            actual = r.get(column)
+            if actual is None:
+                return False
+            return _COMPARE[cmp](actual, type(actual)(value))
+        terms.append(check)
+    combine = all if op == "and" else any
+    return lambda r: combine(t(r) for t in terms)
+
+
+class _FakeQuery:
+    """Chainable postgrest-style query over a list of row dicts"""
+
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db = db
+        self.table = table
+        self.filters = []
+        self.action = ("select", None)
+        self.order_by: List[tuple] = []
+        self.window: Optional[tuple] = None
+
+    def select(self, *columns):
+        self.action = ("select", None)
+        return self
+
+    def insert(self, data):
+        self.action = ("insert", data)
+        return self
+
+    def upsert(self, data, on_conflict: str = "id"):
+        self.action = ("upsert", (data, on_conflict))
+        return self
+
+    def update(self, data):
+        self.action = ("update", data)
+        return self
+
+    def delete(self):
+        self.action = ("delete", None)
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and r.get(column) >= value)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda r: r.get(column) is not None and r.get(column) <= value)
+        return self
+
+    def is_(self, column, value):
+        # Only IS NULL is used
+        self.filters.append(lambda r: r.get(column) is None)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda r: r.get(column) in values)
+        return self
+
+    def or_(self, filters: str):
+        """PostgREST logic tree: 'a.gt.1,and(a.eq.1,b.gt."x")'"""
+        self.filters.append(_logic_filter("or", filters))
+        return self
+
+    def order(self, column, desc=False):
+        self.order_by.append((column, desc))
+        return self
+
+    def limit(self, n):
+        self.window = (0, n - 1)
+        return self
+
+    def range(self, start, end):
+        self.window = (start, end)
+        return self
+
+    def execute(self):
+        self.db._wait()
+        rows = self.db.tables.setdefault(self.table, [])
+        action, data = self.action
+
+        if action in ("insert", "upsert"):
+            records, key = (data, "id") if action == "insert" else data
+            records = records if isinstance(records, list) else [records]
+            index = {r.get(key): r for r in rows} if action == "upsert" else {}
+            saved = []
+            for record in records:
+                record = dict(record)
+                record.setdefault("id", f"{self.table}-{next(self.db.ids)}")
+                existing = index.get(record.get(key))
+                if existing is not None:
+                    existing.update(record)
+                    saved.append(existing)
+                else:
+                    rows.append(record)
+                    index[record.get(key)] = record
+                    saved.append(record)
+            return SimpleNamespace(data=saved)
+
+        matched = [r for r in rows if all(f(r) for f in self.filters)]
+
+        if action == "update":
+            for r in matched:
+                r.update(data)
+            return SimpleNamespace(data=matched)
+        if action == "delete":
+            gone = {id(r) for r in matched}
+            self.db.tables[self.table] = [r for r in rows if id(r) not in gone]
+            return SimpleNamespace(data=matched)
+
+        for column, desc in reversed(self.order_by):
+            matched.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+        if self.window:
+            matched = matched[self.window[0]:self.window[1] + 1]
+        return SimpleNamespace(data=[dict(r) for r in matched])
+
+
+class FakeSupabase:
+    """In-memory stand-in for supabase.Client"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables: Dict[str, List[Dict]] = {}
+        self.ids = itertools.count(1)
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def table(self, name: str) -> _FakeQuery:
+        return _FakeQuery(self, name)
+
+
+class FakeLithic:
+    """cards.create/retrieve/update and transactions.list, returning Lithic-shaped objects"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.issued: Dict[str, SimpleNamespace] = {}
+        self.ids = itertools.count(1000)
+        self.cards = SimpleNamespace(create=self._create_card, retrieve=self._retrieve_card, update=self._update_card)
+        self.transactions = SimpleNamespace(list=self._list_transactions)
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _create_card(self, **kwargs):
+        self._wait()
+        n = next(self.ids)
+        card = SimpleNamespace(
+            token=f"card_{n}", last_four=str(n)[-4:], cvv="123",
+            exp_month=12, exp_year=2030, state="OPEN",
+        )
+        self.issued[card.token] = card
+        return card
+
+    def _retrieve_card(self, card_token: str):
+        self._wait()
+        return self.issued[card_token]
+
+    def _update_card(self, card_token: str, state: str):
+        self._wait()
+        card = self.issued.setdefault(card_token, SimpleNamespace(
+            token=card_token, last_four="0000", cvv="000", exp_month=1, exp_year=2030, state="OPEN",
+        ))
+        card.state = state
+        return card
+
+    def _list_transactions(self, card_token: str, page_size: int = 50):
+        self._wait()
+        data = [
+            SimpleNamespace(
+                amount=999, status="SETTLED", created=datetime(2025, 12, i % 28 + 1, tzinfo=timezone.utc),
+                merchant=SimpleNamespace(descriptor="NETFLIX.COM"),
+            )
+            for i in range(page_size)
+        ]
+        return SimpleNamespace(data=data)
+
+
+class FakePlaidError(Exception):
+    """Shaped like plaid.ApiException: the error payload is JSON in .body"""
+
+    def __init__(self, error_code: str):
+        super().__init__(error_code)
+        self.status = 400
+        self.body = json.dumps({"error_type": "TRANSACTIONS_ERROR", "error_code": error_code})
+
+
+class _PlaidResponse(dict):
+    def to_dict(self):
+        return dict(self)
+
+
+class FakePlaid:
+    """
+    Plaid sandbox stand-in: token exchange and /transactions/sync over an
+    append-only change log per item. A cursor is an offset into that log, so
+    a sync returns exactly the changes made since the cursor was issued.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.ids = itertools.count(1)
+        self.tokens: Dict[str, str] = {}  # access_token -> item_id
+        self.changes: Dict[str, List[tuple]] = {}  # item_id -> [(kind, transaction)]
+        self.calls = 0
+        self.mutations_pending = 0
+
+    def _wait(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def item_public_token_exchange(self, request):
+        self._wait()
+        n = next(self.ids)
+        item_id, access_token = f"item-{n}", f"access-sandbox-{n}"
+        self.tokens[access_token] = item_id
+        self.changes[item_id] = []
+        return _PlaidResponse(access_token=access_token, item_id=item_id, request_id=f"req-{n}")
+
+    def link_token_create(self, request):
+        self._wait()
+        n = next(self.ids)
+        expiration = datetime.now(timezone.utc) + timedelta(hours=4)
+        return _PlaidResponse(link_token=f"link-sandbox-{n}", expiration=expiration, request_id=f"req-{n}")
+
+    def transaction(self, item_id: str, transaction_id: str, amount: float, name: str, day: str, pending=False) -> Dict:
+        return {
+            "transaction_id": transaction_id, "account_id": f"{item_id}-checking", "amount": amount,
+            "name": name, "merchant_name": name.split()[0].title(), "pending": pending,
+            "date": day, "authorized_date": day, "iso_currency_code": "USD",
+            "personal_finance_category": {"primary": "GENERAL_MERCHANDISE"},
+        }
+
+    def add(self, item_id: str, transaction: Dict):
+        self.changes[item_id].append(("added", transaction))
+
+    def modify(self, item_id: str, transaction: Dict):
+        self.changes[item_id].append(("modified", transaction))
+
+    def remove(self, item_id: str, transaction_id: str):
+        self.changes[item_id].append(("removed", {"transaction_id": transaction_id}))
+
+    def fail_with_mutation(self, times: int = 1):
+        """Next `times` follow-up pages raise TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION"""
+        self.mutations_pending = times
+
+    def transactions_sync(self, request):
+        self._wait()
+        item_id = self.tokens[request["access_token"]]
+        cursor = request.get("cursor", "")
+        if cursor and self.mutations_pending:
+            self.mutations_pending -= 1
+            raise FakePlaidError("TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION")
+
+        log = self.changes[item_id]
+        start = int(cursor) if cursor else 0
+        end = min(len(log), start + request.get("count", 100))
+        page = {"added": [], "modified": [], "removed": []}
+        for kind, transaction in log[start:end]:
+            page[kind].append(transaction)
+        return _PlaidResponse(
+            next_cursor=str(end), has_more=end < len(log), accounts=[],
+            transactions_update_status="HISTORICAL_UPDATE_COMPLETE", **page,
+        )
+
+
+class FakeGmail:
+    """
+    googleapiclient Gmail service stand-in: users().messages().list()/get()
+    over a dict of message resources, each call sleeping `latency`.
+    """
+
+    def __init__(self, mailbox: Dict[str, Dict], latency: float = 0.0):
+        self.mailbox = mailbox
+        self.latency = latency
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def _call(self, result):
+        def execute():
+            if self.latency:
+                time.sleep(self.latency)
+            return result
+        return SimpleNamespace(execute=execute)
+
+    def list(self, userId="me", q=None, maxResults=100):
+        return self._call({"messages": [{"id": mid} for mid in list(self.mailbox)[:maxResults]]})
+
+    def get(self, userId="me", id=None, format="full"):
+        return self._call(self.mailbox[id])
+
+
+def binlist_transport(latency: float = 0.0) -> httpx.MockTransport:
+    """httpx transport answering lookup.binlist.net/<bin> locally"""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if latency:
+            import asyncio
+            await asyncio.sleep(latency)
+        return httpx.Response(200, json={
+            "scheme": "visa",
+            "type": "debit",
+            "bank": {"name": "Fake Bank"},
+            "country": {"name": "Nigeria"},
+        })
+
+    return httpx.MockTransport(handler)
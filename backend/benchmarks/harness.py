@@ -0,0 +1,103 @@
+"""
+Minimal pytest-benchmark-style harness.
+Calibrates iterations per round, reports min/mean/median/p99/ops and
+saves results as JSON tagged with the git commit for later comparison.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def summarize(samples: List[float], ops_per_sample: int = 1) -> Dict:
+    """Stats for per-operation timings in seconds"""
+    ordered = sorted(samples)
+    mean = statistics.fmean(ordered)
+    return {
+        "rounds": len(ordered),
+        "min": ordered[0],
+        "max": ordered[-1],
+        "mean": mean,
+        "median": statistics.median(ordered),
+        "p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+        "stddev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "ops": ops_per_sample / mean if mean else float('inf'),
+    }
+
+
+class BenchmarkSession:
+    """Collects named results; benchmark() mirrors pytest-benchmark's fixture"""
+
+    def __init__(self, min_time: float = 0.2, rounds: int = 20, warmup_rounds: int = 2):
+        self.min_time = min_time
+        self.rounds = rounds
+        self.warmup_rounds = warmup_rounds
+        self.results: Dict[str, Dict] = {}
+
+    def benchmark(self, name: str, fn: Callable, *args, **kwargs) -> Dict:
+        """Time fn(*args, **kwargs); each round runs enough iterations to fill min_time / rounds"""
+        iterations = self._calibrate(fn, args, kwargs)
+
+        for _ in range(self.warmup_rounds):
+            for _ in range(iterations):
+                fn(*args, **kwargs)
+
+        samples = []
+        for _ in range(self.rounds):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                fn(*args, **kwargs)
+            samples.append((time.perf_counter() - start) / iterations)
+
+        stats = summarize(samples)
+        stats["iterations"] = iterations
+        return self.record(name, stats)
+
+    def record(self, name: str, stats: Dict) -> Dict:
+        self.results[name] = stats
+        print(f"{name:<48} mean {stats['mean'] * 1e6:10.2f} us  p99 {stats['p99'] * 1e6:10.2f} us  {stats['ops']:12,.0f} ops/s")
+        return stats
+
+    def save(self, path: Optional[str] = None) -> str:
+        commit = _git_commit()
+        path = path or os.path.join(RESULTS_DIR, f"{commit}.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = {
+            "commit": commit,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "benchmarks": self.results,
+        }
+        with open(path, 'w') as f:
+            json.dump(payload, f, indent=2, sort_keys=True)
+        print(f"\nResults saved to {path}")
+        return path
+
+    def _calibrate(self, fn: Callable, args, kwargs) -> int:
+        target = self.min_time / self.rounds
+        iterations = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                fn(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+            if elapsed >= target or iterations >= 1_000_000:
+                return iterations
+            iterations *= 10 if elapsed < target / 10 else 2
@@ -0,0 +1,119 @@
+"""
+In-process load scenarios against the FastAPI app with every external
+dependency (Redis, Supabase, Lithic, Plaid, binlist) replaced by local fakes.
+Run from backend/:  python -m benchmarks.load_scenarios [--requests N] [--concurrency C] [--latency-ms L]
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Callable, Dict, List, Tuple
+
+import httpx
+
+from benchmarks.fakes import FakeLithic, FakePlaid, FakeRedis, FakeSupabase, binlist_transport
+from benchmarks.harness import BenchmarkSession, summarize
+
+# (method, path, json body) factory per scenario
+RequestFactory = Callable[[random.Random], Tuple[str, str, Dict]]
+
+
+def install_fakes(latency: float = 0.0):
+    """Point the app's module-level clients at local fakes; returns the app"""
+    import main
+
+    main.cache.client = FakeRedis(latency)
+    main.cache.enabled = True
+    main.db.client = FakeSupabase(latency)
+    main.db.enabled = True
+    main.clients.lithic = FakeLithic(latency)
+    main.clients.plaid = FakePlaid(latency)
+    # Card creation is rate limited per user; the generator reuses 1000 user IDs
+    main.rate_limiter.enabled = False
+
+    real_async_client = httpx.AsyncClient
+    transport = binlist_transport(latency)
+
+    class BinlistAsyncClient(real_async_client):
+        def __init__(self, *args, **kwargs):
+            kwargs.setdefault("transport", transport)
+            super().__init__(*args, **kwargs)
+
+    main.httpx.AsyncClient = BinlistAsyncClient
+    return main.app, real_async_client
+
+
+def scenarios() -> Dict[str, RequestFactory]:
+    bins = [f"{random.Random(i).randrange(400000, 560000)}" for i in range(1000)]
+    return {
+        "scan": lambda rng: ("GET", "/scan", None),
+        "resolve_card": lambda rng: ("POST", "/api/v1/resolve-card", {"bin_number": rng.choice(bins)}),
+        "create_virtual_card": lambda rng: ("POST", "/api/v1/cards/create-virtual", {
+            "subscription_name": "Netflix",
+            "merchant_name": "NETFLIX.COM",
+            "spending_limit": 15.49,
+            "user_id": f"user-{rng.randrange(1000)}",
+        }),
+        "pause_card": lambda rng: ("POST", f"/api/v1/cards/pause/card_{rng.randrange(1000, 2000)}", None),
+        "close_card": lambda rng: ("POST", f"/api/v1/cards/close/card_{rng.randrange(1000, 2000)}", None),
+        "create_link_token": lambda rng: ("POST", "/api/v1/plaid/create-link-token", {"user_id": f"user-{rng.randrange(200)}"}),
+        "card_transactions": lambda rng: ("GET", f"/api/v1/cards/card_{rng.randrange(1000, 2000)}/transactions", None),
+    }
+
+
+async def run_scenario(client: httpx.AsyncClient, factory: RequestFactory, requests: int, concurrency: int) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker(seed: int):
+        nonlocal errors
+        rng = random.Random(seed)
+        for _ in remaining:
+            method, path, body = factory(rng)
+            start = time.perf_counter()
+            res = await client.request(method, path, json=body)
+            latencies.append(time.perf_counter() - start)
+            if res.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    stats = summarize(latencies)
+    # Throughput under concurrency, not 1/mean latency
+    stats["ops"] = requests / elapsed
+    stats["errors"] = errors
+    stats["concurrency"] = concurrency
+    return stats
+
+
+async def run_all(session: BenchmarkSession, requests: int, concurrency: int, latency: float, only: List[str] = None):
+    app, real_async_client = install_fakes(latency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with real_async_client(transport=transport, base_url="http://bench") as client:
+        for name, factory in scenarios().items():
+            if only and name not in only:
+                continue
+            # Warm caches and lazy initialisation outside the measured run
+            await run_scenario(client, factory, min(requests, 50), concurrency)
+            session.record(f"load:{name}", await run_scenario(client, factory, requests, concurrency))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated latency per fake dependency call")
+    parser.add_argument("--only", nargs="*", help="scenario names to run")
+    args = parser.parse_args()
+
+    session = BenchmarkSession()
+    asyncio.run(run_all(session, args.requests, args.concurrency, args.latency_ms / 1000, args.only))
+    session.save()
+
+
+if __name__ == "__main__":
+    main()
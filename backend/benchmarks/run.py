@@ -0,0 +1,34 @@
+"""
+Run the micro-benchmarks and load scenarios and save one JSON result file
+(benchmarks/results/<commit>.json). Compare two runs with benchmarks.compare.
+Run from backend/:  python -m benchmarks.run [--requests N] [--concurrency C] [--output PATH]
+"""
+import argparse
+import asyncio
+
+from benchmarks import bench_micro, load_scenarios
+from benchmarks.harness import BenchmarkSession
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<commit>.json)")
+    args = parser.parse_args()
+
+    session = BenchmarkSession()
+    print("== micro-benchmarks ==")
+    bench_micro.register(session)
+
+    if not args.skip_load:
+        print("\n== load scenarios ==")
+        asyncio.run(load_scenarios.run_all(session, args.requests, args.concurrency, args.latency_ms / 1000))
+
+    session.save(args.output)
+
+
+if __name__ == "__main__":
+    main()
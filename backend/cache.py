@@ -4,33 +4,105 @@ Caches BIN lookups, Plaid tokens, and frequently accessed data.
 """
 import os
 import json
-import redis
+import threading
+import time
 from typing import Optional, Any
 from dotenv import load_dotenv
 
+from request_timing import track
+
 load_dotenv()
 
+# Seconds before retrying a Redis that was unreachable
+RECONNECT_INTERVAL = 30.0
+# Kept short so an unreachable Redis costs a request at most this long, never a TCP timeout
+REDIS_CONNECT_TIMEOUT = float(os.getenv('REDIS_CONNECT_TIMEOUT', '1'))
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '2'))
+
 class CacheService:
     def __init__(self):
-        redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
-        
-        try:
-            self.client = redis.from_url(redis_url, decode_responses=True)
-            self.client.ping()
-            self.enabled = True
-            print("✅ Redis connected")
-        except Exception as e:
-            self.client = None
-            self.enabled = False
-            print(f"⚠️  Redis not available - caching disabled: {e}")
-    
+        self.redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
+        self._lock = threading.Lock()
+        self._client = None
+        self._enabled: Optional[bool] = None  # unknown until first use
+        self._retry_at = 0.0
+        self._reconnecting = False
+
+    def connect(self) -> bool:
+        """Connect and ping; called lazily on first use rather than at import"""
+        with self._lock:
+            if self._enabled:
+                return True
+            try:
+                import redis
+
+                client = redis.from_url(
+                    self.redis_url,
+                    decode_responses=True,
+                    socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+                    socket_timeout=REDIS_SOCKET_TIMEOUT,
+                )
+                client.ping()
+                self._client, self._enabled = client, True
+                print("✅ Redis connected")
+            except Exception as e:
+                self._client, self._enabled = None, False
+                self._retry_at = time.monotonic() + RECONNECT_INTERVAL
+                print(f"⚠️  Redis not available - caching disabled: {e}")
+            return self._enabled
+
+    def _reconnect_in_background(self) -> None:
+        """Retry a Redis that was down without blocking the caller (often a request on the event loop)"""
+        with self._lock:
+            if self._reconnecting or self._enabled:
+                return
+            self._reconnecting = True
+
+        def reconnect():
+            try:
+                self.connect()
+            finally:
+                self._reconnecting = False
+
+        threading.Thread(target=reconnect, name="redis-reconnect", daemon=True).start()
+
+    @property
+    def enabled(self) -> bool:
+        if self._enabled is None:
+            self.connect()
+        elif not self._enabled and time.monotonic() >= self._retry_at:
+            # Caching stays off for this call; a later one sees the reconnect
+            self._reconnect_in_background()
+        return bool(self._enabled)
+
+    @enabled.setter
+    def enabled(self, value: bool):
+        # Explicitly disabled stays disabled (no reconnect attempts)
+        self._enabled = value
+        self._retry_at = 0.0 if value else float('inf')
+
+    @property
+    def client(self):
+        return self._client if self.enabled else None
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+            self._client, self._enabled = None, None
+
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
         if not self.enabled:
             return None
         
         try:
-            value = self.client.get(key)
+            with track("redis"):
+                value = self.client.get(key)
             if value:
                 return json.loads(value)
         except Exception as e:
@@ -44,7 +116,8 @@ class CacheService:
             return False
         
         try:
-            self.client.setex(key, ttl, json.dumps(value))
+            with track("redis"):
+                self.client.setex(key, ttl, json.dumps(value))
             return True
         except Exception as e:
             print(f"Cache set error: {e}")
@@ -56,7 +129,8 @@ class CacheService:
             return False
         
         try:
-            self.client.delete(key)
+            with track("redis"):
+                self.client.delete(key)
             return True
         except Exception as e:
             print(f"Cache delete error: {e}")
@@ -68,9 +142,10 @@ class CacheService:
             return 0
         
         try:
-            keys = self.client.keys(pattern)
-            if keys:
-                return self.client.delete(*keys)
+            with track("redis"):
+                keys = self.client.keys(pattern)
+                if keys:
+                    return self.client.delete(*keys)
         except Exception as e:
             print(f"Cache clear error: {e}")
         
@@ -86,22 +161,34 @@ class CacheService:
         """Get cached BIN lookup"""
         return self.get(f"bin:{bin_6}")
     
-    def cache_plaid_token(self, user_id: str, access_token: str, ttl: int = 3600) -> bool:
-        """Cache Plaid access token (1 hour)"""
-        return self.set(f"plaid:{user_id}", access_token, ttl)
+    def cache_plaid_token(self, user_id: str, token: Any, ttl: int = 3600) -> bool:
+        """Cache the user's Plaid Link token (TTL set from its expiration)"""
+        return self.set(f"plaid:{user_id}", token, ttl)
     
-    def get_plaid_token(self, user_id: str) -> Optional[str]:
-        """Get cached Plaid token"""
+    def get_plaid_token(self, user_id: str) -> Optional[Any]:
+        """Get cached Plaid Link token"""
         return self.get(f"plaid:{user_id}")
     
+    def delete_plaid_token(self, user_id: str) -> bool:
+        """Drop the cached Plaid Link token"""
+        return self.delete(f"plaid:{user_id}")
+    
     def cache_user_subscriptions(self, user_id: str, subscriptions: list, ttl: int = 300) -> bool:
-        """Cache user subscriptions (5 minutes)"""
+        """Cache user subscriptions (5 minutes by default)"""
         return self.set(f"subs:{user_id}", subscriptions, ttl)
     
     def get_user_subscriptions(self, user_id: str) -> Optional[list]:
         """Get cached subscriptions"""
         return self.get(f"subs:{user_id}")
     
+    def cache_recurring_charges(self, user_id: str, candidates: list, ttl: int = 7 * 86400) -> bool:
+        """Cache recurring-charge candidates from transaction history (7 days)"""
+        return self.set(f"recurring:{user_id}", candidates, ttl)
+    
+    def get_recurring_charges(self, user_id: str) -> Optional[list]:
+        """Get cached recurring-charge candidates"""
+        return self.get(f"recurring:{user_id}")
+    
     def invalidate_user_cache(self, user_id: str) -> int:
         """Clear all cache for a user"""
         return self.clear_pattern(f"*:{user_id}")
@@ -0,0 +1,134 @@
+"""
+Lazily constructed third-party API clients (Plaid, Lithic).
+Nothing is imported or built until the first request that needs a client,
+so importing the API stays cheap and a down provider cannot stall startup.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+# Hosts by PLAID_ENV; newer plaid-python releases dropped Configuration.host_* constants
+PLAID_HOSTS = {
+    'sandbox': 'https://sandbox.plaid.com',
+    'development': 'https://development.plaid.com',
+    'production': 'https://production.plaid.com',
+}
+
+# Concurrent Plaid calls per process: urllib3 pool size and async worker threads
+PLAID_POOL_SIZE = int(os.getenv('PLAID_POOL_SIZE', '10'))
+
+
+class AsyncPlaid:
+    """
+    Awaitable facade over plaid_api.PlaidApi: `await clients.plaid_async.link_token_create(req)`.
+    The SDK is synchronous, so calls run on a thread pool sized to its keep-alive
+    connection pool; the event loop never blocks on Plaid and no call waits for
+    a connection.
+    """
+
+    def __init__(self, registry: "ClientRegistry", max_workers: int = PLAID_POOL_SIZE):
+        self._registry = registry
+        self._max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="plaid")
+        return self._executor
+
+    def __getattr__(self, name: str):
+        registry = self._registry
+
+        async def call(*args, **kwargs):
+            # Resolve the client on the pool too: its first build imports the SDK
+            def invoke():
+                return getattr(registry.plaid, name)(*args, **kwargs)
+            return await asyncio.get_running_loop().run_in_executor(self.executor, invoke)
+
+        return call
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+class ClientRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._plaid: Optional[Any] = None
+        self._plaid_api_client: Optional[Any] = None
+        self._lithic: Optional[Any] = None
+        self.plaid_async = AsyncPlaid(self)
+
+    @property
+    def plaid(self):
+        """plaid_api.PlaidApi, built on first access"""
+        if self._plaid is None:
+            with self._lock:
+                if self._plaid is None:
+                    self._plaid = self._build_plaid()
+        return self._plaid
+
+    @plaid.setter
+    def plaid(self, client):
+        self._plaid = client
+
+    @property
+    def lithic(self):
+        """lithic.Lithic, built on first access"""
+        if self._lithic is None:
+            with self._lock:
+                if self._lithic is None:
+                    self._lithic = self._build_lithic()
+        return self._lithic
+
+    @lithic.setter
+    def lithic(self, client):
+        self._lithic = client
+
+    def _build_plaid(self):
+        from plaid.api import plaid_api
+        from plaid.api_client import ApiClient
+        from plaid.configuration import Configuration
+
+        plaid_env = os.getenv('PLAID_ENV', 'sandbox')
+        configuration = Configuration(
+            host=PLAID_HOSTS.get(plaid_env, PLAID_HOSTS['sandbox']),
+            api_key={
+                'clientId': os.getenv('PLAID_CLIENT_ID'),
+                'secret': os.getenv('PLAID_SECRET'),
+            }
+        )
+        configuration.connection_pool_maxsize = PLAID_POOL_SIZE
+        self._plaid_api_client = ApiClient(configuration)
+        return plaid_api.PlaidApi(self._plaid_api_client)
+
+    def _build_lithic(self):
+        from lithic import Lithic
+
+        return Lithic(
+            api_key=os.getenv('LITHIC_API_KEY'),
+            environment=os.getenv('LITHIC_ENV', 'sandbox'),
+        )
+
+    def close(self):
+        """Release pooled connections; clients are rebuilt on next access"""
+        self.plaid_async.close()
+        with self._lock:
+            if self._lithic is not None and hasattr(self._lithic, 'close'):
+                self._lithic.close()
+            if self._plaid_api_client is not None:
+                self._plaid_api_client.close()
+            self._plaid = self._plaid_api_client = self._lithic = None
+
+
+# Global instance
+clients = ClientRegistry()
@@ -0,0 +1,126 @@
+"""
+Negotiated response compression.
+Pure ASGI middleware: complete (non-streaming) responses above a size
+threshold are compressed with brotli or gzip, whichever the client's
+Accept-Encoding prefers (brotli wins ties when the module is installed).
+Streaming bodies such as Server-Sent Events pass through untouched.
+"""
+import gzip
+import os
+from typing import Dict, Optional
+
+from request_timing import track
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Bodies smaller than this aren't worth the CPU (or the header overhead)
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+# Moderate levels: dynamic JSON per request, not static assets built once
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', '5'))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '4'))
+
+COMPRESSIBLE_TYPES = (b"application/json", b"text/plain", b"text/html", b"text/csv")
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """'br;q=1.0, gzip;q=0.8, *;q=0' -> {'br': 1.0, 'gzip': 0.8, '*': 0.0}"""
+    weights = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+    return weights
+
+
+def choose_encoding(header: str) -> Optional[str]:
+    """Best supported content-coding the client accepts, or None"""
+    weights = parse_accept_encoding(header)
+    wildcard = weights.get('*', 0.0)
+    supported = ('br', 'gzip') if brotli is not None else ('gzip',)
+    best, best_q = None, 0.0
+    for coding in supported:
+        q = weights.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """Compresses whole response bodies of at least `min_bytes` for clients that accept it"""
+
+    def __init__(self, app, min_bytes: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.min_bytes = min_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = next((value for name, value in scope["headers"] if name == b"accept-encoding"), b"")
+        encoding = choose_encoding(accept.decode('latin-1')) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Hold the start message until the first body chunk shows whether the
+        # response is complete; streamed responses are forwarded as they are
+        start = {}
+
+        async def send_compressed(message):
+            if message["type"] == "http.response.start":
+                start["message"] = message
+                return
+            if message["type"] != "http.response.body" or "message" not in start:
+                await send(message)
+                return
+
+            start_message = start.pop("message")
+            headers = start_message.get("headers", [])
+            body = message.get("body", b"")
+            if message.get("more_body") or len(body) < self.min_bytes or not self._compressible(headers):
+                await send(start_message)
+                await send(message)
+                return
+
+            with track("compress"):
+                body = compress(body, encoding)
+            headers = [(k, v) for k, v in headers if k not in (b"content-length", b"vary")]
+            vary = [v for k, v in start_message.get("headers", []) if k == b"vary"]
+            headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"vary", b", ".join(vary + [b"Accept-Encoding"])),
+            ]
+            await send({**start_message, "headers": headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _compressible(headers) -> bool:
+        content_type = b""
+        for name, value in headers:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        return content_type.startswith(COMPRESSIBLE_TYPES)
@@ -3,29 +3,65 @@ Database service using Supabase for persistent storage.
 Replaces in-memory dictionaries with real database.
 """
 import os
-from typing import List, Optional, Dict, Any
-from supabase import create_client, Client
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 import json
-from datetime import datetime
+from datetime import date, datetime
+
+from request_timing import timed
+from renewal_calendar import renewal_calendar
+from token_crypto import token_cipher
 
 load_dotenv()
 
+# IDs per in_() filter; each one is a ~36-character UUID in the request URL
+IDS_PER_QUERY = 100
+
+def keyset_after(query, after: Optional[Tuple[str, Any]]):
+    """
+    Rows strictly after the (user_id, id) of the last row of the previous page.
+    Unlike OFFSET, each page is an index seek, so late pages cost the same as the first.
+    """
+    if after is None:
+        return query
+    user_id, row_id = after
+    return query.or_(f'user_id.gt."{user_id}",and(user_id.eq."{user_id}",id.gt."{row_id}")')
+
 class DatabaseService:
     def __init__(self):
-        supabase_url = os.getenv('SUPABASE_URL')
-        supabase_key = os.getenv('SUPABASE_KEY')
-        
-        if supabase_url and supabase_key:
-            self.client: Client = create_client(supabase_url, supabase_key)
-            self.enabled = True
-        else:
-            self.client = None
-            self.enabled = False
+        self.supabase_url = os.getenv('SUPABASE_URL')
+        self.supabase_key = os.getenv('SUPABASE_KEY')
+        self.enabled = bool(self.supabase_url and self.supabase_key)
+        self._client = None
+        self._lock = threading.Lock()
+
+        if not self.enabled:
             print("⚠️  Supabase not configured - using in-memory storage")
-    
+
+    @property
+    def client(self):
+        """supabase.Client, created on first query (the SDK import alone is heavy)"""
+        if self._client is None and self.enabled:
+            with self._lock:
+                if self._client is None:
+                    from supabase import create_client
+
+                    self._client = create_client(self.supabase_url, self.supabase_key)
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    def close(self):
+        """Drop the client; a forked worker must not reuse its parent's connections"""
+        with self._lock:
+            self._client = None
+
     # --- USERS ---
     
+    @timed("supabase")
     async def create_user(self, user_id: str, email: str, metadata: Dict = None) -> Dict:
         """Create or update user profile"""
         if not self.enabled:
@@ -41,6 +77,7 @@ class DatabaseService:
         result = self.client.table('users').upsert(data).execute()
         return result.data[0] if result.data else data
     
+    @timed("supabase")
     async def get_user(self, user_id: str) -> Optional[Dict]:
         """Get user by ID"""
         if not self.enabled:
@@ -49,8 +86,23 @@ class DatabaseService:
         result = self.client.table('users').select("*").eq('id', user_id).execute()
         return result.data[0] if result.data else None
     
+    @timed("supabase")
+    async def get_users(self, limit: int = 1000, offset: int = 0) -> List[Dict]:
+        """Page through all users"""
+        if not self.enabled:
+            return []
+        
+        result = self.client.table('users')\
+            .select("*")\
+            .order('id')\
+            .range(offset, offset + limit - 1)\
+            .execute()
+        
+        return result.data if result.data else []
+    
     # --- SUBSCRIPTIONS ---
     
+    @timed("supabase")
     async def create_subscription(
         self, 
         user_id: str, 
@@ -59,7 +111,9 @@ class DatabaseService:
         currency: str = "$",
         category: str = "General",
         virtual_card_id: Optional[str] = None,
-        metadata: Dict = None
+        metadata: Dict = None,
+        is_trial: bool = False,
+        next_charge_date: Optional[date] = None
     ) -> Dict:
         """Create a new subscription"""
         if not self.enabled:
@@ -79,12 +133,17 @@ class DatabaseService:
             "status": "active",
             "virtual_card_id": virtual_card_id,
             "metadata": metadata or {},
+            "is_trial": is_trial,
+            "next_charge_date": next_charge_date.isoformat() if next_charge_date else None,
             "detected_at": datetime.utcnow().isoformat()
         }
         
         result = self.client.table('subscriptions').insert(data).execute()
-        return result.data[0] if result.data else data
+        subscription = result.data[0] if result.data else data
+        self._sync_calendar(subscription)
+        return subscription
     
+    @timed("supabase")
     async def get_user_subscriptions(self, user_id: str, status: str = "active") -> List[Dict]:
         """Get all subscriptions for a user"""
         if not self.enabled:
@@ -98,14 +157,115 @@ class DatabaseService:
         result = query.execute()
         return result.data if result.data else []
     
+    @timed("supabase")
+    async def get_active_subscriptions(self, limit: int = 1000, after: Optional[Tuple[str, Any]] = None) -> List[Dict]:
+        """Page through active subscriptions across all users, ordered by (user_id, id)"""
+        if not self.enabled:
+            return []
+        
+        query = self.client.table('subscriptions')\
+            .select("*")\
+            .eq('status', 'active')
+        result = keyset_after(query, after)\
+            .order('user_id')\
+            .order('id')\
+            .limit(limit)\
+            .execute()
+        
+        return result.data if result.data else []
+    
+    @timed("supabase")
+    async def get_subscriptions_due(
+        self,
+        start: Optional[date],
+        end: date,
+        limit: int = 1000,
+        after: Optional[Tuple[str, Any]] = None
+    ) -> List[Dict]:
+        """
+        Active subscriptions charging (or ending a trial) between start and end,
+        inclusive (everything up to end without a start), ordered by (user_id, id)
+        """
+        if not self.enabled:
+            return []
+        
+        query = self.client.table('subscriptions')\
+            .select("*")\
+            .eq('status', 'active')\
+            .lte('next_charge_date', end.isoformat())
+        if start is not None:
+            query = query.gte('next_charge_date', start.isoformat())
+        result = keyset_after(query, after)\
+            .order('user_id')\
+            .order('id')\
+            .limit(limit)\
+            .execute()
+        
+        return result.data if result.data else []
+    
+    @timed("supabase")
+    async def get_subscriptions_without_charge_date(
+        self,
+        limit: int = 1000,
+        after: Optional[Tuple[str, Any]] = None
+    ) -> List[Dict]:
+        """Active subscriptions with no next_charge_date yet (created before it existed), ordered by (user_id, id)"""
+        if not self.enabled:
+            return []
+        
+        query = self.client.table('subscriptions')\
+            .select("*")\
+            .eq('status', 'active')\
+            .is_('next_charge_date', 'null')
+        result = keyset_after(query, after)\
+            .order('user_id')\
+            .order('id')\
+            .limit(limit)\
+            .execute()
+        
+        return result.data if result.data else []
+    
+    @timed("supabase")
+    async def get_subscription(self, subscription_id: str) -> Optional[Dict]:
+        """Get a subscription by ID"""
+        if not self.enabled:
+            return None
+        
+        result = self.client.table('subscriptions').select("*").eq('id', subscription_id).execute()
+        return result.data[0] if result.data else None
+    
+    @timed("supabase")
+    async def get_subscriptions_by_ids(self, subscription_ids: List[str]) -> List[Dict]:
+        """Fetch active subscriptions by ID"""
+        if not self.enabled or not subscription_ids:
+            return []
+        
+        # in_() goes into the GET URL; keep each request well under proxy/PostgREST URL limits
+        rows = []
+        for start in range(0, len(subscription_ids), IDS_PER_QUERY):
+            result = self.client.table('subscriptions')\
+                .select("*")\
+                .in_('id', subscription_ids[start:start + IDS_PER_QUERY])\
+                .eq('status', 'active')\
+                .execute()
+            rows.extend(result.data or [])
+        
+        rows.sort(key=lambda row: row['user_id'])
+        return rows
+    
+    @timed("supabase")
     async def update_subscription(self, subscription_id: str, updates: Dict) -> Dict:
         """Update subscription details"""
         if not self.enabled:
             return updates
         
         result = self.client.table('subscriptions').update(updates).eq('id', subscription_id).execute()
-        return result.data[0] if result.data else updates
+        subscription = result.data[0] if result.data else None
+        if subscription is not None and ('next_charge_date' in updates or 'status' in updates):
+            self._sync_calendar(subscription)
+        return subscription or updates
     
+    @timed("supabase")
     async def kill_subscription(self, subscription_id: str, user_id: str) -> Dict:
         """Mark subscription as killed and create kill history"""
         if not self.enabled:
@@ -136,6 +296,7 @@ class DatabaseService:
         }
         
         self.client.table('kill_history').insert(kill_data).execute()
+        self._sync_calendar({**subscription, "status": "killed"})
         
         return {
             "status": "killed",
@@ -143,8 +304,25 @@ class DatabaseService:
             "subscription": subscription
         }
     
+    def _sync_calendar(self, subscription: Dict) -> None:
+        """Write a subscription's next charge through to the renewal calendar"""
+        try:
+            charge_date = subscription.get('next_charge_date')
+            if subscription.get('status', 'active') == 'active' and charge_date:
+                renewal_calendar.schedule(subscription['id'], date.fromisoformat(str(charge_date)[:10]))
+            else:
+                renewal_calendar.unschedule(subscription['id'])
+        except Exception as e:
+            # A calendar missing this write must not be trusted; alerts fall back to the DB
+            print(f"⚠️  Renewal calendar write failed: {e}")
+            try:
+                renewal_calendar.invalidate()
+            except Exception:
+                pass
+    
     # --- VIRTUAL CARDS ---
     
+    @timed("supabase")
     async def save_virtual_card(
         self,
         user_id: str,
@@ -171,6 +349,7 @@ class DatabaseService:
         result = self.client.table('virtual_cards').insert(data).execute()
         return result.data[0] if result.data else data
     
+    @timed("supabase")
     async def get_virtual_card(self, card_id: str) -> Optional[Dict]:
         """Get virtual card by Lithic card ID"""
         if not self.enabled:
@@ -179,6 +358,7 @@ class DatabaseService:
         result = self.client.table('virtual_cards').select("*").eq('lithic_card_id', card_id).execute()
         return result.data[0] if result.data else None
     
+    @timed("supabase")
     async def update_card_status(self, card_id: str, status: str) -> Dict:
         """Update virtual card status"""
         if not self.enabled:
@@ -193,6 +373,7 @@ class DatabaseService:
     
     # --- TRANSACTIONS ---
     
+    @timed("supabase")
     async def save_transaction(
         self,
         card_id: str,
@@ -200,13 +381,15 @@ class DatabaseService:
         merchant: str,
         status: str,
         transaction_id: str,
-        metadata: Dict = None
+        metadata: Dict = None,
+        user_id: Optional[str] = None
     ) -> Dict:
         """Save transaction record"""
         if not self.enabled:
             return {"id": transaction_id}
         
         data = {
+            "user_id": user_id,
             "card_id": card_id,
             "transaction_id": transaction_id,
             "amount": amount,
@@ -219,6 +402,7 @@ class DatabaseService:
         result = self.client.table('transactions').insert(data).execute()
         return result.data[0] if result.data else data
     
+    @timed("supabase")
     async def get_card_transactions(self, card_id: str, limit: int = 50) -> List[Dict]:
         """Get transactions for a card"""
         if not self.enabled:
@@ -233,8 +417,127 @@ class DatabaseService:
         
         return result.data if result.data else []
     
+    @timed("supabase")
+    async def get_transactions_page(
+        self,
+        since: datetime,
+        limit: int = 10000,
+        after: Optional[Tuple[str, Any]] = None
+    ) -> List[Dict]:
+        """Page through transactions since a date, ordered by (user_id, id)"""
+        if not self.enabled:
+            return []
+        
+        query = self.client.table('transactions')\
+            .select("id,user_id,merchant,amount,created_at")\
+            .gte('created_at', since.isoformat())
+        result = keyset_after(query, after)\
+            .order('user_id')\
+            .order('id')\
+            .limit(limit)\
+            .execute()
+        
+        return result.data if result.data else []
+
+    @timed("supabase")
+    async def upsert_transactions(self, rows: List[Dict]) -> int:
+        """Bulk insert-or-update transaction rows keyed by transaction_id"""
+        if not self.enabled or not rows:
+            return 0
+
+        self.client.table('transactions').upsert(rows, on_conflict='transaction_id').execute()
+        return len(rows)
+
+    @timed("supabase")
+    async def delete_transactions(self, transaction_ids: List[str]) -> int:
+        """Bulk delete transactions by transaction_id"""
+        if not self.enabled or not transaction_ids:
+            return 0
+
+        self.client.table('transactions').delete().in_('transaction_id', transaction_ids).execute()
+        return len(transaction_ids)
+
+    # --- PLAID ITEMS ---
+
+    @timed("supabase")
+    async def save_plaid_item(
+        self,
+        user_id: str,
+        item_id: str,
+        access_token: str,
+        institution_name: Optional[str] = None
+    ) -> Dict:
+        """Save a linked Plaid item (re-linking the same item keeps its sync cursor)"""
+        data = {
+            "item_id": item_id,
+            "user_id": user_id,
+            "institution_name": institution_name,
+            "updated_at": datetime.utcnow().isoformat()
+        }
+        if not self.enabled:
+            return data
+
+        # Only ciphertext reaches the table; callers never get the token back from here
+        result = self.client.table('plaid_items').upsert(
+            {**data, "access_token_encrypted": token_cipher.encrypt(access_token)}, on_conflict='item_id'
+        ).execute()
+        saved = dict(result.data[0]) if result.data else data
+        saved.pop("access_token_encrypted", None)
+        return saved
+
+    @timed("supabase")
+    async def get_plaid_item(self, item_id: str) -> Optional[Dict]:
+        """Get a Plaid item with its (decrypted) access token and sync cursor"""
+        if not self.enabled:
+            return None
+
+        result = self.client.table('plaid_items').select("*").eq('item_id', item_id).execute()
+        if not result.data:
+            return None
+        item = dict(result.data[0])
+        item["access_token"] = token_cipher.decrypt(item.pop("access_token_encrypted"))
+        return item
+
+    @timed("supabase")
+    async def get_plaid_items(self, limit: int = 1000, offset: int = 0) -> List[Dict]:
+        """Page through linked Plaid items"""
+        if not self.enabled:
+            return []
+
+        result = self.client.table('plaid_items')\
+            .select("item_id,user_id")\
+            .order('item_id')\
+            .range(offset, offset + limit - 1)\
+            .execute()
+
+        return result.data if result.data else []
+
+    @timed("supabase")
+    async def get_user_plaid_items(self, user_id: str) -> List[Dict]:
+        """A user's linked Plaid items"""
+        if not self.enabled:
+            return []
+
+        result = self.client.table('plaid_items').select("item_id,user_id").eq('user_id', user_id).execute()
+        return result.data if result.data else []
+
+    @timed("supabase")
+    async def update_plaid_cursor(self, item_id: str, cursor: str) -> Dict:
+        """Persist the /transactions/sync cursor after a complete sync"""
+        if not self.enabled:
+            return {"cursor": cursor}
+
+        result = self.client.table('plaid_items').update({
+            "cursor": cursor,
+            "last_synced_at": datetime.utcnow().isoformat(),
+            "updated_at": datetime.utcnow().isoformat()
+        }).eq('item_id', item_id).execute()
+
+        return result.data[0] if result.data else {"cursor": cursor}
+
     # --- ANALYTICS ---
     
+    @timed("supabase")
     async def get_user_stats(self, user_id: str) -> Dict:
         """Get user statistics"""
         if not self.enabled:
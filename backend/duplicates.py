@@ -0,0 +1,91 @@
+"""
+Duplicate-subscription detection.
+Groups a portfolio by canonical vendor and category (via the signature
+database) in one hashing pass, flagging vendors paid for more than once,
+typically through two cards or banks.
+"""
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from signatures import detect_subscription_metadata, normalize_currency
+
+CURRENCY_CODES = {"$": "USD", "£": "GBP", "₦": "NGN"}
+
+# Billing cycle -> charges per month ('period' as named by recurring.PERIODS)
+CHARGES_PER_MONTH = {"weekly": 52 / 12, "monthly": 1.0, "quarterly": 1 / 3, "annual": 1 / 12, "yearly": 1 / 12}
+
+
+@lru_cache(maxsize=8192)
+def canonical_vendor(name: str) -> Tuple[str, str]:
+    """Subscription name -> (vendor, category); unknown names group by lower-cased name"""
+    vendor, meta = detect_subscription_metadata(name)
+    if meta["category"] == "Other":
+        vendor = " ".join(name.lower().split())
+    return vendor, meta["category"]
+
+
+def payment_source(subscription: Dict) -> Optional[str]:
+    """Card or bank the subscription is charged to, if known"""
+    metadata = subscription.get('metadata') or {}
+    for field in ('payment_method', 'bank_name'):
+        value = subscription.get(field) or metadata.get(field)
+        if value:
+            return value
+    return None
+
+
+def monthly_price(subscription: Dict) -> float:
+    """Price per month: annual and weekly plans are scaled by their billing cycle"""
+    price = float(subscription.get('price', 0))
+    metadata = subscription.get('metadata') or {}
+    for field in ('billing_cycle', 'period'):
+        cycle = subscription.get(field) or metadata.get(field)
+        if cycle:
+            return price * CHARGES_PER_MONTH.get(str(cycle).lower(), 1.0)
+    return price
+
+
+def find_duplicate_groups(subscriptions: Iterable[Dict]) -> List[Dict]:
+    """
+    One group per (user, vendor, category) with two or more active subscriptions.
+    Each group: user_id, vendor, category, subscriptions (most expensive first),
+    sources, monthly_total and potential_savings (all but the cheapest), per
+    month whatever each plan's billing cycle, in the shared currency or USD
+    when currencies differ.
+    """
+    groups: Dict[Tuple, List[Dict]] = {}
+    for sub in subscriptions:
+        if sub.get('status', 'active') != 'active':
+            continue
+        vendor, category = canonical_vendor(sub.get('name', 'Unknown'))
+        groups.setdefault((sub.get('user_id'), vendor, category), []).append(sub)
+
+    duplicates = []
+    for (user_id, vendor, category), subs in groups.items():
+        if len(subs) < 2:
+            continue
+
+        currencies = {sub.get('currency', '$') for sub in subs}
+        if len(currencies) == 1:
+            currency = currencies.pop()
+            prices = [monthly_price(sub) for sub in subs]
+        else:
+            currency = "$"
+            prices = [
+                normalize_currency(monthly_price(sub), CURRENCY_CODES.get(sub.get('currency', '$'), 'USD'))
+                for sub in subs
+            ]
+
+        ranked = sorted(zip(prices, subs), key=lambda pair: pair[0], reverse=True)
+        duplicates.append({
+            "user_id": user_id,
+            "vendor": vendor,
+            "category": category,
+            "subscriptions": [sub for _, sub in ranked],
+            "sources": sorted({source for source in map(payment_source, subs) if source}),
+            "currency": currency,
+            "monthly_total": sum(prices),
+            "potential_savings": sum(prices) - min(prices),
+        })
+
+    return duplicates
@@ -0,0 +1,158 @@
+"""
+Gmail message body extraction.
+Walks the payload MIME tree, base64url-decodes only text/plain and text/html
+parts (capped per message) and strips HTML with a streaming parser.
+"""
+import base64
+import binascii
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Tuple
+
+# Receipts fit comfortably in this; marketing emails get truncated
+MAX_BODY_BYTES = 64 * 1024
+
+TEXT_TYPES = ('text/plain', 'text/html')
+
+# Content of these tags is never visible text
+SKIP_TAGS = {'script', 'style', 'head', 'title', 'noscript', 'template'}
+
+# Tags that should separate text so words don't run together
+BLOCK_TAGS = {
+    'p', 'div', 'br', 'tr', 'td', 'th', 'li', 'table', 'section', 'article',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'footer', 'hr',
+}
+
+CHARSET_RE = re.compile(r'charset="?([\w-]+)"?', re.IGNORECASE)
+WHITESPACE_RE = re.compile(r'[ \t\r\f\v]+')
+BLANK_LINES_RE = re.compile(r'\n\s*\n+')
+
+FEED_CHUNK = 8192
+
+
+class _TextExtractor(HTMLParser):
+    """Collects visible text from HTML fed in chunks, stopping at max_chars"""
+
+    def __init__(self, max_chars: int):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.parts: List[str] = []
+        self.size = 0
+        self.skip_depth = 0
+        self.full = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._append('\n')
+        elif tag == 'a':
+            # Keep hrefs so cancellation links survive stripping
+            href = dict(attrs).get('href')
+            if href and href.startswith('http'):
+                self._append(f' {href} ')
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+        elif tag in BLOCK_TAGS:
+            self._append('\n')
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self._append(data)
+
+    def _append(self, text: str):
+        if self.full:
+            return
+        remaining = self.max_chars - self.size
+        if len(text) >= remaining:
+            text = text[:remaining]
+            self.full = True
+        self.parts.append(text)
+        self.size += len(text)
+
+
+def html_to_text(html: str, max_chars: int = MAX_BODY_BYTES) -> str:
+    """Strip tags from HTML without building a tree"""
+    parser = _TextExtractor(max_chars)
+    for start in range(0, len(html), FEED_CHUNK):
+        parser.feed(html[start:start + FEED_CHUNK])
+        if parser.full:
+            break
+    # No close(): a tag cut off by the byte cap must not be flushed as text
+    return normalize_whitespace(''.join(parser.parts))
+
+
+def normalize_whitespace(text: str) -> str:
+    text = WHITESPACE_RE.sub(' ', text)
+    return BLANK_LINES_RE.sub('\n', text).strip()
+
+
+def decode_part_data(data: str, max_bytes: int = MAX_BODY_BYTES) -> bytes:
+    """base64url-decode at most max_bytes of a part's data"""
+    # Every 4 base64 chars yield 3 bytes, so only decode the prefix we need
+    max_chars = -(-max_bytes // 3) * 4
+    chunk = data[:max_chars]
+    chunk += '=' * (-len(chunk) % 4)
+    try:
+        return base64.urlsafe_b64decode(chunk)[:max_bytes]
+    except (binascii.Error, ValueError):
+        return b''
+
+
+def _charset(part: Dict) -> str:
+    for header in part.get('headers', []):
+        if header.get('name', '').lower() == 'content-type':
+            match = CHARSET_RE.search(header.get('value', ''))
+            if match:
+                return match.group(1)
+    return 'utf-8'
+
+
+def find_text_parts(payload: Dict) -> List[Tuple[str, Dict]]:
+    """Depth-first list of (mime_type, part) for inline text parts"""
+    found = []
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        mime_type = part.get('mimeType', '').lower()
+
+        if mime_type.startswith('multipart/'):
+            # Reverse so parts come off the stack in document order
+            stack.extend(reversed(part.get('parts', [])))
+        elif mime_type in TEXT_TYPES and part.get('body', {}).get('data') and not part.get('filename'):
+            found.append((mime_type, part))
+
+    return found
+
+
+def extract_body(payload: Dict, max_bytes: int = MAX_BODY_BYTES) -> str:
+    """
+    Plain-text body of a Gmail message payload (format='full').
+    Prefers text/plain; falls back to stripped text/html. Attachments and
+    parts only reachable via attachmentId are never fetched or decoded.
+    """
+    parts = find_text_parts(payload)
+    if not parts:
+        return ''
+
+    plain = [p for mime, p in parts if mime == 'text/plain']
+    chosen = plain or [p for mime, p in parts if mime == 'text/html']
+    is_html = not plain
+
+    texts = []
+    budget = max_bytes
+    for part in chosen:
+        if budget <= 0:
+            break
+        raw = decode_part_data(part['body']['data'], budget)
+        budget -= len(raw)
+        charset = _charset(part)
+        try:
+            text = raw.decode(charset, errors='replace')
+        except LookupError:
+            text = raw.decode('utf-8', errors='replace')
+        texts.append(html_to_text(text, max_bytes) if is_html else normalize_whitespace(text))
+
+    return '\n'.join(t for t in texts if t)
@@ -4,11 +4,18 @@ Detects subscriptions, trials, renewals, and cancellation links from Gmail
 """
 
 import re
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 from typing import List, Dict, Optional, Tuple
 import base64
 from email.utils import parsedate_to_datetime
 
+from email_body import extract_body, MAX_BODY_BYTES
+from signatures import detect_subscription_metadata
+
+# Bump whenever extraction logic changes; cached parse results are keyed on it
+SCANNER_VERSION = "5"
+
 # Enhanced subscription detection patterns
 TRIAL_PATTERNS = [
     r'trial\s+(?:period\s+)?(?:ends?|expires?|ending)',
@@ -38,6 +45,17 @@ CANCELLATION_PATTERNS = [
     r'https?://[^\s]+(?:cancel|unsubscribe|settings|account|manage)',
 ]
 
+# Month tokens as they appear in RENEWAL_PATTERNS captures ("Jan", "January", "Sept")
+MONTHS = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6,
+    'july': 7, 'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12,
+    'sept': 9,
+}
+MONTHS.update({name[:3]: num for name, num in list(MONTHS.items())})
+
+# "<month> <day>[,] [year]" - the shape every RENEWAL_PATTERNS group captures
+RENEWAL_DATE_RE = re.compile(r'([A-Za-z]+)\.?\s+(\d{1,2})(?:st|nd|rd|th)?,?(?:\s+(\d{4}))?')
+
 # Service-specific cancellation URLs
 KNOWN_CANCEL_URLS = {
     'netflix': 'https://www.netflix.com/cancelplan',
@@ -117,10 +135,8 @@ class EnhancedEmailScanner:
             match = re.search(pattern, combined_text, re.IGNORECASE)
             if match:
                 try:
-                    date_str = match.group(1)
-                    # Try to parse the date
-                    # This is a simplified version - production would use dateutil
-                    return date_str
+                    # Raw capture; parse_renewal_date() turns it into a date
+                    return match.group(1)
                 except (IndexError, ValueError):
                     continue
         
@@ -216,14 +232,65 @@ class EnhancedEmailScanner:
         return None
 
 
-def calculate_days_until(date_str: str) -> int:
-    """Calculate days until a given date string"""
+@lru_cache(maxsize=256)
+def month_number(token: str) -> Optional[int]:
+    """Resolve a full month name, a three-letter abbreviation or "sept" to 1-12"""
+    # Exact match only: prefix matching read "Decent" and "Mayday" as months
+    return MONTHS.get(token.lower())
+
+
+@lru_cache(maxsize=8192)
+def _split_renewal_date(date_str: str) -> Optional[Tuple[int, int, Optional[int]]]:
+    """Parse a renewal string into (month, day, year-or-None); cached per distinct string"""
+    match = RENEWAL_DATE_RE.match(date_str.strip())
+    if not match:
+        return None
+    
+    month = month_number(match.group(1))
+    day = int(match.group(2))
+    if not month or not 1 <= day <= 31:
+        return None
+    
+    year = int(match.group(3)) if match.group(3) else None
+    return month, day, year
+
+
+def parse_renewal_date(date_str: str, reference: Optional[date] = None) -> Optional[date]:
+    """
+    Parse dates like "Jan 5, 2026", "January 5 2026" or "January 5".
+    Without a year, picks the first occurrence on or after the reference date
+    (the email's date, or today) since renewal emails point forward.
+    """
+    if not date_str:
+        return None
+    
+    parts = _split_renewal_date(date_str)
+    if not parts:
+        return None
+    
+    month, day, year = parts
+    reference = reference or date.today()
+    
     try:
-        # This is simplified - production would use proper date parsing
-        # For now, return a mock value
-        return 7
-    except:
+        if year is not None:
+            return date(year, month, day)
+        
+        candidate = date(reference.year, month, day)
+        if candidate < reference:
+            candidate = date(reference.year + 1, month, day)
+        return candidate
+    except ValueError:
+        # e.g. Feb 30, or Feb 29 in a non-leap year
+        return None
+
+
+def calculate_days_until(date_str: str, reference: Optional[date] = None, today: Optional[date] = None) -> int:
+    """Calculate days until a given date string"""
+    parsed = parse_renewal_date(date_str, reference)
+    if parsed is None:
         return 30
+    
+    return (parsed - (today or date.today())).days
 
 
 def should_alert_user(email_type: str, days_remaining: Optional[int]) -> Tuple[bool, str]:
@@ -244,3 +311,74 @@ def should_alert_user(email_type: str, days_remaining: Optional[int]) -> Tuple[b
         return True, "Renewal coming up"
     
     return False, ""
+
+
+def _header(headers: List[Dict], name: str, default: str = '') -> str:
+    return next((h['value'] for h in headers if h['name'].lower() == name.lower()), default)
+
+
+def analyze_gmail_message(message: Dict, max_body_bytes: int = MAX_BODY_BYTES) -> Dict:
+    """
+    Turn a Gmail API message (format='full') into Subscription fields, minus
+    days_remaining: the result holds only what the message itself says (renewal
+    date, trial length, sent date), so it can be cached and run in worker
+    processes. with_days_remaining() finishes it against today's date.
+    """
+    payload = message.get('payload', {})
+    headers = payload.get('headers', [])
+    subject = _header(headers, 'Subject')
+    from_name = _header(headers, 'From').split('<')[0].strip().strip('"')
+    date_header = _header(headers, 'Date')
+    body = extract_body(payload, max_body_bytes) or message.get('snippet', '')
+    
+    # Intelligence Logic: Identify Service & Map Deep Links
+    refined_name, meta = detect_subscription_metadata(from_name)
+    scanner = EnhancedEmailScanner
+    
+    price, currency = scanner.extract_price(f"{subject} {body}")
+    is_trial, trial_days = scanner.detect_trial(subject, body)
+    
+    # Years are inferred relative to when the email was sent
+    try:
+        sent_on = parsedate_to_datetime(date_header).date()
+    except (TypeError, ValueError):
+        sent_on = None
+    renewal_str = scanner.extract_renewal_date(subject, body)
+    renewal = parse_renewal_date(renewal_str, reference=sent_on) if renewal_str else None
+    
+    return {
+        "id": message['id'],
+        "name": refined_name,
+        "price": price if price is not None else 0.0,
+        "currency": currency or "$",
+        "date": date_header,
+        "category": meta["category"],
+        "renewal_date": renewal.strftime("%b %d, %Y") if renewal else None,
+        "cancel_url": meta["cancel_url"] or scanner.extract_cancellation_link(refined_name, body),
+        "is_trial": is_trial,
+        "status": "active",
+        "payment_method": scanner.extract_payment_method(body) or "Linked Card",
+        "email_type": scanner.categorize_email_type(subject, body),
+        "trial_days": trial_days if is_trial else None,
+        "sent_date": sent_on.isoformat() if sent_on else None,
+    }
+
+
+def with_days_remaining(analysis: Dict, today: Optional[date] = None) -> Dict:
+    """analyze_gmail_message() output -> Subscription fields with days_remaining as of today"""
+    today = today or date.today()
+    fields = dict(analysis)
+    trial_days = fields.pop("trial_days", None)
+    sent_date = fields.pop("sent_date", None)
+    
+    if fields.get("renewal_date"):
+        days_remaining = (datetime.strptime(fields["renewal_date"], "%b %d, %Y").date() - today).days
+    elif trial_days is not None:
+        # "ends in 7 days" counts from when the email was sent
+        ends = date.fromisoformat(sent_date) + timedelta(days=trial_days) if sent_date else None
+        days_remaining = (ends - today).days if ends else trial_days
+    else:
+        days_remaining = 30
+    
+    fields["days_remaining"] = max(days_remaining, 0)
+    return fields
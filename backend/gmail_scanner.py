@@ -0,0 +1,123 @@
+"""
+Gmail mailbox scanning shared by the API and Celery workers.
+Lists candidate messages, skips ones already analyzed (parse cache) and
+runs analyze_gmail_message on the rest. Date-relative fields are added
+(with_days_remaining) on the way out, never in what gets cached. An optional
+on_result callback receives each result as soon as it is available (cached
+ones first), for progress streaming.
+"""
+import threading
+from typing import Callable, Dict, List, Optional
+
+from email_scanner import analyze_gmail_message, with_days_remaining
+from parse_cache import parse_cache, content_hash, ParsedEmailCache
+from request_timing import track
+
+# Regex-ready query for common subscription keywords
+SUBSCRIPTION_QUERY = "subject:(subscription OR receipt OR invoice OR \"next bill\" OR \"trial\" OR \"renewal\" OR \"billing\")"
+
+SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
+
+# on_result(result, done, total)
+ResultCallback = Callable[[Dict, int, int], None]
+
+
+def build_gmail_service(creds):
+    """Gmail API client for the given OAuth credentials"""
+    from googleapiclient.discovery import build
+    return build('gmail', 'v1', credentials=creds, cache_discovery=False)
+
+
+def credentials_from_token(token_info: Dict):
+    """OAuth credentials from a stored authorized-user token dict"""
+    from google.oauth2.credentials import Credentials
+    return Credentials.from_authorized_user_info(token_info, SCOPES)
+
+
+def list_message_ids(service, query: str = SUBSCRIPTION_QUERY, max_results: int = 20) -> List[str]:
+    with track("gmail"):
+        results = service.users().messages().list(userId='me', q=query, maxResults=max_results).execute()
+    return [m['id'] for m in results.get('messages', [])]
+
+
+def scan_mailbox(
+    service,
+    query: str = SUBSCRIPTION_QUERY,
+    max_results: int = 20,
+    cache: Optional[ParsedEmailCache] = parse_cache,
+    on_result: Optional[ResultCallback] = None
+) -> List[Dict]:
+    """Analyze subscription emails, reusing cached results for messages seen before"""
+    message_ids = list_message_ids(service, query, max_results)
+    cached = cache.get_many(message_ids) if cache else {}
+    done = _report_cached(message_ids, cached, on_result)
+
+    fresh = []
+    for message_id in message_ids:
+        if message_id in cached:
+            continue
+        with track("gmail"):
+            m = service.users().messages().get(userId='me', id=message_id, format='full').execute()
+        fresh.append((message_id, analyze_gmail_message(m), content_hash(m)))
+        if on_result:
+            done += 1
+            on_result(with_days_remaining(fresh[-1][1]), done, len(message_ids))
+
+    if cache:
+        cache.set_many(fresh)
+
+    analyzed = {mid: result for mid, result, _ in fresh}
+    # Keep Gmail's ordering (newest first)
+    return [with_days_remaining(cached.get(mid) or analyzed[mid]) for mid in message_ids]
+
+
+def scan_mailbox_parallel(
+    creds,
+    pipeline,
+    query: str = SUBSCRIPTION_QUERY,
+    max_results: int = 500,
+    cache: Optional[ParsedEmailCache] = parse_cache,
+    on_result: Optional[ResultCallback] = None
+) -> List[Dict]:
+    """
+    scan_mailbox for big mailboxes: fetches overlap with analysis in
+    an AnalysisPipeline's process pool.
+    """
+    message_ids = list_message_ids(build_gmail_service(creds), query, max_results)
+    cached = cache.get_many(message_ids) if cache else {}
+    done = _report_cached(message_ids, cached, on_result)
+
+    # googleapiclient services aren't thread-safe; one per fetch thread
+    local = threading.local()
+
+    def fetch(message_id: str) -> Dict:
+        if not hasattr(local, 'service'):
+            local.service = build_gmail_service(creds)
+        return local.service.users().messages().get(userId='me', id=message_id, format='full').execute()
+
+    uncached = [mid for mid in message_ids if mid not in cached]
+    fresh = []
+    # Chunks are yielded as they complete, so results stream out during the scan
+    for analyzed in pipeline.run(uncached, fetch):
+        fresh.append(analyzed)
+        if on_result:
+            done += 1
+            on_result(with_days_remaining(analyzed[1]), done, len(message_ids))
+
+    if cache:
+        cache.set_many(fresh)
+
+    analyzed = {mid: result for mid, result, _ in fresh}
+    return [with_days_remaining(cached.get(mid) or analyzed[mid]) for mid in message_ids]
+
+
+def _report_cached(message_ids: List[str], cached: Dict[str, Dict], on_result: Optional[ResultCallback]) -> int:
+    """Hand cached results to on_result before any fetching starts; returns how many"""
+    if not on_result:
+        return 0
+    done = 0
+    for message_id in message_ids:
+        if message_id in cached:
+            done += 1
+            on_result(with_days_remaining(cached[message_id]), done, len(message_ids))
+    return done
@@ -0,0 +1,196 @@
+"""
+Idempotency keys for side-effecting endpoints.
+A client sends the same Idempotency-Key header on every retry of one action.
+The first request claims the key in Redis and runs; its response is stored
+and replayed to later duplicates, and duplicates that arrive while it is
+still running wait for it instead of running again. Falls back to
+per-process records while Redis is unavailable. Responses carrying secrets
+store a reference instead (`store_as`) and are rebuilt on replay (`replay`).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException, Response
+from fastapi.encoders import jsonable_encoder
+
+from cache import cache, CacheService
+from request_timing import track
+
+# Stored responses are replayed for this long
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', str(24 * 3600)))
+# A claim from a process that died mid-request expires after this; also how
+# long a duplicate waits for the in-flight request before answering 409
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv('IDEMPOTENCY_LOCK_SECONDS', '30'))
+# How often a duplicate re-reads a claim held by another process
+IDEMPOTENCY_POLL_SECONDS = 0.05
+MAX_KEY_LENGTH = 255
+
+PENDING, DONE = "pending", "done"
+
+
+def fingerprint(payload: Any) -> str:
+    """Stable hash of a request's parameters; a key may only be reused for the same request"""
+    encoded = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Claims and stored responses per (scope, key), shared across processes through Redis"""
+
+    def __init__(
+        self,
+        cache_service: CacheService = cache,
+        prefix: str = "idempotency",
+        ttl: int = IDEMPOTENCY_TTL,
+        lock_seconds: float = IDEMPOTENCY_LOCK_SECONDS,
+        local_size: int = 10000
+    ):
+        self.cache = cache_service
+        self.prefix = prefix
+        self.ttl = ttl
+        self.lock_seconds = lock_seconds
+        self.local_size = local_size
+        # Requests running in this process: duplicates here await these instead of polling
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Fallback records: key -> (expires at, record)
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @property
+    def redis(self):
+        return self.cache.client if self.cache.enabled else None
+
+    async def run(
+        self,
+        scope: str,
+        key: Optional[str],
+        payload: Any,
+        handler: Callable[[], Awaitable[Any]],
+        response: Optional[Response] = None,
+        store_as: Optional[Callable[[Any], Any]] = None,
+        replay: Optional[Callable[[Any], Awaitable[Any]]] = None
+    ) -> Any:
+        """
+        handler() once per (scope, key). Duplicates get the stored result (with an
+        Idempotent-Replayed header), 422 if the key was used for a different
+        payload, or 409 if the first request is still running after lock_seconds.
+        Without a key the handler simply runs. `store_as(result)` is what gets
+        stored, and `replay(stored)` turns it back into a response.
+        """
+        if not key:
+            return await handler()
+        if len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Idempotency-Key longer than {MAX_KEY_LENGTH} characters")
+
+        record_key = f"{self.prefix}:{scope}:{key}"
+        request_hash = fingerprint(payload)
+        deadline = time.monotonic() + self.lock_seconds
+
+        while True:
+            inflight = self._inflight.get(record_key)
+            if inflight is not None:
+                try:
+                    await asyncio.wait_for(asyncio.shield(inflight), max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    self._in_progress()
+                continue
+
+            owner = uuid.uuid4().hex
+            record = self._claim(record_key, request_hash, owner)
+            if record is None:
+                return await self._execute(record_key, request_hash, owner, handler, store_as)
+
+            if record["fingerprint"] != request_hash:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+            if record["state"] == DONE:
+                if response is not None:
+                    response.headers["Idempotent-Replayed"] = "true"
+                return await replay(record["body"]) if replay else record["body"]
+
+            # Claimed by another process: wait for its result (or for the claim to be released)
+            if time.monotonic() >= deadline:
+                self._in_progress()
+            await asyncio.sleep(IDEMPOTENCY_POLL_SECONDS)
+
+    async def _execute(self, record_key: str, request_hash: str, owner: str, handler, store_as) -> Any:
+        done = asyncio.get_running_loop().create_future()
+        self._inflight[record_key] = done
+        try:
+            result = await handler()
+        except BaseException:
+            # Failures aren't stored: the next retry runs the action again
+            self._release(record_key, owner)
+            raise
+        else:
+            body = jsonable_encoder(store_as(result) if store_as else result)
+            self._store(record_key, {"state": DONE, "fingerprint": request_hash, "body": body})
+            return result
+        finally:
+            del self._inflight[record_key]
+            done.set_result(None)
+
+    def _claim(self, record_key: str, request_hash: str, owner: str) -> Optional[Dict]:
+        """None if this request now owns the key, else the existing record"""
+        pending = {"state": PENDING, "fingerprint": request_hash, "owner": owner}
+        redis = self.redis
+        if redis:
+            try:
+                with track("redis"):
+                    if redis.set(record_key, json.dumps(pending), nx=True, px=int(self.lock_seconds * 1000)):
+                        return None
+                    value = redis.get(record_key)
+                # Released or expired between the two calls: claim again
+                return json.loads(value) if value else self._claim(record_key, request_hash, owner)
+            except Exception as e:
+                print(f"Idempotency store error: {e}")
+
+        entry = self._local.get(record_key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        # The caller registers its in-flight future before awaiting, so no one else can claim in between
+        return None
+
+    def _store(self, record_key: str, record: Dict) -> None:
+        redis = self.redis
+        if redis:
+            try:
+                with track("redis"):
+                    redis.set(record_key, json.dumps(record), ex=self.ttl)
+                return
+            except Exception as e:
+                print(f"Idempotency store error: {e}")
+
+        self._local[record_key] = (time.monotonic() + self.ttl, record)
+        self._local.move_to_end(record_key)
+        if len(self._local) > self.local_size:
+            self._local.popitem(last=False)
+
+    def _release(self, record_key: str, owner: str) -> None:
+        redis = self.redis
+        if not redis:
+            return
+        try:
+            with track("redis"):
+                value = redis.get(record_key)
+                # Only our own claim; after lock_seconds it may belong to someone else
+                if value and json.loads(value).get("owner") == owner:
+                    redis.delete(record_key)
+        except Exception as e:
+            print(f"Idempotency store error: {e}")
+
+    @staticmethod
+    def _in_progress():
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still in progress",
+            headers={"Retry-After": "1"},
+        )
+
+
+# Global instance
+idempotency = IdempotencyStore()
@@ -0,0 +1,258 @@
+"""
+Streaming leak detection over the card transaction stream.
+Each card keeps a compact sliding window of recent authorizations (one Redis
+hash field per transaction, expiring with the window). Every event re-scores
+only that card's window for $0 verification auths, lingering authorization
+holds and trial-to-paid conversions, and stores the card's leaks so
+/global-scan reads precomputed results instead of scanning history.
+"""
+import json
+import re
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cache import cache, CacheService
+from merchants import clean_descriptor
+from signatures import resolve_vendor
+
+# How far back each card's window reaches; idle cards expire after this
+LEAK_WINDOW_DAYS = 45
+# Oldest events are dropped past this many per card
+MAX_EVENTS_PER_CARD = 64
+# Card-verification auths: $0, or a $1 hold some merchants use instead
+TRIAL_AUTH_MAX_CENTS = 100
+# A paid charge this long after a verification auth is a trial conversion
+CONVERSION_MIN_DAYS = 2
+CONVERSION_MAX_DAYS = 35
+# A pending authorization older than this that never settled or voided
+HOLD_STALE_HOURS = 72
+# Holds at or above this size are High risk whatever the merchant
+LARGE_HOLD_CENTS = 5000
+
+# Sorted set of 'user|card' scored by when the card's next open authorization goes stale
+HOLD_CHECKS_KEY = "leaks:hold_checks"
+
+RISK_ORDER = {"High": 0, "Medium": 1, "Low": 2}
+PENDING, SETTLED, VOIDED = "P", "S", "V"
+# Lithic statuses -> window status; declines never reach the window
+STATUS_CODES = {
+    "PENDING": PENDING, "SETTLED": SETTLED, "SETTLING": SETTLED, "POSTED": SETTLED,
+    "VOIDED": VOIDED, "EXPIRED": VOIDED, "BOUNCED": VOIDED,
+}
+
+_SLUG_RE = re.compile(r'[^a-z0-9_:]+')
+
+# (epoch seconds, cents, status, service, known subscription vendor 0/1)
+Event = Tuple[int, int, str, str, int]
+
+
+def _epoch(value) -> int:
+    if value is None:
+        return int(time.time())
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def event_from_lithic(payload: Dict) -> Optional[Dict]:
+    """Lithic transaction webhook payload -> detector event (None for declines)"""
+    status = STATUS_CODES.get((payload.get('status') or '').upper())
+    if status is None or payload.get('result', 'APPROVED') != 'APPROVED':
+        return None
+    return {
+        "card_id": payload.get('card_token'),
+        "transaction_id": payload.get('token'),
+        "cents": int(payload.get('amount') or 0),
+        "merchant": (payload.get('merchant') or {}).get('descriptor', 'Unknown'),
+        "status": status,
+        "timestamp": _epoch(payload.get('created')),
+    }
+
+
+@lru_cache(maxsize=16384)
+def service_of(merchant: str) -> Tuple[str, int]:
+    """Descriptor -> (display name, 1 if a known subscription vendor)"""
+    vendor = resolve_vendor(merchant)
+    if vendor is not None:
+        return vendor, 1
+    return (clean_descriptor(merchant) or merchant).title(), 0
+
+
+def score_window(card_id: str, events: Iterable[Event], now: Optional[int] = None) -> List[Dict]:
+    """Leaks in one card's window, highest risk first"""
+    now = now or int(time.time())
+    by_service: Dict[str, List[Event]] = {}
+    for event in sorted(events):
+        by_service.setdefault(event[3], []).append(event)
+
+    source = f"Card {card_id[-4:]}"
+    leaks = []
+    for service, events in by_service.items():
+        known = events[0][4]
+        # Verification auths count even once reversed; voided charges never do
+        trial_auths = [e for e in events if e[1] <= TRIAL_AUTH_MAX_CENTS]
+        charges = [e for e in events if e[1] > TRIAL_AUTH_MAX_CENTS and e[2] != VOIDED]
+
+        if trial_auths:
+            auth_ts = trial_auths[0][0]
+            converted = [
+                e for e in charges
+                if CONVERSION_MIN_DAYS * 86400 <= e[0] - auth_ts <= CONVERSION_MAX_DAYS * 86400
+            ]
+            if converted:
+                leaks.append(_leak(source, card_id, service, "Trial Conversion", "Converted", "High", converted[0]))
+                charges = [e for e in charges if e not in converted]
+            elif not any(e[0] >= auth_ts for e in charges):
+                risk = "Medium" if known else "Low"
+                leaks.append(_leak(source, card_id, service, "Auth $0", "Trial Active", risk, trial_auths[-1]))
+
+        for event in charges:
+            if event[2] == PENDING and now - event[0] >= HOLD_STALE_HOURS * 3600:
+                risk = "High" if event[1] >= LARGE_HOLD_CENTS else "Medium" if known else "Low"
+                leaks.append(_leak(source, card_id, service, "Hold", "Suspected", risk, event))
+
+    leaks.sort(key=lambda leak: (RISK_ORDER[leak["risk"]], -leak["detected_at"]))
+    return leaks
+
+
+def _leak(source: str, card_id: str, service: str, kind: str, status: str, risk: str, event: Event) -> Dict:
+    return {
+        "id": _SLUG_RE.sub('-', f"{card_id}:{service}:{kind}".lower()),
+        "source": source,
+        "card_id": card_id,
+        "service": service,
+        "type": kind,
+        "status": status,
+        "risk": risk,
+        "amount": event[1] / 100,
+        "detected_at": event[0],
+    }
+
+
+class LeakDetector:
+    """Per-card sliding windows and per-user precomputed leaks, in Redis or in memory"""
+
+    def __init__(self, cache_service: CacheService = cache, window_days: int = LEAK_WINDOW_DAYS):
+        self.cache = cache_service
+        self.window = window_days * 86400
+        # In-memory fallback: card -> {transaction_id: event}, user -> {card: leaks},
+        # and 'user|card' -> when its oldest open authorization turns into a stale hold
+        self._windows: Dict[str, Dict[str, Event]] = {}
+        self._results: Dict[str, Dict[str, List[Dict]]] = {}
+        self._hold_checks: Dict[str, int] = {}
+
+    @property
+    def redis(self):
+        return self.cache.client if self.cache.enabled else None
+
+    def ingest(self, user_id: str, event: Dict, now: Optional[int] = None) -> List[Dict]:
+        """Fold one transaction event into its card's window and refresh that card's leaks"""
+        now = now or int(time.time())
+        card_id = event['card_id']
+        # Descriptors are resolved once, on the way in
+        record = (event['timestamp'], event['cents'], event['status'], *service_of(event['merchant']))
+        redis = self.redis
+
+        if redis:
+            key = f"leaks:window:{card_id}"
+            # A status update for a known transaction overwrites its field
+            pipe = redis.pipeline()
+            pipe.hset(key, event['transaction_id'], json.dumps(record, separators=(',', ':')))
+            pipe.expire(key, self.window)
+            pipe.hgetall(key)
+            window = {tx: tuple(json.loads(value)) for tx, value in pipe.execute()[-1].items()}
+        else:
+            window = self._windows.setdefault(card_id, {})
+            window[event['transaction_id']] = record
+
+        return self._refresh(user_id, card_id, self._trim(card_id, window, now), now)
+
+    def rescore_due_holds(self, now: Optional[int] = None) -> int:
+        """Re-score cards whose open authorizations have just gone stale; run periodically"""
+        now = now or int(time.time())
+        redis = self.redis
+        if redis:
+            due = redis.zrangebyscore(HOLD_CHECKS_KEY, 0, now)
+        else:
+            due = [member for member, at in self._hold_checks.items() if at <= now]
+
+        for member in due:
+            user_id, card_id = member.split('|', 1)
+            if redis:
+                window = {tx: tuple(json.loads(v)) for tx, v in redis.hgetall(f"leaks:window:{card_id}").items()}
+            else:
+                window = self._windows.get(card_id, {})
+            self._refresh(user_id, card_id, self._trim(card_id, window, now), now)
+        return len(due)
+
+    def _trim(self, card_id: str, window: Dict[str, Event], now: int) -> Dict[str, Event]:
+        cutoff = now - self.window
+        expired = [tx for tx, e in window.items() if e[0] < cutoff]
+        if len(window) - len(expired) > MAX_EVENTS_PER_CARD:
+            oldest = sorted((e[0], tx) for tx, e in window.items() if e[0] >= cutoff)
+            expired += [tx for _, tx in oldest[:len(oldest) - MAX_EVENTS_PER_CARD]]
+        for tx in expired:
+            window.pop(tx, None)
+        if expired and self.redis:
+            self.redis.hdel(f"leaks:window:{card_id}", *expired)
+        return window
+
+    def _refresh(self, user_id: str, card_id: str, window: Dict[str, Event], now: int) -> List[Dict]:
+        leaks = score_window(card_id, window.values(), now)
+        self._store(user_id, card_id, leaks)
+
+        # Holds go stale with time, not with new events: schedule a re-score for then
+        stale = HOLD_STALE_HOURS * 3600
+        open_auths = [e[0] + stale for e in window.values()
+                      if e[2] == PENDING and e[1] > TRIAL_AUTH_MAX_CENTS and now - e[0] < stale]
+        member = f"{user_id}|{card_id}"
+        redis = self.redis
+        if open_auths:
+            if redis:
+                redis.zadd(HOLD_CHECKS_KEY, {member: min(open_auths)})
+            else:
+                self._hold_checks[member] = min(open_auths)
+        elif redis:
+            redis.zrem(HOLD_CHECKS_KEY, member)
+        else:
+            self._hold_checks.pop(member, None)
+        return leaks
+
+    def _store(self, user_id: str, card_id: str, leaks: List[Dict]):
+        redis = self.redis
+        if redis:
+            key = f"leaks:user:{user_id}"
+            if leaks:
+                redis.hset(key, card_id, json.dumps(leaks))
+                redis.expire(key, self.window)
+            else:
+                redis.hdel(key, card_id)
+            return
+
+        cards = self._results.setdefault(user_id, {})
+        if leaks:
+            cards[card_id] = leaks
+        else:
+            cards.pop(card_id, None)
+
+    def leaks(self, user_id: str) -> List[Dict]:
+        """The user's current leaks across all cards, highest risk first"""
+        redis = self.redis
+        if redis:
+            per_card = [json.loads(value) for value in redis.hgetall(f"leaks:user:{user_id}").values()]
+        else:
+            per_card = list(self._results.get(user_id, {}).values())
+
+        leaks = [leak for card_leaks in per_card for leak in card_leaks]
+        leaks.sort(key=lambda leak: (RISK_ORDER[leak["risk"]], -leak["detected_at"]))
+        return leaks
+
+
+# Global instance
+leak_detector = LeakDetector()
@@ -3,22 +3,96 @@ Centralized logging and error handling configuration.
 Integrates Sentry for error tracking and structured JSON logging.
 """
 import os
+import atexit
+import json
 import logging
+import queue
+import random
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+from logging.handlers import QueueHandler, QueueListener
 import sentry_sdk
 from pythonjsonlogger import jsonlogger
 from dotenv import load_dotenv
-from sentry_sdk.integrations.fastapi import FastApiIntegration
-from sentry_sdk.integrations.httpx import HttpxIntegration
+
+from metrics import OPERATION_DURATION, OPERATION_TOTAL, HTTP_REQUEST_DURATION
+
+try:
+    import orjson
+except ImportError:  # optional: faster JSON encoding for log records
+    orjson = None
 
 load_dotenv()
 
+# Bounded buffer between request threads and the log writer thread
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+# Once the buffer is this full, only 1 in LOG_SAMPLE_EVERY INFO/DEBUG records is kept
+LOG_HIGH_WATER = 0.8
+LOG_SAMPLE_EVERY = int(os.getenv('LOG_SAMPLE_EVERY', '10'))
+
+def _orjson_dumps(obj, default=None, **kwargs):
+    return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks the caller on a slow sink.
+    Under overload INFO/DEBUG records are sampled, then dropped; WARNING and
+    above wait briefly for space. The number of records lost is attached to
+    the next record that gets through as `dropped_records`.
+    """
+    def __init__(self, log_queue: queue.Queue, sample_every: int = LOG_SAMPLE_EVERY):
+        super().__init__(log_queue)
+        self.high_water = int(log_queue.maxsize * LOG_HIGH_WATER)
+        self.sample_every = max(sample_every, 1)
+        self.dropped = 0
+        self._seen = 0
+    
+    def prepare(self, record):
+        # Resolve %-args on the caller's thread; JSON formatting happens on the listener
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+    
+    def enqueue(self, record):
+        important = record.levelno >= logging.WARNING
+        
+        if not important and self.queue.qsize() >= self.high_water:
+            self._seen += 1
+            if self._seen % self.sample_every:
+                self.dropped += 1
+                return
+        
+        if self.dropped:
+            record.dropped_records = self.dropped
+        
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if not important:
+                self.dropped += 1
+                return
+            try:
+                self.queue.put(record, timeout=0.05)
+            except queue.Full:
+                self.dropped += 1
+                return
+        
+        self.dropped = 0
+
+_listener = None
+
 def setup_logging():
-    """Configure structured JSON logging"""
+    """Configure structured JSON logging, written off the request thread"""
+    global _listener
+    
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
     
     # Remove existing handlers
     logger.handlers = []
+    if _listener:
+        _listener.stop()
     
     # JSON formatter
     logHandler = logging.StreamHandler()
@@ -28,28 +102,200 @@ def setup_logging():
             "asctime": "timestamp",
             "levelname": "level",
             "name": "logger"
-        }
+        },
+        **({"json_serializer": _orjson_dumps} if orjson else {})
     )
     logHandler.setFormatter(formatter)
-    logger.addHandler(logHandler)
+    
+    # Callers only enqueue; the listener thread formats and writes
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    logger.addHandler(DroppingQueueHandler(log_queue))
+    _listener = QueueListener(log_queue, logHandler, respect_handler_level=True)
+    _listener.start()
     
     return logger
 
-def setup_sentry():
-    """Configure Sentry error tracking"""
+def shutdown_logging():
+    """Flush queued records; registered at exit"""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+atexit.register(shutdown_logging)
+
+def _reinit_logging_after_fork():
+    """Threads do not survive fork(): give the child its own queue and writer thread"""
+    global _listener
+    _listener = None
+    setup_logging()
+
+# Celery prefork children and preloaded app servers fork after this module is imported
+os.register_at_fork(after_in_child=_reinit_logging_after_fork)
+
+# --- TRACE SAMPLING ---
+
+# Head-sampling rate per route template in production. A dict value turns on
+# keep-slow mode for that route: every request is traced, but fast successful
+# transactions are only sent at `rate`, so slow or failing ones are never lost.
+# Override with SENTRY_ROUTE_SAMPLE_RATES='{"/scan": 0.005, "/api/v1/cards/create-virtual": {"rate": 0.2, "keep_slow": true}}'
+DEFAULT_ROUTE_SAMPLE_RATES = {
+    "/metrics": 0.0,
+    "/scan": 0.01,
+    "/global-scan": 0.01,
+    "/api/v1/resolve-card": 0.02,
+    "/api/v1/cards/create-virtual": {"rate": 0.1, "keep_slow": True},
+    "/kill-subscription/{sub_id}": {"rate": 0.1, "keep_slow": True},
+}
+
+class AdaptiveTraceSampler:
+    """
+    traces_sampler/profiles_sampler/before_send_transaction policy.
+    High-volume routes are sampled lightly; a route whose recent p99 (from
+    the /metrics histograms) crosses the slow threshold is boosted so its
+    outliers get traced while they are happening.
+    """
+    def __init__(
+        self,
+        base_rate: float = 0.05,
+        route_rates: Optional[Dict] = None,
+        slow_seconds: float = 1.0,
+        boosted_rate: float = 0.5,
+        profiles_rate: float = 0.1,
+        min_samples: int = 50
+    ):
+        self.base_rate = base_rate
+        self.slow_seconds = slow_seconds
+        self.boosted_rate = boosted_rate
+        self.profiles_rate = profiles_rate
+        self.min_samples = min_samples
+        self.policies: Dict[str, Dict] = {}
+        for route, policy in (route_rates or {}).items():
+            if not isinstance(policy, dict):
+                policy = {"rate": policy}
+            self.policies[route] = {"rate": float(policy.get("rate", base_rate)), "keep_slow": bool(policy.get("keep_slow"))}
+        self.route_resolver: Callable[[str, str], Optional[str]] = lambda method, path: path
+    
+    def set_route_resolver(self, resolver: Callable[[str, str], Optional[str]]):
+        """Map (method, raw path) to a route template; installed by the app"""
+        self.route_resolver = resolver
+    
+    def _route(self, sampling_context: Dict) -> Tuple[Optional[str], Optional[str]]:
+        scope = sampling_context.get("asgi_scope") or {}
+        if scope.get("type") != "http":
+            return None, None
+        method = scope.get("method", "GET")
+        return method, self.route_resolver(method, scope.get("path", "")) or scope.get("path")
+    
+    def _policy(self, route: Optional[str]) -> Dict:
+        return self.policies.get(route) or {"rate": self.base_rate, "keep_slow": False}
+    
+    def _recently_slow(self, method: str, route: str) -> bool:
+        if HTTP_REQUEST_DURATION.count(method=method, route=route) < self.min_samples:
+            return False
+        p99 = HTTP_REQUEST_DURATION.quantile(0.99, method=method, route=route)
+        return p99 is not None and p99 >= self.slow_seconds
+    
+    def traces_sampler(self, sampling_context: Dict) -> float:
+        # Keep distributed traces whole
+        parent_sampled = sampling_context.get("parent_sampled")
+        if parent_sampled is not None:
+            return float(parent_sampled)
+        
+        method, route = self._route(sampling_context)
+        if route is None:
+            # Celery tasks and other non-HTTP transactions
+            return self.base_rate
+        
+        policy = self._policy(route)
+        if policy["keep_slow"]:
+            return 1.0
+        if policy["rate"] and self._recently_slow(method, route):
+            return max(policy["rate"], self.boosted_rate)
+        return policy["rate"]
+    
+    def profiles_sampler(self, sampling_context: Dict) -> float:
+        # Conditional on the transaction being sampled; keep-slow routes trace
+        # everything, so scale their profiling back down to the route rate
+        _, route = self._route(sampling_context)
+        policy = self._policy(route)
+        if policy["keep_slow"]:
+            return self.profiles_rate * policy["rate"]
+        return self.profiles_rate
+    
+    def before_send_transaction(self, event: Dict, hint: Dict) -> Optional[Dict]:
+        policy = self.policies.get(event.get("transaction"))
+        if not policy or not policy["keep_slow"]:
+            return event
+        
+        status = ((event.get("contexts") or {}).get("trace") or {}).get("status", "ok")
+        duration = _event_duration(event)
+        if status != "ok" or (duration is not None and duration >= self.slow_seconds):
+            return event
+        return event if random.random() < policy["rate"] else None
+
+def _event_duration(event: Dict) -> Optional[float]:
+    start, end = event.get("start_timestamp"), event.get("timestamp")
+    if start is None or end is None:
+        return None
+    if isinstance(start, datetime):
+        return (end - start).total_seconds()
+    if isinstance(start, str):
+        return (datetime.fromisoformat(end.replace("Z", "+00:00")) - datetime.fromisoformat(start.replace("Z", "+00:00"))).total_seconds()
+    return float(end) - float(start)
+
+def _route_sample_rates() -> Dict:
+    rates = dict(DEFAULT_ROUTE_SAMPLE_RATES)
+    override = os.getenv('SENTRY_ROUTE_SAMPLE_RATES')
+    if override:
+        try:
+            rates.update(json.loads(override))
+        except ValueError:
+            print("⚠️  SENTRY_ROUTE_SAMPLE_RATES is not valid JSON - using defaults")
+    return rates
+
+trace_sampler = AdaptiveTraceSampler(
+    base_rate=float(os.getenv('SENTRY_TRACES_SAMPLE_RATE', '0.05')),
+    route_rates=_route_sample_rates(),
+    slow_seconds=float(os.getenv('SENTRY_SLOW_TRANSACTION_SECONDS', '1.0')),
+    profiles_rate=float(os.getenv('SENTRY_PROFILES_SAMPLE_RATE', '0.1')),
+)
+
+_sentry_initialized = False
+
+def api_sentry_integrations() -> list:
+    """Integrations for the FastAPI process (imported here so workers never load FastAPI)"""
+    from sentry_sdk.integrations.fastapi import FastApiIntegration
+    from sentry_sdk.integrations.httpx import HttpxIntegration
+
+    return [FastApiIntegration(transaction_style="url"), HttpxIntegration()]
+
+def setup_sentry(integrations: Optional[list] = None):
+    """Configure Sentry error tracking; called by the process entry point, not at import"""
+    global _sentry_initialized
+    if _sentry_initialized:
+        return
+    _sentry_initialized = True
+
     sentry_dsn = os.getenv('SENTRY_DSN')
     environment = os.getenv('ENVIRONMENT', 'development')
     
     if sentry_dsn:
+        # Trace everything locally; adaptive per-route sampling elsewhere
+        if environment == 'development':
+            sampling = {"traces_sample_rate": 1.0, "profiles_sample_rate": 1.0}
+        else:
+            sampling = {
+                "traces_sampler": trace_sampler.traces_sampler,
+                "profiles_sampler": trace_sampler.profiles_sampler,
+                "before_send_transaction": trace_sampler.before_send_transaction,
+            }
+        
         sentry_sdk.init(
             dsn=sentry_dsn,
             environment=environment,
-            traces_sample_rate=1.0 if environment == 'development' else 0.1,
-            profiles_sample_rate=1.0 if environment == 'development' else 0.1,
-            integrations=[
-                FastApiIntegration(),
-                HttpxIntegration(),
-            ],
+            **sampling,
+            integrations=integrations if integrations is not None else api_sentry_integrations(),
             # Send PII (Personally Identifiable Information)
             send_default_pii=False,
             # Attach stack traces
@@ -61,9 +307,8 @@ def setup_sentry():
     else:
         print("⚠️  Sentry DSN not configured - error tracking disabled")
 
-# Initialize
+# Initialize (Sentry is set up by create_app() / the Celery worker init hook)
 logger = setup_logging()
-setup_sentry()
 
 # Helper functions for structured logging
 def log_info(message: str, **kwargs):
@@ -89,21 +334,30 @@ def log_debug(message: str, **kwargs):
 
 # Context managers for tracking operations
 class LogContext:
-    """Context manager for logging operations"""
+    """Context manager for logging operations, timed into per-operation metrics"""
     def __init__(self, operation: str, **kwargs):
         self.operation = operation
         self.context = kwargs
+        self.duration = None
     
     def __enter__(self):
         log_info(f"{self.operation} started", **self.context)
+        self._start = time.perf_counter()
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self.duration = time.perf_counter() - self._start
+        status = "failure" if exc_type else "success"
+        OPERATION_DURATION.observe(self.duration, operation=self.operation)
+        OPERATION_TOTAL.inc(operation=self.operation, status=status)
+        
+        duration_ms = round(self.duration * 1000, 2)
         if exc_type:
             log_error(
                 f"{self.operation} failed",
                 error=exc_val,
+                duration_ms=duration_ms,
                 **self.context
             )
         else:
-            log_info(f"{self.operation} completed", **self.context)
+            log_info(f"{self.operation} completed", duration_ms=duration_ms, **self.context)
@@ -1,79 +1,78 @@
 import os
 import re
+import time
+import asyncio
 import datetime
+import json
 import httpx
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from typing import List, Optional, Dict
-from fastapi import FastAPI, HTTPException
+from fastapi import APIRouter, FastAPI, Header, HTTPException, Request, Response
 from pydantic import BaseModel
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from starlette.routing import Match
 from dotenv import load_dotenv
-from plaid.api import plaid_api
-from plaid.model.link_token_create_request import LinkTokenCreateRequest
-from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
-from plaid.model.products import Products
-from plaid.model.country_code import CountryCode
-from plaid.configuration import Configuration
-from plaid.api_client import ApiClient
-import lithic
-from lithic import Lithic
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 
 load_dotenv()
 
 # Import custom services
 from database import db
 from cache import cache
-from logging_config import log_info, log_error, log_warning, LogContext
-from signatures import SUBSCRIPTION_SIGNATURES, normalize_currency
-
-app = FastAPI(title="Kill Switch Pro API")
-
-# Rate limiting
-limiter = Limiter(key_func=get_remote_address)
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
-# CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Update with your frontend URL in production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+from logging_config import log_info, log_error, log_warning, LogContext, trace_sampler, setup_sentry
+from clients import clients
+from rate_limit import rate_limiter, client_key
+from idempotency import idempotency
+from request_timing import RequestTimingMiddleware, track
+from metrics import registry, HTTP_REQUEST_DURATION, HTTP_REQUESTS_TOTAL, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from signatures import detect_subscription_metadata, normalize_currency, evaluate_tips
+from gmail_scanner import build_gmail_service, scan_mailbox
+from leak_detector import leak_detector
+from scan_jobs import scan_jobs, sse, COMPLETE, FAILED
+from responses import FastJSONResponse, parse_fields, project
+from compression import CompressionMiddleware
+
+router = APIRouter()
+
+# Per-route latency; route templates keep label cardinality bounded
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, method=request.method, route=route_path)
+        HTTP_REQUESTS_TOTAL.inc(method=request.method, route=route_path, status=status)
+
+@lru_cache(maxsize=4096)
+def resolve_route_template(method: str, path: str) -> Optional[str]:
+    """Raw request path -> route template (e.g. /api/v1/cards/pause/{card_id})"""
+    scope = {"type": "http", "method": method, "path": path}
+    for route in router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", None)
+    return None
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    return Response(content=registry.render(), media_type=METRICS_CONTENT_TYPE)
 
 # --- CONFIGURATION ---
-PLAID_CLIENT_ID = os.getenv('PLAID_CLIENT_ID')
-PLAID_SECRET = os.getenv('PLAID_SECRET')
-PLAID_ENV = os.getenv('PLAID_ENV', 'sandbox')
-
-# Plaid Client Setup
-host = Configuration.host_sandbox
-if PLAID_ENV == 'development':
-    host = Configuration.host_development
-elif PLAID_ENV == 'production':
-    host = Configuration.host_production
-
-configuration = Configuration(
-    host=host,
-    api_key={
-        'clientId': PLAID_CLIENT_ID,
-        'secret': PLAID_SECRET,
-    }
-)
-api_client = ApiClient(configuration)
-plaid_client = plaid_api.PlaidApi(api_client)
+# Plaid and Lithic clients are built on first use (see clients.py)
 
-# Lithic Client Setup
-LITHIC_API_KEY = os.getenv('LITHIC_API_KEY')
-LITHIC_ENV = os.getenv('LITHIC_ENV', 'sandbox')
-lithic_client = Lithic(api_key=LITHIC_API_KEY, environment=LITHIC_ENV)
+# Build provider clients in the background at startup instead of on the first request
+PRELOAD_CLIENTS = os.getenv('PRELOAD_CLIENTS', 'false').lower() == 'true'
+
+# Virtual card creation per user, shared across workers via Redis
+CARD_CREATION_RATE = os.getenv('CARD_CREATION_RATE', '5/minute')
+# ...and per client IP, so rotating the body's user_id doesn't buy more cards
+CARD_CREATION_IP_RATE = os.getenv('CARD_CREATION_IP_RATE', '20/minute')
 
 # BIN Lookup Configuration
 BINLIST_API_KEY = os.getenv('BINLIST_API_KEY')
@@ -83,7 +82,6 @@ CARD_CACHE: Dict[str, dict] = {}
 VIRTUAL_CARD_CACHE: Dict[str, str] = {}  # Maps subscription_id -> lithic_card_id
 
 # --- CONFIGURATION & MODELS ---
-SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 
 class Subscription(BaseModel):
     id: str
@@ -126,7 +124,7 @@ class CardResolution(BaseModel):
 
 # --- CARD RESOLUTION LOGIC ---
 
-@app.post("/api/v1/resolve-card", response_model=CardResolution)
+@router.post("/api/v1/resolve-card", response_model=CardResolution)
 async def resolve_card(request: BinRequest):
     bin_6 = request.bin_number.replace(" ", "")[:6]
     
@@ -147,11 +145,12 @@ async def resolve_card(request: BinRequest):
                 if BINLIST_API_KEY:
                     headers['Authorization'] = f'Bearer {BINLIST_API_KEY}'
                 
-                res = await client.get(
-                    f"https://lookup.binlist.net/{bin_6}", 
-                    headers=headers,
-                    timeout=5.0
-                )
+                with track("binlist"):
+                    res = await client.get(
+                        f"https://lookup.binlist.net/{bin_6}", 
+                        headers=headers,
+                        timeout=5.0
+                    )
                 
                 if res.status_code == 200:
                     data = res.json()
@@ -189,97 +188,63 @@ async def resolve_card(request: BinRequest):
                     card_type="DEBIT"
                 )
 
-# --- SCANNER LOGIC ---
-
-def detect_subscription_metadata(name: str):
-    """Matches a vendor name to our Signature Database."""
-    n = name.lower()
-    for vendor, data in SUBSCRIPTION_SIGNATURES.items():
-        if any(keyword in n for keyword in data["keywords"]):
-            return vendor, data
-    return name, {"category": "Other", "cancel_url": None}
-
-def get_optimization_tip(name: str, price: float) -> (str, float):
-    name = name.lower()
-    if 'netflix' in name and price > 10:
-        return "Switch to Standard (Non-HD) to save $6.50", 6.50
-    if 'spotify' in name:
-        return "Get the Student or Duo plan", 3.00
-    if 'gym' in name or 'fitness' in name:
-        return "Try Pay-as-you-go instead", 15.00
-    if price > 50:
-        return "Review annual billing options", price * 0.15
-    return "No optimizations found", 0.0
-
 # --- GMAIL SEARCH LOGIC ---
 
 async def search_gmail_for_subscriptions(creds):
     try:
-        service = build('gmail', 'v1', credentials=creds)
-        # Regex-ready query for common subscription keywords
-        query = "subject:(subscription OR receipt OR invoice OR \"next bill\" OR \"trial\" OR \"renewal\" OR \"billing\")"
-        results = service.users().messages().list(userId='me', q=query, maxResults=20).execute()
-        messages = results.get('messages', [])
-
+        service = build_gmail_service(creds)
         found_subs = []
-        for msg in messages:
-            m = service.users().messages().get(userId='me', id=msg['id'], format='full').execute()
-            headers = m['payload']['headers']
-            subject = next(h['value'] for h in headers if h['name'] == 'Subject').lower()
-            from_info = next(h['value'] for h in headers if h['name'] == 'From')
-            from_name = from_info.split('<')[0].strip()
-            date = next(h['value'] for h in headers if h['name'] == 'Date')
-
-            # Intelligence Logic: Identify Service & Map Deep Links
-            refined_name, meta = detect_subscription_metadata(from_name)
-            
-            # Simple simulation of "Trial" detection from subject regex
-            is_trial = any(kw in subject for kw in ["trial", "free", "0.00"])
-
-            found_subs.append(Subscription(
-                id=msg['id'],
-                name=refined_name,
-                price=9.99, # Simplified: in prod we parse the body
-                currency="$",
-                date=date,
-                category=meta["category"],
-                cancel_url=meta["cancel_url"],
-                is_trial=is_trial,
-                status="active",
-                payment_method="Linked Card"
-            ))
+        for fields in scan_mailbox(service):
+            fields = dict(fields)
+            fields.pop("email_type")
+            found_subs.append(Subscription(**fields))
         return found_subs
     except Exception as e:
         log_error("Gmail Parsing Error", error=e)
         return []
 
-@app.get("/scan", response_model=ScanResult)
-async def scan_pro():
-    # Mock result showing Currency Conversion & Card Resolution
+# Showcase portfolio: currency conversion, card resolution, ghost cards, trials
+DEMO_SUBSCRIPTIONS = [
+    {"name": "iCloud", "price": 2900.00, "currency": "₦", "card": "Card 4242", "usage": 0.9, "auto_kill": False, "days": 3, "cycle": 30, "bank": "Access Bank"},
+    {"name": "ChatGPT Plus", "price": 20.00, "currency": "$", "card": "GHOST-8812", "usage": 0.95, "auto_kill": False, "is_ghost": True, "days": 12, "cycle": 30, "bank": "Ghost Vault"},
+    {"name": "Netflix Premium", "price": 10.99, "currency": "£", "card": "Card 4242", "usage": 0.4, "auto_kill": True, "days": 1, "cycle": 30, "bank": "Kuda Bank"},
+    {"name": "Disney+ Trial", "price": 0.00, "currency": "$", "card": "VIRTUAL-001", "usage": 0.05, "auto_kill": False, "days": 1, "cycle": 7, "bank": "Zenith Bank"},
+    {"name": "Spotify", "price": 1500.00, "currency": "₦", "card": "Card 5061", "usage": 0.85, "auto_kill": False, "days": 15, "cycle": 30, "bank": "UBA"},
+]
+
+DEMO_KILL_HISTORY = [
+    {"id": "h1", "name": "Hulu", "price": 7.99, "currency": "$", "date": "2025-12-01", "category": "Video", "status": "killed", "days_remaining": 0, "total_cycle_days": 30, "is_bank_connected": True, "bank_name": "GTBank"},
+]
+
+# Every Subscription field in schema order with its default (None for required ones),
+# for payloads built as plain dicts
+SUBSCRIPTION_DEFAULTS = {
+    name: None if field.is_required() else field.default for name, field in Subscription.model_fields.items()
+}
+
+def build_scan_result(raw_subs: List[Dict], kill_history: List[Dict]) -> Dict:
+    """
+    ScanResult payload from our own detection pipeline, as plain dicts.
+    Every field is produced here with the right type, so no models are built
+    (model_construct() alone costs more than validating) and the route returns
+    the payload without response_model re-validation.
+    """
     today = datetime.date.today().isoformat()
     next_month = (datetime.date.today() + datetime.timedelta(days=30)).strftime("%b %d, %Y")
     
-    # Showcase features
-    raw_subs = [
-        {"name": "iCloud", "price": 2900.00, "currency": "₦", "card": "Card 4242", "usage": 0.9, "auto_kill": False, "days": 3, "cycle": 30, "bank": "Access Bank"},
-        {"name": "ChatGPT Plus", "price": 20.00, "currency": "$", "card": "GHOST-8812", "usage": 0.95, "auto_kill": False, "is_ghost": True, "days": 12, "cycle": 30, "bank": "Ghost Vault"},
-        {"name": "Netflix Premium", "price": 10.99, "currency": "£", "card": "Card 4242", "usage": 0.4, "auto_kill": True, "days": 1, "cycle": 30, "bank": "Kuda Bank"},
-        {"name": "Disney+ Trial", "price": 0.00, "currency": "$", "card": "VIRTUAL-001", "usage": 0.05, "auto_kill": False, "days": 1, "cycle": 7, "bank": "Zenith Bank"},
-        {"name": "Spotify", "price": 1500.00, "currency": "₦", "card": "Card 5061", "usage": 0.85, "auto_kill": False, "days": 15, "cycle": 30, "bank": "UBA"},
-    ]
-    
     subscriptions = []
-    total_burn_usd = 0.0
-    
+    detected = []
     for item in raw_subs:
         refined_name, meta = detect_subscription_metadata(item["name"])
         curr = item["currency"].replace("₦", "NGN").replace("£", "GBP").replace("$", "USD")
-        price_usd = normalize_currency(item["price"], curr)
-        total_burn_usd += price_usd
-        
-        opt_tip, potential = get_optimization_tip(refined_name, price_usd)
-        
-        subscriptions.append(Subscription(
+        detected.append((item, refined_name, meta, normalize_currency(item["price"], curr)))
+    
+    total_burn_usd = sum(price_usd for _, _, _, price_usd in detected)
+    tips = evaluate_tips((refined_name, price_usd) for _, refined_name, _, price_usd in detected)
+    
+    for (item, refined_name, meta, price_usd), (opt_tip, potential) in zip(detected, tips):
+        subscriptions.append(dict(
+            SUBSCRIPTION_DEFAULTS,
             id=f"sub-{refined_name.lower().replace(' ', '-')}",
             name=refined_name,
             price=item["price"],
@@ -301,58 +266,183 @@ async def scan_pro():
             bank_name=item.get("bank", "Primary Bank")
         ))
     
-    return ScanResult(
-        annual_leak=total_burn_usd * 12,
-        total_saved=total_burn_usd * 0.15, # Simulated
-        monthly_burn_rate=total_burn_usd,
-        subscriptions=subscriptions,
-        kill_history=[
-            Subscription(id="h1", name="Hulu", price=7.99, currency="$", date="2025-12-01", category="Video", status="killed", days_remaining=0, total_cycle_days=30, is_bank_connected=True, bank_name="GTBank")
-        ]
-    )
+    return {
+        "annual_leak": total_burn_usd * 12,
+        "total_saved": total_burn_usd * 0.15, # Simulated
+        "monthly_burn_rate": total_burn_usd,
+        "subscriptions": subscriptions,
+        "kill_history": [{**SUBSCRIPTION_DEFAULTS, **sub} for sub in kill_history],
+    }
+
+@router.get("/scan", response_model=ScanResult)
+async def scan_pro(fields: Optional[str] = None):
+    # ?fields=name,price,renewal_date trims each subscription (id is always kept)
+    selected = parse_fields(fields, Subscription.model_fields)
+    result = build_scan_result(DEMO_SUBSCRIPTIONS, DEMO_KILL_HISTORY)
+    result["subscriptions"] = project(result["subscriptions"], selected)
+    result["kill_history"] = project(result["kill_history"], selected)
+    # Returning the Response directly skips FastAPI's response_model validation;
+    # response_model stays for the OpenAPI schema
+    return FastJSONResponse(result)
+
+@router.get("/global-scan")
+async def global_scan(user_id: Optional[str] = None):
+    # Leaks precomputed from each card's transaction window as webhooks arrive
+    if not user_id:
+        return []
+    return leak_detector.leaks(user_id)
+
+# --- SCAN JOBS ---
 
-@app.get("/global-scan")
-async def global_scan():
-    # Simulated AI logic for detecting "leaks" (unauthorized trial conversions)
-    # This would usually crawl recent transactions or SMS/Email logs
-    return [
-        {"id": "leak1", "source": "Card 4242", "service": "Paramount+", "type": "Hold", "status": "Suspected", "risk": "High"},
-        {"id": "leak2", "source": "Card 8812", "service": "DraftKings", "type": "Auth $0", "status": "Required", "risk": "Medium"},
-        {"id": "leak3", "source": "Email", "service": "Premium App", "type": "Receipt", "status": "Active", "risk": "Low"},
-        {"id": "leak4", "source": "Card 4242", "service": "X Premium", "type": "Hold", "status": "Suspected", "risk": "High"},
-    ]
+# How often an event stream checks its job's log for new events
+SCAN_EVENTS_POLL_SECONDS = float(os.getenv('SCAN_EVENTS_POLL_SECONDS', '0.2'))
+# Comment line sent on idle streams, under common proxy idle timeouts
+SCAN_EVENTS_KEEPALIVE_SECONDS = 15
+# A stream is closed after this; EventSource reconnects and resumes from Last-Event-ID
+SCAN_EVENTS_MAX_SECONDS = 300
+
+class ScanJobRequest(BaseModel):
+    user_id: str
+    include_bank: bool = True
+
+@router.post("/scan/jobs", status_code=202)
+async def create_scan_job(job: ScanJobRequest):
+    """Enqueue a Gmail scan (and a sync per linked bank item); progress streams from events_url"""
+    from tasks import scan_user_gmail, sync_plaid_item
+
+    items = await db.get_user_plaid_items(job.user_id) if job.include_bank else []
+    parts = ["gmail"] + [f"bank:{item['item_id']}" for item in items]
+    job_id = scan_jobs.create(job.user_id, parts)
+
+    scan_user_gmail.delay(job.user_id, job_id)
+    for item in items:
+        sync_plaid_item.delay(item['item_id'], job_id)
+    log_info("Scan job queued", user_id=job.user_id, job_id=job_id, parts=len(parts))
+    return {"job_id": job_id, "status": "queued", "parts": parts, "events_url": f"/scan/jobs/{job_id}/events"}
+
+@router.get("/scan/jobs/{job_id}")
+async def get_scan_job(job_id: str):
+    job = await asyncio.to_thread(scan_jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return {"job_id": job_id, **job}
+
+@router.get("/scan/jobs/{job_id}/events")
+async def stream_scan_job(job_id: str, request: Request):
+    """
+    Server-Sent Events: queued, part_started, result (one per analyzed email),
+    progress (bank pages), part_done and a final complete.
+    """
+    if await asyncio.to_thread(scan_jobs.get, job_id) is None:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    last_id = request.headers.get("last-event-id", "")
+    start = int(last_id) + 1 if last_id.isdigit() else 0
+
+    async def events():
+        cursor = start
+        opened = last_sent = time.monotonic()
+        while time.monotonic() - opened < SCAN_EVENTS_MAX_SECONDS:
+            # Redis reads run on a worker thread so polling streams never block the event loop
+            batch = await asyncio.to_thread(scan_jobs.events, job_id, cursor)
+            for index, event, data in batch:
+                yield sse(index, event, data)
+                if event == "complete":
+                    return
+            if batch:
+                cursor = batch[-1][0] + 1
+                last_sent = time.monotonic()
+            else:
+                # Resumed after the job finished, or the job expired
+                job = await asyncio.to_thread(scan_jobs.get, job_id)
+                if job is None or job["status"] in (COMPLETE, FAILED):
+                    return
+                if time.monotonic() - last_sent >= SCAN_EVENTS_KEEPALIVE_SECONDS:
+                    yield b": keep-alive\n\n"
+                    last_sent = time.monotonic()
+            await asyncio.sleep(SCAN_EVENTS_POLL_SECONDS)
+
+    # no-cache and X-Accel-Buffering keep proxies from holding events back
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # --- PLAID INTEGRATION ---
 
-@app.post("/api/v1/plaid/create-link-token")
-async def create_link_token():
+class LinkTokenRequest(BaseModel):
+    user_id: str
+
+@router.post("/api/v1/plaid/create-link-token")
+async def create_link_token(link_request: LinkTokenRequest):
+    from plaid_link import link_tokens
+
     try:
-        request = LinkTokenCreateRequest(
-            products=[Products("transactions")],
-            client_name="Kill Switch Pro",
-            country_codes=[CountryCode("US"), CountryCode("GB"), CountryCode("CA")],
-            language="en",
-            user=LinkTokenCreateRequestUser(client_user_id="user-123"), # Dynamic in prod
-        )
-        response = plaid_client.link_token_create(request)
-        return {"link_token": response['link_token']}
+        return {"link_token": await link_tokens.get_link_token(link_request.user_id)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/v1/plaid/exchange-token")
-async def exchange_token(public_token: str):
-    # This would exchange the public token for an access token
-    # and store it in a database associated with the user.
-    return {"status": "success", "message": "Bank account linked (Sandbox Demo)"}
+class ExchangeTokenRequest(BaseModel):
+    public_token: str
+    user_id: str
+    institution_name: Optional[str] = None
+
+@router.post("/api/v1/plaid/exchange-token")
+async def exchange_token(exchange: ExchangeTokenRequest):
+    from plaid_link import link_tokens
+    from plaid_sync import plaid_sync
+    from tasks import sync_plaid_item
+
+    try:
+        item = await plaid_sync.link_item(exchange.user_id, exchange.public_token, exchange.institution_name)
+    except Exception as e:
+        log_error("Plaid token exchange failed", error=e, user_id=exchange.user_id)
+        raise HTTPException(status_code=502, detail="Could not link bank account")
+    link_tokens.invalidate(exchange.user_id)
+
+    # The initial history pull runs on the worker; the app polls the card/scan views
+    sync_plaid_item.delay(item['item_id'])
+    log_info("Bank account linked", user_id=exchange.user_id, item_id=item['item_id'])
+    return {"status": "success", "item_id": item['item_id'], "message": "Bank account linked - syncing transactions"}
+
+@router.post("/api/v1/plaid/webhook")
+async def plaid_webhook(request: Request):
+    """Plaid pushes SYNC_UPDATES_AVAILABLE when an item has new transactions"""
+    from plaid_webhooks import plaid_webhooks
+
+    body = await request.body()
+    # Signature check may fetch Plaid's signing key: run it on the Plaid pool
+    verified = await asyncio.get_running_loop().run_in_executor(
+        clients.plaid_async.executor, plaid_webhooks.verify, body, request.headers.get("Plaid-Verification")
+    )
+    if not verified:
+        raise HTTPException(status_code=401, detail="Invalid Plaid webhook signature")
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Webhook body is not valid JSON")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Webhook body must be a JSON object")
+
+    if payload.get('webhook_type') == 'TRANSACTIONS' and payload.get('webhook_code') == 'SYNC_UPDATES_AVAILABLE':
+        from tasks import sync_plaid_item
+
+        item_id = payload.get('item_id')
+        if not isinstance(item_id, str) or not item_id:
+            raise HTTPException(status_code=400, detail="SYNC_UPDATES_AVAILABLE webhook without item_id")
+        sync_plaid_item.delay(item_id)
+        return {"status": "queued"}
+    return {"status": "ignored"}
 
 # --- GMAIL OAUTH SKELETON ---
 
-@app.get("/api/v1/auth/gmail/url")
+@router.get("/api/v1/auth/gmail/url")
 async def get_gmail_auth_url():
     # In a real app, this would use the client secrets to generate a redirect URL
     return {"url": "https://accounts.google.com/o/oauth2/auth?..."}
 
-@app.post("/api/v1/auth/gmail/callback")
+@router.post("/api/v1/auth/gmail/callback")
 async def gmail_callback(code: str):
     # This would exchange the auth code for tokens
     return {"status": "success", "message": "Gmail access granted"}
@@ -374,22 +464,64 @@ class VirtualCardResponse(BaseModel):
     status: str
     spending_limit: float
 
-@app.post("/api/v1/cards/create-virtual", response_model=VirtualCardResponse)
-@limiter.limit("5/minute")  # Max 5 cards per minute
-async def create_virtual_card(request: Request, card_request: CreateVirtualCardRequest):
+@router.post("/api/v1/cards/create-virtual", response_model=VirtualCardResponse)
+async def create_virtual_card(
+    request: Request,
+    response: Response,
+    card_request: CreateVirtualCardRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
     """
     Create a disposable virtual card for a specific subscription.
     This card can be paused/closed when the user wants to kill the subscription.
+    Retries carrying the same Idempotency-Key get the first card, not a new one.
     """
+    async def create():
+        # Inside the idempotent call so replayed retries don't spend rate-limit tokens
+        rate_limiter.enforce_all([
+            (f"create_virtual_card:{client_key(request)}", CARD_CREATION_IP_RATE),
+            (f"create_virtual_card:user:{card_request.user_id}", CARD_CREATION_RATE),
+        ], response)
+        return await _create_virtual_card(card_request)
+
+    # Only the card token is stored; replays read the card (and its CVV) back from Lithic
+    return await idempotency.run(
+        f"create_virtual_card:{card_request.user_id}", idempotency_key, card_request, create, response,
+        store_as=lambda card: {"card_id": card.card_id, "spending_limit": card.spending_limit},
+        replay=_replay_virtual_card
+    )
+
+async def _replay_virtual_card(stored: Dict) -> VirtualCardResponse:
+    try:
+        with track("lithic"):
+            card = clients.lithic.cards.retrieve(stored["card_id"])
+    except Exception as e:
+        log_error("Failed to replay virtual card", error=e, card_id=stored["card_id"])
+        raise HTTPException(status_code=500, detail=f"Failed to fetch virtual card: {str(e)}")
+    return _card_response(card, stored["spending_limit"])
+
+def _card_response(card, spending_limit: float) -> VirtualCardResponse:
+    return VirtualCardResponse(
+        card_id=card.token,
+        last_four=card.last_four,
+        cvv=card.cvv,
+        exp_month=str(card.exp_month).zfill(2),
+        exp_year=str(card.exp_year),
+        status=card.state,
+        spending_limit=spending_limit
+    )
+
+async def _create_virtual_card(card_request: CreateVirtualCardRequest) -> VirtualCardResponse:
     with LogContext("create_virtual_card", user_id=card_request.user_id, subscription=card_request.subscription_name):
         try:
             # Create a virtual card via Lithic
-            card = lithic_client.cards.create(
-                type="VIRTUAL",
-                memo=f"Kill Switch - {card_request.subscription_name}",
-                spend_limit=int(card_request.spending_limit * 100),  # Convert to cents
-                spend_limit_duration="MONTHLY",
-            )
+            with track("lithic"):
+                card = clients.lithic.cards.create(
+                    type="VIRTUAL",
+                    memo=f"Kill Switch - {card_request.subscription_name}",
+                    spend_limit=int(card_request.spending_limit * 100),  # Convert to cents
+                    spend_limit_duration="MONTHLY",
+                )
             
             # Store in database
             await db.save_virtual_card(
@@ -403,30 +535,23 @@ async def create_virtual_card(request: Request, card_request: CreateVirtualCardR
             
             log_info("Virtual card created", card_id=card.token, user_id=card_request.user_id)
             
-            return VirtualCardResponse(
-                card_id=card.token,
-                last_four=card.last_four,
-                cvv=card.cvv,
-                exp_month=str(card.exp_month).zfill(2),
-                exp_year=str(card.exp_year),
-                status=card.state,
-                spending_limit=card_request.spending_limit
-            )
+            return _card_response(card, card_request.spending_limit)
         except Exception as e:
             log_error("Failed to create virtual card", error=e, user_id=card_request.user_id)
             raise HTTPException(status_code=500, detail=f"Failed to create virtual card: {str(e)}")
 
-@app.post("/api/v1/cards/pause/{card_id}")
+@router.post("/api/v1/cards/pause/{card_id}")
 async def pause_virtual_card(card_id: str):
     """
     Pause a virtual card to prevent further charges.
     This is the 'soft kill' - can be resumed later.
     """
     try:
-        card = lithic_client.cards.update(
-            card_token=card_id,
-            state="PAUSED"
-        )
+        with track("lithic"):
+            card = clients.lithic.cards.update(
+                card_token=card_id,
+                state="PAUSED"
+            )
         return {
             "status": "success",
             "message": f"Card {card.last_four} paused successfully",
@@ -435,17 +560,18 @@ async def pause_virtual_card(card_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to pause card: {str(e)}")
 
-@app.post("/api/v1/cards/close/{card_id}")
+@router.post("/api/v1/cards/close/{card_id}")
 async def close_virtual_card(card_id: str):
     """
     Permanently close a virtual card.
     This is the 'hard kill' - cannot be resumed.
     """
     try:
-        card = lithic_client.cards.update(
-            card_token=card_id,
-            state="CLOSED"
-        )
+        with track("lithic"):
+            card = clients.lithic.cards.update(
+                card_token=card_id,
+                state="CLOSED"
+            )
         return {
             "status": "success",
             "message": f"Card {card.last_four} permanently closed",
@@ -454,17 +580,18 @@ async def close_virtual_card(card_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to close card: {str(e)}")
 
-@app.get("/api/v1/cards/{card_id}/transactions")
+@router.get("/api/v1/cards/{card_id}/transactions")
 async def get_card_transactions(card_id: str):
     """
     Get transaction history for a virtual card.
     Useful for showing what charges were blocked.
     """
     try:
-        transactions = lithic_client.transactions.list(
-            card_token=card_id,
-            page_size=50
-        )
+        with track("lithic"):
+            transactions = clients.lithic.transactions.list(
+                card_token=card_id,
+                page_size=50
+            )
         return {
             "card_id": card_id,
             "transactions": [
@@ -481,11 +608,70 @@ async def get_card_transactions(card_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to fetch transactions: {str(e)}")
 
 
-@app.post("/kill-subscription/{sub_id}")
-async def kill_subscription(sub_id: str):
-    # Logic to simulate contacting the service provider or blocking the transaction
-    # In production, this might call a banking API (e.g. Plaid, Stripe) or use a headless browser
-    return {"status": "success", "message": f"Subscription {sub_id} neutralized successfully"}
+@router.post("/kill-subscription/{sub_id}")
+async def kill_subscription(
+    sub_id: str,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    async def kill():
+        # Logic to simulate contacting the service provider or blocking the transaction
+        # In production, this might call a banking API (e.g. Plaid, Stripe) or use a headless browser
+        return {"status": "success", "message": f"Subscription {sub_id} neutralized successfully"}
+
+    # Scoped to the subscription: one client's key can't collide with another's kill
+    return await idempotency.run(f"kill_subscription:{sub_id}", idempotency_key, {"sub_id": sub_id}, kill, response)
+
+# --- APPLICATION FACTORY ---
+
+def _preload_clients():
+    try:
+        cache.connect()
+        clients.lithic
+        clients.plaid
+    except Exception as e:
+        log_warning("Client preload failed", error=str(e))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if PRELOAD_CLIENTS:
+        # Fire and forget: a slow or down provider must not hold up startup
+        asyncio.get_running_loop().run_in_executor(None, _preload_clients)
+    yield
+    clients.close()
+    cache.close()
+
+def create_app() -> FastAPI:
+    """
+    Build the API. Cheap by design: no provider clients, Redis or Supabase
+    connections are created here; they are initialised on first use.
+    """
+    setup_sentry()
+
+    app = FastAPI(title="Kill Switch Pro API", lifespan=lifespan, default_response_class=FastJSONResponse)
+
+    # CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Update with your frontend URL in production
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # gzip/brotli for larger bodies; inside the timing middleware so it shows in Server-Timing
+    app.add_middleware(CompressionMiddleware)
+
+    # Per-dependency breakdown (Server-Timing header, slow-request logs)
+    app.add_middleware(RequestTimingMiddleware)
+    app.middleware("http")(record_request_metrics)
+
+    app.include_router(router)
+    trace_sampler.set_route_resolver(resolve_route_template)
+    return app
+
+# uvicorn main:app (or: uvicorn --factory main:create_app)
+app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
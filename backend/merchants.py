@@ -0,0 +1,152 @@
+"""
+Card-descriptor normalization and fuzzy vendor lookup.
+Strips processor prefixes, reference codes, phone numbers and other noise from
+raw descriptors ('SQ *NETFLX.COM 866-579-7172 CA'), then resolves them to a
+known vendor through exact keywords or a trigram inverted index, memoizing
+descriptor -> vendor in a bounded cache.
+"""
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+# Dice similarity a fuzzy match needs; 'NETFLX' vs 'netflix' scores 0.67
+FUZZY_THRESHOLD = 0.65
+# Shorter terms ('hulu', 'max', 'calm') only match as whole words: too few trigrams
+# to fuzz, and as substrings they hit 'MAXIMUS PHARMACY' or 'CALMART'
+MIN_FUZZY_TERM = 5
+# A fuzzy window must be at least this share of the term's length: 'NETFLX' covers
+# 'netflix', but 'GOOGLE' is only a prefix of 'googleone' and 'DEEZ' of 'deezer'
+MIN_TERM_COVERAGE = 0.8
+# A runner-up vendor this close makes the match ambiguous ('APPLE' -> Apple TV+ or Apple Music?)
+AMBIGUITY_MARGIN = 0.15
+# Adjacent descriptor tokens joined when matching ('PRIME VIDEO' -> 'primevideo')
+MAX_WINDOW_TOKENS = 3
+# Distinct descriptors memoized per index
+MEMO_SIZE = 65536
+
+# Payment processors and card-network words in front of the merchant ('SQ *', 'PAYPAL *', 'POS ')
+_NOISE_PREFIX_RE = re.compile(
+    r'^(?:(?:SQ|TST|PAYPAL|PP|GOOGLE|AMZN MKTP US)\s*\*|(?:POS|DEBIT|CHECKCARD|RECURRING)\b)\s*'
+)
+_SEPARATOR_RE = re.compile(r'[#*/,]')
+_DOMAIN_RE = re.compile(r'^WWW\.|\.(?:COM|NET|ORG|IO|CO|TV|APP|US|UK|AI|ME)$')
+_DIGIT_RE = re.compile(r'\d')
+NOISE_WORDS = frozenset({
+    "INC", "INC.", "LLC", "LTD", "CORP", "CO", "CO.", "PLC", "GMBH", "BV", "SA",
+    "PAYMENT", "PMT", "PURCHASE", "SUBSCRIPTION", "MEMBERSHIP", "RECURRING", "BILL", "BILLING", "ONLINE", "INTL",
+})
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]')
+
+
+def clean_descriptor(descriptor: str) -> str:
+    """Upper-cased descriptor without noise tokens ('NETFLIX.COM 866-579-7172 CA' -> 'NETFLIX')"""
+    text = _SEPARATOR_RE.sub(' ', _NOISE_PREFIX_RE.sub('', (descriptor or '').upper().strip()))
+    tokens = []
+    for token in text.split():
+        # Phone numbers, store numbers and reference codes all carry a digit
+        if token in NOISE_WORDS or _DIGIT_RE.search(token):
+            continue
+        if '.' in token:
+            token = _DOMAIN_RE.sub('', token)
+        if token:
+            tokens.append(token)
+    # Trailing state/country code ('... CA')
+    if len(tokens) > 1 and len(tokens[-1]) == 2:
+        tokens.pop()
+    return ' '.join(tokens)
+
+
+def trigrams(term: str) -> FrozenSet[str]:
+    """Padded character trigrams: 'max' -> {'$$m', '$ma', 'max', 'ax$'}"""
+    padded = f"$${term}$"
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class MerchantIndex:
+    """
+    Vendor lookup over a signature database ({vendor: {"keywords": [...]}}).
+    Exact keyword matches are tried first, in vendor order; otherwise
+    windows of the cleaned descriptor are scored against the vendor names and
+    keywords sharing a trigram with them. Fuzzy matching is for card and bank
+    descriptors only: names that people typed or that senders chose go
+    through match_name(), which is exact keywords alone.
+    """
+
+    def __init__(self, signatures: Dict[str, Dict], threshold: float = FUZZY_THRESHOLD, memo_size: int = MEMO_SIZE):
+        self.threshold = threshold
+        self.keywords: List[Tuple[str, Optional[re.Pattern], str]] = []
+        self.vendors: List[str] = []
+        self.term_sizes: List[int] = []
+        self.term_lengths: List[int] = []
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+
+        for vendor, data in signatures.items():
+            for keyword in data["keywords"]:
+                keyword = keyword.lower()
+                word = re.compile(rf'\b{re.escape(keyword)}\b') if len(keyword) < MIN_FUZZY_TERM else None
+                self.keywords.append((keyword, word, vendor))
+            for term in {_NON_ALNUM_RE.sub('', term.lower()) for term in [vendor, *data["keywords"]]}:
+                if len(term) < MIN_FUZZY_TERM:
+                    continue
+                term_id = len(self.vendors)
+                grams = trigrams(term)
+                self.vendors.append(vendor)
+                self.term_sizes.append(len(grams))
+                self.term_lengths.append(len(term))
+                for gram in grams:
+                    self.postings[gram].append(term_id)
+        self.postings = dict(self.postings)
+
+        # Bounded memos: raw descriptors repeat across a feed, and distinct raw
+        # descriptors collapse to far fewer cleaned forms once reference codes go
+        self.lookup = lru_cache(maxsize=memo_size)(self._lookup)
+        self.match_name = lru_cache(maxsize=memo_size)(self._match_keywords)
+        self._resolve_cleaned = lru_cache(maxsize=memo_size)(lambda cleaned: self.fuzzy_match(cleaned)[0])
+
+    def _match_keywords(self, text: str) -> Optional[str]:
+        lowered = text.lower()
+        for keyword, word, vendor in self.keywords:
+            if keyword in lowered and (word is None or word.search(lowered)):
+                return vendor
+        return None
+
+    def _lookup(self, descriptor: str) -> Optional[str]:
+        # 'MICROSOFT*365' holds the keyword 'microsoft 365'; cleaning would drop the '365'
+        vendor = self._match_keywords(_SEPARATOR_RE.sub(' ', descriptor))
+        if vendor is not None:
+            return vendor
+        return self._resolve_cleaned(clean_descriptor(descriptor))
+
+    def fuzzy_match(self, cleaned: str) -> Tuple[Optional[str], float]:
+        """Best (vendor, Dice score) over 1-3 token windows, or (None, best score)"""
+        tokens = [_NON_ALNUM_RE.sub('', token) for token in cleaned.lower().split()]
+        scores: Dict[str, float] = {}
+        postings, sizes, lengths, vendors = self.postings, self.term_sizes, self.term_lengths, self.vendors
+
+        for start in range(len(tokens)):
+            window = ''
+            for token in tokens[start:start + MAX_WINDOW_TOKENS]:
+                window += token
+                if len(window) < MIN_FUZZY_TERM - 1:
+                    continue
+                grams = trigrams(window)
+                shared: Dict[int, int] = {}
+                for gram in grams:
+                    for term_id in postings.get(gram, ()):
+                        shared[term_id] = shared.get(term_id, 0) + 1
+                for term_id, count in shared.items():
+                    if len(window) < MIN_TERM_COVERAGE * lengths[term_id]:
+                        continue
+                    score = 2.0 * count / (len(grams) + sizes[term_id])
+                    if score > scores.get(vendors[term_id], 0.0):
+                        scores[vendors[term_id]] = score
+
+        if not scores:
+            return None, 0.0
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best_vendor, best_score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        if best_score >= self.threshold and (best_score == 1.0 or best_score - runner_up > AMBIGUITY_MARGIN):
+            return best_vendor, best_score
+        return None, best_score
@@ -0,0 +1,10 @@
+-- Renewal calendar: index subscriptions by their next charge / trial end date
+-- so alert jobs can range-scan the next N days instead of reading every row.
+
+ALTER TABLE subscriptions ADD COLUMN IF NOT EXISTS is_trial BOOLEAN NOT NULL DEFAULT FALSE;
+ALTER TABLE subscriptions ADD COLUMN IF NOT EXISTS next_charge_date DATE;
+
+-- Only active subscriptions are ever alerted on
+CREATE INDEX IF NOT EXISTS idx_subscriptions_next_charge_date
+    ON subscriptions (next_charge_date)
+    WHERE status = 'active';
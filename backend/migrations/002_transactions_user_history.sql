@@ -0,0 +1,12 @@
+-- Recurring-charge detection: read each user's transaction history in
+-- chronological order without a join through virtual_cards.
+
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS user_id TEXT;
+
+UPDATE transactions t
+SET user_id = vc.user_id
+FROM virtual_cards vc
+WHERE t.user_id IS NULL AND vc.lithic_card_id = t.card_id;
+
+CREATE INDEX IF NOT EXISTS idx_transactions_user_created
+    ON transactions (user_id, created_at);
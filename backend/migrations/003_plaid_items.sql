@@ -0,0 +1,21 @@
+-- Plaid transactions sync: linked items carry their access token and the
+-- /transactions/sync cursor, so each refresh pulls only the changes since
+-- the last completed sync. The access token is stored Fernet-encrypted by
+-- the API (PLAID_TOKEN_KEYS); the database never sees it in plaintext.
+
+CREATE TABLE IF NOT EXISTS plaid_items (
+    item_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    access_token_encrypted TEXT NOT NULL,
+    institution_name TEXT,
+    cursor TEXT,
+    last_synced_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_plaid_items_user ON plaid_items (user_id);
+
+-- Upserts and deletes from sync are keyed by the provider's transaction id
+CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_transaction_id
+    ON transactions (transaction_id);
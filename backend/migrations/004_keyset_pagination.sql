@@ -0,0 +1,10 @@
+-- Keyset pagination for nightly jobs: pages resume after the last
+-- (user_id, id) seen, so every page is an index seek instead of an
+-- OFFSET that re-reads all earlier rows.
+
+CREATE INDEX IF NOT EXISTS idx_transactions_user_id_id
+    ON transactions (user_id, id);
+
+CREATE INDEX IF NOT EXISTS idx_subscriptions_active_user_id_id
+    ON subscriptions (user_id, id)
+    WHERE status = 'active';
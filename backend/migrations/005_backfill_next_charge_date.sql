@@ -0,0 +1,8 @@
+-- Renewal roll-forward: the nightly tasks.roll_renewals_forward job fills in
+-- next_charge_date for subscriptions created before it existed (anchored on
+-- detected_at) and moves passed charge dates on by one billing cycle. This
+-- index keeps its scan for still-missing dates a seek over an ever-smaller set.
+
+CREATE INDEX IF NOT EXISTS idx_subscriptions_missing_next_charge_date
+    ON subscriptions (user_id, id)
+    WHERE status = 'active' AND next_charge_date IS NULL;
@@ -0,0 +1,259 @@
+"""
+Push Notification Dispatcher for Kill Switch
+Drains the NotificationService queue: coalesces alerts per user, enforces
+per-user rate limits and sends pushes to a provider in batches with retries.
+"""
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from logging_config import log_info, log_error, log_warning
+from metrics import PUSH_MESSAGES_TOTAL
+from notification_service import Notification, NotificationService, PRIORITY_ORDER
+from token_bucket import TokenBucketLimiter
+
+# Pushes per user, across every worker and run
+PUSH_RATE_LIMIT = os.getenv('PUSH_RATE_LIMIT', '3/hour')
+
+
+class PushMessage:
+    """A single coalesced push for one user"""
+
+    def __init__(self, user_id: str, notifications: List[Notification]):
+        self.user_id = user_id
+        # Most important alert first
+        self.notifications = sorted(notifications, key=lambda n: PRIORITY_ORDER[n.priority])
+        self.attempts = 0
+
+    @property
+    def lead(self) -> Notification:
+        return self.notifications[0]
+
+    def to_payload(self) -> Dict:
+        lead = self.lead
+        count = len(self.notifications)
+
+        if count == 1:
+            title, message = lead.title, lead.message
+        else:
+            title = f"{count} subscription alerts"
+            message = f"{lead.title} (+{count - 1} more)"
+
+        return {
+            "user_id": self.user_id,
+            "title": title,
+            "message": message,
+            "priority": lead.priority.value,
+            "action_url": lead.action_url,
+            "action_label": lead.action_label,
+            "notifications": [n.to_dict() for n in self.notifications],
+        }
+
+
+# --- PROVIDERS ---
+
+class PushProvider(ABC):
+    """
+    Interface for push backends (FCM/APNs gateways, OneSignal, ...).
+    send_batch returns the user_ids whose push failed and should be retried.
+    """
+
+    @abstractmethod
+    def send_batch(self, payloads: List[Dict]) -> List[str]:
+        ...
+
+
+class FakePushProvider(PushProvider):
+    """In-memory provider for local development and tests"""
+
+    def __init__(self, fail_user_ids: Optional[List[str]] = None, fail_times: int = 0):
+        self.sent: List[Dict] = []
+        self.batches: List[int] = []
+        self.fail_user_ids = set(fail_user_ids or [])
+        self.fail_times = fail_times
+        self._failures: Dict[str, int] = {}
+
+    def send_batch(self, payloads: List[Dict]) -> List[str]:
+        self.batches.append(len(payloads))
+        failed = []
+        for payload in payloads:
+            user_id = payload["user_id"]
+            if user_id in self.fail_user_ids and self._failures.get(user_id, 0) < self.fail_times:
+                self._failures[user_id] = self._failures.get(user_id, 0) + 1
+                failed.append(user_id)
+            else:
+                self.sent.append(payload)
+        return failed
+
+
+class HttpPushProvider(PushProvider):
+    """Posts batches to a push gateway that resolves user_id -> device tokens"""
+
+    def __init__(self, url: str, api_key: Optional[str] = None, timeout: float = 10.0):
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        self.url = url
+        self.client = httpx.Client(headers=headers, timeout=timeout)
+
+    def send_batch(self, payloads: List[Dict]) -> List[str]:
+        try:
+            res = self.client.post(self.url, json={"messages": payloads})
+        except httpx.HTTPError as e:
+            log_warning("Push gateway unreachable", error_message=str(e), batch=len(payloads))
+            return [p["user_id"] for p in payloads]
+
+        if res.status_code >= 500 or res.status_code == 429:
+            return [p["user_id"] for p in payloads]
+        if res.status_code >= 400:
+            # Client errors won't succeed on retry
+            log_error("Push batch rejected", status=res.status_code, batch=len(payloads))
+            return []
+
+        try:
+            failed = res.json().get("failed", [])
+        except (ValueError, AttributeError):
+            # A 2xx without the expected JSON body: delivery status unknown, so resend
+            log_warning("Push gateway returned an unreadable response", status=res.status_code, batch=len(payloads))
+            return [p["user_id"] for p in payloads]
+        return failed
+
+
+def get_push_provider() -> PushProvider:
+    """Pick the configured push backend"""
+    gateway_url = os.getenv('PUSH_GATEWAY_URL')
+    if gateway_url:
+        return HttpPushProvider(gateway_url, api_key=os.getenv('PUSH_GATEWAY_KEY'))
+
+    print("⚠️  Push gateway not configured - using fake push provider")
+    return FakePushProvider()
+
+
+# --- RATE LIMITING ---
+
+class UserRateLimiter:
+    """
+    Push budget per user in a token bucket shared through Redis, so every task
+    run and worker draws from the same budget (per-process while Redis is down).
+    """
+
+    def __init__(self, limit: str = PUSH_RATE_LIMIT, limiter: Optional[TokenBucketLimiter] = None):
+        self.limit = limit
+        self.limiter = limiter or TokenBucketLimiter(prefix="ratelimit:push")
+
+    def allow(self, user_id: str) -> bool:
+        """Reserve one push; refund() it if the push is never delivered"""
+        return self.limiter.hit(user_id, self.limit).allowed
+
+    def refund(self, user_id: str) -> None:
+        self.limiter.refund(user_id, self.limit)
+
+
+# --- DISPATCHER ---
+
+class NotificationDispatcher:
+    """Coalesces, rate-limits and batch-sends queued notifications"""
+
+    def __init__(
+        self,
+        provider: PushProvider,
+        batch_size: int = 500,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        rate_limiter: Optional[UserRateLimiter] = None,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.provider = provider
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.rate_limiter = rate_limiter or UserRateLimiter()
+        self.sleep = sleep
+
+    @staticmethod
+    def coalesce(notifications: List[Notification]) -> List[PushMessage]:
+        """Group notifications into one push per user, preserving first-seen order"""
+        by_user: "OrderedDict[str, List[Notification]]" = OrderedDict()
+        for notif in notifications:
+            if not notif.user_id:
+                continue
+            by_user.setdefault(notif.user_id, []).append(notif)
+
+        return [PushMessage(user_id, notifs) for user_id, notifs in by_user.items()]
+
+    def dispatch(
+        self,
+        notifications: List[Notification],
+        on_sent: Optional[Callable[[str], None]] = None
+    ) -> Dict:
+        """Send notifications and return delivery stats; on_sent(user_id) follows each delivered push"""
+        messages = self.coalesce(notifications)
+
+        pending = []
+        rate_limited = 0
+        for message in messages:
+            if self.rate_limiter.allow(message.user_id):
+                pending.append(message)
+            else:
+                rate_limited += 1
+                log_warning(
+                    "Push rate limited",
+                    user_id=message.user_id,
+                    notifications=len(message.notifications),
+                    limit=self.rate_limiter.limit,
+                )
+
+        sent = 0
+        failed = 0
+        attempt = 0
+        # Reserved but not yet delivered: refunded if the send gives up or blows up
+        undelivered = {message.user_id for message in pending}
+        try:
+            while pending:
+                if attempt > 0:
+                    self.sleep(self.backoff_base * (2 ** (attempt - 1)))
+
+                retry = []
+                for start in range(0, len(pending), self.batch_size):
+                    batch = pending[start:start + self.batch_size]
+                    failed_ids = set(self.provider.send_batch([m.to_payload() for m in batch]))
+
+                    for message in batch:
+                        message.attempts += 1
+                        if message.user_id not in failed_ids:
+                            sent += 1
+                            undelivered.discard(message.user_id)
+                            if on_sent:
+                                on_sent(message.user_id)
+                        elif message.attempts <= self.max_retries:
+                            retry.append(message)
+                        else:
+                            failed += 1
+
+                pending = retry
+                attempt += 1
+        finally:
+            # Only delivered pushes count against a user's budget
+            for user_id in undelivered:
+                self.rate_limiter.refund(user_id)
+
+        PUSH_MESSAGES_TOTAL.inc(sent, outcome="sent")
+        PUSH_MESSAGES_TOTAL.inc(failed, outcome="failed")
+        PUSH_MESSAGES_TOTAL.inc(rate_limited, outcome="rate_limited")
+        stats = {
+            "notifications": len(notifications),
+            "pushes": len(messages),
+            "sent": sent,
+            "failed": failed,
+            "rate_limited": rate_limited,
+        }
+        log_info("Notification dispatch completed", **stats)
+        return stats
+
+    def drain(self, service: NotificationService, on_sent: Optional[Callable[[str], None]] = None) -> Dict:
+        """Dispatch everything queued on the service and empty the queue"""
+        queued = service.notifications_queue
+        service.notifications_queue = []
+        return self.dispatch(queued, on_sent)
@@ -4,9 +4,11 @@ Handles push notifications, email alerts, and in-app notifications
 """
 
 from typing import List, Dict, Optional
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from enum import Enum
 
+from duplicates import find_duplicate_groups
+
 
 class NotificationType(Enum):
     TRIAL_ENDING_SOON = "trial_ending_soon"
@@ -26,6 +28,15 @@ class NotificationPriority(Enum):
     URGENT = "urgent"
 
 
+# Lower rank = more important
+PRIORITY_ORDER = {
+    NotificationPriority.URGENT: 0,
+    NotificationPriority.HIGH: 1,
+    NotificationPriority.MEDIUM: 2,
+    NotificationPriority.LOW: 3,
+}
+
+
 class Notification:
     def __init__(
         self,
@@ -37,7 +48,8 @@ class Notification:
         priority: NotificationPriority = NotificationPriority.MEDIUM,
         action_url: Optional[str] = None,
         action_label: Optional[str] = None,
-        metadata: Optional[Dict] = None
+        metadata: Optional[Dict] = None,
+        user_id: Optional[str] = None
     ):
         self.type = notification_type
         self.title = title
@@ -48,6 +60,7 @@ class Notification:
         self.action_url = action_url
         self.action_label = action_label
         self.metadata = metadata or {}
+        self.user_id = user_id
         self.created_at = datetime.now()
         self.is_read = False
     
@@ -57,6 +70,7 @@ class Notification:
             "type": self.type.value,
             "title": self.title,
             "message": self.message,
+            "user_id": self.user_id,
             "subscription_id": self.subscription_id,
             "subscription_name": self.subscription_name,
             "priority": self.priority.value,
@@ -76,12 +90,23 @@ class NotificationService:
         # Apple Push Notification service, or a service like OneSignal
         self.notifications_queue: List[Notification] = []
     
+    @staticmethod
+    def days_until_charge(subscription: Dict, today: Optional[date] = None) -> int:
+        """Days until the next charge, preferring the indexed next_charge_date"""
+        next_charge = subscription.get('next_charge_date')
+        if next_charge:
+            if isinstance(next_charge, str):
+                next_charge = date.fromisoformat(next_charge[:10])
+            return (next_charge - (today or date.today())).days
+        
+        return subscription.get('days_remaining', 30)
+    
     def check_trial_alerts(self, subscription: Dict) -> Optional[Notification]:
         """Check if a trial subscription needs an alert"""
         if not subscription.get('is_trial'):
             return None
         
-        days_remaining = subscription.get('days_remaining', 30)
+        days_remaining = self.days_until_charge(subscription)
         name = subscription.get('name', 'Unknown')
         sub_id = subscription.get('id', '')
         cancel_url = subscription.get('cancel_url')
@@ -132,7 +157,7 @@ class NotificationService:
     
     def check_renewal_reminder(self, subscription: Dict) -> Optional[Notification]:
         """Check if a renewal reminder is needed"""
-        days_remaining = subscription.get('days_remaining', 30)
+        days_remaining = self.days_until_charge(subscription)
         name = subscription.get('name', 'Unknown')
         sub_id = subscription.get('id', '')
         price = subscription.get('price', 0)
@@ -223,6 +248,37 @@ class NotificationService:
         
         return None
     
+    def duplicate_alert(self, group: Dict) -> Notification:
+        """Alert for one group from duplicates.find_duplicate_groups()"""
+        vendor = group["vendor"]
+        subs = group["subscriptions"]
+        currency = group["currency"]
+        savings = round(group["potential_savings"], 2)
+        sources = group["sources"]
+        where = f" across {', '.join(sources)}" if len(sources) > 1 else ""
+        
+        return Notification(
+            notification_type=NotificationType.DUPLICATE_SUBSCRIPTION,
+            title=f"👯 Paying for {vendor} {len(subs)} Times?",
+            message=f"You have {len(subs)} {vendor} subscriptions{where}. Cancel the extras and save {currency}{savings}/month.",
+            subscription_id=subs[0].get('id', ''),
+            subscription_name=vendor,
+            priority=NotificationPriority.HIGH,
+            action_label="Review Duplicates",
+            metadata={
+                "subscription_ids": [sub.get('id') for sub in subs],
+                "sources": sources,
+                "category": group["category"],
+                "monthly_total": group["monthly_total"],
+                "potential_savings": savings,
+            },
+            user_id=group["user_id"]
+        )
+    
+    def check_duplicate_subscriptions(self, subscriptions: List[Dict]) -> List[Notification]:
+        """Detect vendors paid for more than once (e.g. through two cards or banks)"""
+        return [self.duplicate_alert(group) for group in find_duplicate_groups(subscriptions)]
+    
     def generate_all_notifications(self, subscriptions: List[Dict]) -> List[Notification]:
         """Generate all relevant notifications for a list of subscriptions"""
         notifications = []
@@ -240,17 +296,21 @@ class NotificationService:
             # Add non-None notifications
             notifications.extend([n for n in checks if n is not None])
         
+        # Portfolio-level checks
+        notifications.extend(self.check_duplicate_subscriptions(subscriptions))
+        
         # Sort by priority (URGENT first)
-        priority_order = {
-            NotificationPriority.URGENT: 0,
-            NotificationPriority.HIGH: 1,
-            NotificationPriority.MEDIUM: 2,
-            NotificationPriority.LOW: 3,
-        }
-        notifications.sort(key=lambda n: priority_order[n.priority])
+        notifications.sort(key=lambda n: PRIORITY_ORDER[n.priority])
         
         return notifications
     
+    def enqueue(self, user_id: str, notifications: List[Notification]) -> int:
+        """Tag notifications with their owner and queue them for dispatch"""
+        for notif in notifications:
+            notif.user_id = user_id
+        self.notifications_queue.extend(notifications)
+        return len(notifications)
+    
     def get_notification_summary(self, notifications: List[Notification]) -> Dict:
         """Get a summary of notifications by type and priority"""
         summary = {
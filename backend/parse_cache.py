@@ -0,0 +1,103 @@
+"""
+Parsed-email result cache.
+Remembers analyze_gmail_message() output per Gmail message ID and scanner
+version so re-scans and task retries skip messages already analyzed.
+Entries hold only what the message says, never values relative to today
+(days_remaining is computed when results are read), so a month-old entry
+is as correct as a fresh one.
+Redis-backed, with a bounded in-process LRU fallback.
+"""
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from cache import cache, CacheService
+from email_scanner import SCANNER_VERSION
+
+
+def content_hash(message: Dict) -> str:
+    """Stable fingerprint of a Gmail message's payload"""
+    raw = json.dumps(message.get('payload', {}), sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+class ParsedEmailCache:
+    """message_id -> parse result, invalidated by bumping SCANNER_VERSION"""
+
+    def __init__(
+        self,
+        cache_service: CacheService = cache,
+        version: str = SCANNER_VERSION,
+        ttl: int = 30 * 86400,
+        local_size: int = 10000
+    ):
+        self.cache = cache_service
+        self.version = version
+        self.ttl = ttl
+        self.local_size = local_size
+        self._local: "OrderedDict[str, Dict]" = OrderedDict()
+
+    def key(self, message_id: str) -> str:
+        return f"email:v{self.version}:{message_id}"
+
+    def get(self, message_id: str, expected_hash: Optional[str] = None) -> Optional[Dict]:
+        """Cached result; a mismatching content hash counts as a miss"""
+        return self.get_many([message_id], {message_id: expected_hash} if expected_hash else None).get(message_id)
+
+    def get_many(self, message_ids: List[str], expected_hashes: Optional[Dict[str, str]] = None) -> Dict[str, Dict]:
+        """Cached results for the given IDs (one Redis round trip)"""
+        entries: Dict[str, Dict] = {}
+
+        if self.cache.enabled:
+            try:
+                values = self.cache.client.mget([self.key(mid) for mid in message_ids])
+                for mid, value in zip(message_ids, values):
+                    if value:
+                        entries[mid] = json.loads(value)
+            except Exception as e:
+                print(f"Parse cache get error: {e}")
+        else:
+            for mid in message_ids:
+                entry = self._local.get(self.key(mid))
+                if entry is not None:
+                    self._local.move_to_end(self.key(mid))
+                    entries[mid] = entry
+
+        results = {}
+        for mid, entry in entries.items():
+            expected = (expected_hashes or {}).get(mid)
+            if expected and entry.get('hash') != expected:
+                continue
+            results[mid] = entry['result']
+        return results
+
+    def set(self, message_id: str, result: Dict, message_hash: Optional[str] = None) -> None:
+        self.set_many([(message_id, result, message_hash)])
+
+    def set_many(self, items: Iterable[tuple]) -> None:
+        """Store (message_id, result, content_hash) tuples"""
+        items = list(items)
+        if not items:
+            return
+
+        if self.cache.enabled:
+            try:
+                pipe = self.cache.client.pipeline(transaction=False)
+                for mid, result, message_hash in items:
+                    pipe.setex(self.key(mid), self.ttl, json.dumps({"hash": message_hash, "result": result}))
+                pipe.execute()
+            except Exception as e:
+                print(f"Parse cache set error: {e}")
+            return
+
+        for mid, result, message_hash in items:
+            key = self.key(mid)
+            self._local[key] = {"hash": message_hash, "result": result}
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+
+# Global instance
+parse_cache = ParsedEmailCache()
@@ -0,0 +1,85 @@
+"""
+Plaid Link token issuing.
+Link tokens are valid for hours, so each user's token is cached until shortly
+before it expires and repeated Link opens reuse it; concurrent requests for
+the same user share one in-flight Plaid call.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict
+
+from cache import cache, CacheService
+from clients import clients
+from logging_config import log_info
+from request_timing import track
+
+# Handed-out tokens must outlive a slow Link session
+LINK_TOKEN_MARGIN = 15 * 60
+# Used when Plaid's response carries no expiration (tokens last 4 hours)
+LINK_TOKEN_DEFAULT_TTL = 4 * 3600
+
+
+def _seconds_until(expiration) -> float:
+    if expiration is None:
+        return LINK_TOKEN_DEFAULT_TTL
+    if isinstance(expiration, str):
+        expiration = datetime.fromisoformat(expiration.replace('Z', '+00:00'))
+    if expiration.tzinfo is None:
+        expiration = expiration.replace(tzinfo=timezone.utc)
+    return (expiration - datetime.now(timezone.utc)).total_seconds()
+
+
+class LinkTokenService:
+    def __init__(self, plaid_client=None, cache_service: CacheService = cache):
+        self._client = plaid_client
+        self.cache = cache_service
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def client(self):
+        return self._client or clients.plaid_async
+
+    async def get_link_token(self, user_id: str) -> str:
+        """Cached unexpired token for the user, else one fresh (coalesced) Plaid call"""
+        cached = self.cache.get_plaid_token(user_id)
+        if cached:
+            return cached['link_token']
+
+        pending = self._inflight.get(user_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self._create(user_id))
+            self._inflight[user_id] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(user_id, None))
+        # shield: one caller disconnecting must not cancel the others' call
+        return await asyncio.shield(pending)
+
+    async def _create(self, user_id: str) -> str:
+        from plaid.model.link_token_create_request import LinkTokenCreateRequest
+        from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
+        from plaid.model.products import Products
+        from plaid.model.country_code import CountryCode
+
+        request = LinkTokenCreateRequest(
+            products=[Products("transactions")],
+            client_name="Kill Switch Pro",
+            country_codes=[CountryCode("US"), CountryCode("GB"), CountryCode("CA")],
+            language="en",
+            user=LinkTokenCreateRequestUser(client_user_id=user_id),
+        )
+        with track("plaid"):
+            response = await self.client.link_token_create(request)
+
+        link_token = response['link_token']
+        ttl = int(_seconds_until(response.get('expiration')) - LINK_TOKEN_MARGIN)
+        if ttl > 0:
+            self.cache.cache_plaid_token(user_id, {"link_token": link_token}, ttl)
+        log_info("Plaid link token created", user_id=user_id, ttl=ttl)
+        return link_token
+
+    def invalidate(self, user_id: str):
+        """Drop the cached token once the user has completed Link"""
+        self.cache.delete_plaid_token(user_id)
+
+
+# Global instance
+link_tokens = LinkTokenService()
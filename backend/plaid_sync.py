@@ -0,0 +1,152 @@
+"""
+Plaid item linking and incremental transaction ingestion.
+Exchanges Link public tokens for access tokens, then follows each item's
+/transactions/sync cursor so a refresh pulls only the added, modified and
+removed deltas since the last run, written with bulk upserts/deletes.
+"""
+import asyncio
+import json
+from typing import Callable, Dict, Optional
+
+from clients import clients
+from database import db, DatabaseService
+from logging_config import log_info, log_warning
+from request_timing import track
+
+# Plaid caps /transactions/sync at 500 changes per page
+SYNC_PAGE_SIZE = 500
+
+
+def _plaid_error_code(error: Exception) -> Optional[str]:
+    body = getattr(error, 'body', None)
+    try:
+        return json.loads(body).get('error_code') if body else None
+    except (TypeError, ValueError):
+        return None
+
+
+def transaction_row(tx: Dict, user_id: str, item_id: str) -> Dict:
+    """Plaid transaction -> transactions table row (positive amount = money out)"""
+    when = tx.get('authorized_datetime') or tx.get('datetime') or tx.get('authorized_date') or tx.get('date')
+    category = tx.get('personal_finance_category') or {}
+    return {
+        "transaction_id": tx['transaction_id'],
+        "user_id": user_id,
+        "card_id": None,
+        "amount": tx['amount'],
+        "merchant": tx.get('merchant_name') or tx.get('name') or 'Unknown',
+        "status": "PENDING" if tx.get('pending') else "POSTED",
+        "created_at": when.isoformat() if hasattr(when, 'isoformat') else str(when),
+        "metadata": {
+            "source": "plaid",
+            "item_id": item_id,
+            "account_id": tx.get('account_id'),
+            "currency": tx.get('iso_currency_code'),
+            "category": category.get('primary'),
+        },
+    }
+
+
+class PlaidTransactionSync:
+    """Cursor-based /transactions/sync ingestion, one Plaid item at a time"""
+
+    def __init__(
+        self,
+        plaid_client=None,
+        database: DatabaseService = db,
+        page_size: int = SYNC_PAGE_SIZE,
+        max_restarts: int = 3
+    ):
+        self._client = plaid_client
+        self.db = database
+        self.page_size = page_size
+        self.max_restarts = max_restarts
+
+    @property
+    def client(self):
+        return self._client or clients.plaid
+
+    def exchange_public_token(self, public_token: str) -> Dict:
+        """Link public token -> {'access_token', 'item_id'}"""
+        from plaid.model.item_public_token_exchange_request import ItemPublicTokenExchangeRequest
+
+        with track("plaid"):
+            response = self.client.item_public_token_exchange(
+                ItemPublicTokenExchangeRequest(public_token=public_token)
+            )
+        return {"access_token": response['access_token'], "item_id": response['item_id']}
+
+    async def link_item(self, user_id: str, public_token: str, institution_name: Optional[str] = None) -> Dict:
+        """Exchange the token (on the Plaid pool, off the event loop) and store the item with an empty cursor"""
+        exchanged = await asyncio.get_running_loop().run_in_executor(
+            clients.plaid_async.executor, self.exchange_public_token, public_token
+        )
+        return await self.db.save_plaid_item(
+            user_id=user_id,
+            item_id=exchanged["item_id"],
+            access_token=exchanged["access_token"],
+            institution_name=institution_name
+        )
+
+    def _fetch_page(self, access_token: str, cursor: Optional[str]) -> Dict:
+        from plaid.model.transactions_sync_request import TransactionsSyncRequest
+
+        params = {"access_token": access_token, "count": self.page_size}
+        if cursor:
+            params["cursor"] = cursor
+        with track("plaid"):
+            response = self.client.transactions_sync(TransactionsSyncRequest(**params))
+        return response.to_dict()
+
+    async def sync_item(self, item: Dict, on_page: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Pull every change since the item's stored cursor. Each page is applied as it
+        arrives (upserts and deletes are idempotent); the cursor is saved only once
+        has_more is false, so a failed or restarted run resumes from the last good cursor.
+        on_page, if given, receives the running stats after each applied page.
+        """
+        item_id, user_id = item['item_id'], item['user_id']
+        start_cursor = item.get('cursor')
+
+        for attempt in range(self.max_restarts + 1):
+            cursor = start_cursor
+            stats = {"added": 0, "modified": 0, "removed": 0, "pages": 0}
+            try:
+                while True:
+                    page = self._fetch_page(item['access_token'], cursor)
+                    upserts = [
+                        transaction_row(tx, user_id, item_id)
+                        for tx in page.get('added', []) + page.get('modified', [])
+                    ]
+                    removed = [tx['transaction_id'] for tx in page.get('removed', [])]
+
+                    if upserts:
+                        await self.db.upsert_transactions(upserts)
+                    if removed:
+                        await self.db.delete_transactions(removed)
+
+                    stats["added"] += len(page.get('added', []))
+                    stats["modified"] += len(page.get('modified', []))
+                    stats["removed"] += len(removed)
+                    stats["pages"] += 1
+                    cursor = page['next_cursor']
+                    if on_page:
+                        on_page(dict(stats))
+                    if not page.get('has_more'):
+                        break
+                break
+            except Exception as e:
+                # Plaid asks clients to restart pagination from the original cursor
+                if _plaid_error_code(e) != 'TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION' or attempt == self.max_restarts:
+                    raise
+                log_warning("Plaid data changed during sync - restarting", item_id=item_id, attempt=attempt + 1)
+
+        if cursor != start_cursor:
+            await self.db.update_plaid_cursor(item_id, cursor)
+
+        log_info("Plaid item synced", item_id=item_id, user_id=user_id, **stats)
+        return stats
+
+
+# Global instance
+plaid_sync = PlaidTransactionSync()
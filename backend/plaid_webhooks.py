@@ -0,0 +1,95 @@
+"""
+Plaid webhook verification.
+Plaid signs every webhook with an ES256 JWT in the Plaid-Verification header;
+its payload carries the SHA-256 of the request body and when it was issued.
+The signing key (looked up by the JWT's kid through
+/webhook_verification_key/get) is cached per process and re-fetched every
+KEY_REFRESH_SECONDS, so a key Plaid has since expired stops being accepted.
+"""
+import hashlib
+import hmac
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import jwt
+
+from clients import clients
+from logging_config import log_warning
+from request_timing import track
+
+# Plaid: reject webhooks whose token was issued more than five minutes ago
+MAX_WEBHOOK_AGE_SECONDS = 5 * 60
+# A cached key is checked against Plaid again (for expired_at) after this long
+KEY_REFRESH_SECONDS = 60 * 60
+
+
+class PlaidWebhookVerifier:
+    """Checks the Plaid-Verification JWT against the raw request body"""
+
+    def __init__(
+        self,
+        plaid_client=None,
+        max_age: int = MAX_WEBHOOK_AGE_SECONDS,
+        key_refresh: float = KEY_REFRESH_SECONDS
+    ):
+        self._client = plaid_client
+        self.max_age = max_age
+        self.key_refresh = key_refresh
+        # kid -> (key, monotonic time it was fetched)
+        self._keys: Dict[str, Tuple[jwt.PyJWK, float]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        return self._client or clients.plaid
+
+    def verify(self, body: bytes, token: Optional[str]) -> bool:
+        """True only for a current, correctly signed token covering exactly `body`"""
+        if not token:
+            return False
+        try:
+            header = jwt.get_unverified_header(token)
+            if header.get("alg") != "ES256" or not header.get("kid"):
+                return False
+            key = self._key(header["kid"])
+            if key is None:
+                return False
+            claims = jwt.decode(token, key=key, algorithms=["ES256"], options={"require": ["iat"]})
+        except jwt.PyJWTError as e:
+            log_warning("Rejected Plaid webhook token", error=str(e))
+            return False
+
+        if time.time() - claims["iat"] > self.max_age:
+            return False
+        expected = claims.get("request_body_sha256", "")
+        return hmac.compare_digest(hashlib.sha256(body).hexdigest(), str(expected))
+
+    def _key(self, kid: str) -> Optional[jwt.PyJWK]:
+        cached = self._keys.get(kid)
+        if cached is not None and time.monotonic() - cached[1] < self.key_refresh:
+            return cached[0]
+
+        from plaid.model.webhook_verification_key_get_request import WebhookVerificationKeyGetRequest
+
+        try:
+            with track("plaid"):
+                response = self.client.webhook_verification_key_get(WebhookVerificationKeyGetRequest(key_id=kid))
+        except Exception as e:
+            # Unknown kid or Plaid unreachable: the webhook can't be trusted
+            log_warning("Plaid webhook key lookup failed", kid=kid, error=str(e))
+            return None
+        jwk = response.to_dict()["key"]
+        if jwk.get("expired_at"):
+            # Retired since it was cached (or already when first seen)
+            with self._lock:
+                self._keys.pop(kid, None)
+            return None
+        key = jwt.PyJWK(jwk, algorithm="ES256")
+        with self._lock:
+            self._keys[kid] = (key, time.monotonic())
+        return key
+
+
+# Global instance
+plaid_webhooks = PlaidWebhookVerifier()
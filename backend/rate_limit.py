@@ -0,0 +1,49 @@
+"""
+Distributed rate limiting for the API.
+The token buckets live in token_bucket (shared with the Celery worker); this
+module adds the FastAPI side: 429 responses with Retry-After and the
+X-RateLimit-* headers, and per-client-IP keys.
+"""
+import os
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response
+
+from token_bucket import RateLimitResult, TokenBucketLimiter
+
+
+def client_key(request: Request) -> str:
+    """
+    Bucket per client IP. A user_id in the request body is caller-chosen, so
+    per-user limits on unauthenticated endpoints must be paired with this one.
+    """
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+class RateLimiter(TokenBucketLimiter):
+    """Token buckets that answer 429 when empty"""
+
+    def enforce(self, key: str, limit: str, response: Optional[Response] = None) -> RateLimitResult:
+        """hit(), raising 429 with Retry-After when the bucket is empty"""
+        result = self.hit(key, limit)
+        if not result.allowed:
+            raise HTTPException(status_code=429, detail=f"Rate limit exceeded: {limit}", headers=result.headers())
+        if response is not None:
+            response.headers.update(result.headers())
+        return result
+
+    def enforce_all(self, limits: List[Tuple[str, str]], response: Optional[Response] = None) -> None:
+        """enforce() each (key, limit); tokens already taken are refunded if a later bucket is empty"""
+        taken: List[Tuple[str, str]] = []
+        try:
+            for key, limit in limits:
+                self.enforce(key, limit, response)
+                taken.append((key, limit))
+        except HTTPException:
+            for key, limit in taken:
+                self.refund(key, limit)
+            raise
+
+
+# Global instance
+rate_limiter = RateLimiter(enabled=os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true')
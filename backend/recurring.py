@@ -0,0 +1,203 @@
+"""
+Recurring-charge detection over transaction history.
+Groups transactions by (user, normalized merchant) and, with NumPy, measures
+inter-arrival periodicity and amount stability per group in a few sorted,
+vectorized passes. Groups charging on a weekly, monthly or annual rhythm
+become candidate subscriptions with a confidence score.
+"""
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from merchants import clean_descriptor
+from signatures import resolve_vendor
+
+# name, interval days, tolerance days, minimum charges
+PERIODS = (
+    ("weekly", 7.0, 1.5, 4),
+    ("monthly", 30.44, 4.0, 3),
+    ("annual", 365.25, 20.0, 2),
+)
+
+# Charges within this fraction of the group's median amount count as stable
+AMOUNT_TOLERANCE = 0.15
+# Gaps shorter than this are auth/settle pairs or splits, not separate cycles
+MIN_GAP_DAYS = 0.5
+
+@lru_cache(maxsize=65536)
+def merchant_key(descriptor: str) -> str:
+    """Known vendor for the descriptor, else its cleaned form ('ACME GYM 0042 NY' -> 'ACME GYM')"""
+    return resolve_vendor(descriptor) or clean_descriptor(descriptor) or (descriptor or '').upper()
+
+
+def _group_median(groups: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+    """Median of values per group id (NaN for empty groups)"""
+    medians = np.full(n_groups, np.nan)
+    if not len(values):
+        return medians
+    order = np.lexsort((values, groups))
+    ordered = values[order]
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    present = counts > 0
+    lo = starts[present] + (counts[present] - 1) // 2
+    hi = starts[present] + counts[present] // 2
+    medians[present] = (ordered[lo] + ordered[hi]) / 2
+    return medians
+
+
+def detect_recurring_arrays(
+    group_ids: np.ndarray,
+    days: np.ndarray,
+    amounts: np.ndarray,
+    now_days: float
+) -> Dict[str, np.ndarray]:
+    """
+    Per-group recurrence statistics from columnar input.
+    group_ids: dense ints 0..G-1; days: timestamps in (fractional) days; amounts: charge sizes.
+    Returns arrays indexed by group id.
+    """
+    group_ids = np.asarray(group_ids, dtype=np.int64)
+    days = np.asarray(days, dtype=np.float64)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    n_groups = int(group_ids.max()) + 1 if len(group_ids) else 0
+
+    order = np.lexsort((days, group_ids))
+    group_ids, days, amounts = group_ids[order], days[order], amounts[order]
+
+    counts = np.bincount(group_ids, minlength=n_groups)
+    ends = np.cumsum(counts) - 1
+    present = counts > 0
+    first_day = np.full(n_groups, np.nan)
+    last_day = np.full(n_groups, np.nan)
+    first_day[present] = days[ends[present] - counts[present] + 1]
+    last_day[present] = days[ends[present]]
+
+    # Inter-arrival gaps within each group
+    same = group_ids[1:] == group_ids[:-1]
+    gaps = np.diff(days)[same]
+    gap_groups = group_ids[1:][same]
+    real = gaps >= MIN_GAP_DAYS
+    gaps, gap_groups = gaps[real], gap_groups[real]
+    gap_counts = np.bincount(gap_groups, minlength=n_groups)
+    median_gap = _group_median(gap_groups, gaps, n_groups)
+
+    # Classify each group's median gap against the known periods
+    period = np.full(n_groups, -1, dtype=np.int64)
+    tolerance = np.full(n_groups, np.nan)
+    min_charges = np.zeros(n_groups, dtype=np.int64)
+    for idx, (_, interval, tol, minimum) in enumerate(PERIODS):
+        match = (period < 0) & (np.abs(median_gap - interval) <= tol)
+        period[match] = idx
+        tolerance[match] = tol
+        min_charges[match] = minimum
+
+    # Share of gaps within tolerance of the median gap
+    on_rhythm = np.abs(gaps - median_gap[gap_groups]) <= np.nan_to_num(tolerance[gap_groups])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        regularity = np.bincount(gap_groups, weights=on_rhythm, minlength=n_groups) / gap_counts
+
+    # Share of charges within AMOUNT_TOLERANCE of the median amount
+    median_amount = _group_median(group_ids, amounts, n_groups)
+    ref = median_amount[group_ids]
+    stable = np.abs(amounts - ref) <= AMOUNT_TOLERANCE * np.abs(ref) + 0.01
+    with np.errstate(invalid='ignore', divide='ignore'):
+        amount_stability = np.bincount(group_ids, weights=stable, minlength=n_groups) / counts
+
+    # Fewer charges than the period needs -> scaled down, more -> full weight
+    support = np.minimum(1.0, counts / (min_charges + 1).clip(min=1))
+    confidence = np.nan_to_num((0.6 * regularity + 0.4 * amount_stability) * support)
+    confidence[(period < 0) | (counts < min_charges)] = 0.0
+
+    # Still charging: the next expected charge is not overdue by more than half a cycle
+    active = (now_days - last_day) <= median_gap * 1.5 + np.nan_to_num(tolerance)
+
+    return {
+        "count": counts,
+        "period": period,
+        "interval_days": median_gap,
+        "amount": median_amount,
+        "regularity": np.nan_to_num(regularity),
+        "amount_stability": np.nan_to_num(amount_stability),
+        "confidence": confidence,
+        "first_day": first_day,
+        "last_day": last_day,
+        "active": active,
+    }
+
+
+def _iso_seconds(value) -> str:
+    """'YYYY-MM-DDTHH:MM:SS' in UTC; strings are assumed to be UTC already (as stored)"""
+    if isinstance(value, str):
+        return value[:19]
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()[:19]
+
+
+def _to_epoch_days(values: List) -> np.ndarray:
+    """ISO strings / datetimes -> days since the epoch"""
+    stamps = np.array([_iso_seconds(v) for v in values], dtype='datetime64[s]')
+    return stamps.astype(np.int64) / 86400.0
+
+
+def _from_epoch_days(day: float) -> str:
+    return (datetime(1970, 1, 1) + timedelta(days=float(day))).date().isoformat()
+
+
+def detect_recurring_charges(
+    transactions: Iterable[Dict],
+    now: Optional[datetime] = None,
+    min_confidence: float = 0.5,
+    include_inactive: bool = False
+) -> List[Dict]:
+    """
+    Candidate subscriptions from transaction rows (user_id, merchant, amount, created_at).
+    Positive amounts are charges; refunds and credits are ignored.
+    """
+    keys: Dict[tuple, int] = {}
+    group_ids, amounts, stamps = [], [], []
+    for tx in transactions:
+        amount = float(tx.get('amount') or 0)
+        if amount <= 0:
+            continue
+        key = (tx.get('user_id'), merchant_key(tx.get('merchant') or ''))
+        group_ids.append(keys.setdefault(key, len(keys)))
+        amounts.append(amount)
+        stamps.append(tx['created_at'])
+
+    if not group_ids:
+        return []
+
+    now_days = _to_epoch_days([now or datetime.utcnow()])[0]
+    stats = detect_recurring_arrays(np.array(group_ids), _to_epoch_days(stamps), np.array(amounts), now_days)
+
+    selected = stats["confidence"] >= min_confidence
+    if not include_inactive:
+        selected &= stats["active"]
+
+    groups = list(keys)
+    candidates = []
+    for gid in np.flatnonzero(selected):
+        user_id, merchant = groups[gid]
+        interval = stats["interval_days"][gid]
+        candidates.append({
+            "user_id": user_id,
+            "merchant": merchant,
+            "period": PERIODS[stats["period"][gid]][0],
+            "interval_days": round(float(interval), 1),
+            "amount": round(float(stats["amount"][gid]), 2),
+            "occurrences": int(stats["count"][gid]),
+            "first_seen": _from_epoch_days(stats["first_day"][gid]),
+            "last_charge": _from_epoch_days(stats["last_day"][gid]),
+            "next_charge_date": _from_epoch_days(stats["last_day"][gid] + interval),
+            "regularity": round(float(stats["regularity"][gid]), 3),
+            "amount_stability": round(float(stats["amount_stability"][gid]), 3),
+            "confidence": round(float(stats["confidence"][gid]), 3),
+            "active": bool(stats["active"][gid]),
+        })
+
+    candidates.sort(key=lambda c: (str(c["user_id"]), -c["confidence"]))
+    return candidates
@@ -0,0 +1,202 @@
+"""
+Renewal calendar for trial-end and renewal alerts.
+Buckets subscription IDs by their next charge day so alert jobs can
+range-query the next N days instead of scanning every subscription.
+Backed by a Redis sorted set (score = day ordinal) with an in-memory fallback.
+Subscription writes keep it current between nightly rebuilds; readers only
+trust it while a rebuild marker is present (see is_ready).
+"""
+import time
+from bisect import bisect_left, bisect_right, insort
+from calendar import monthrange
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from cache import cache, CacheService
+
+CALENDAR_KEY = "renewals:calendar"
+# A rebuild vouches for the calendar this long; past it (a missed nightly run,
+# a failed write-through) readers go back to the database
+READY_TTL = 26 * 3600
+# Billing cycle -> months between charges; weekly plans step by days instead
+CYCLE_MONTHS = {"monthly": 1, "quarterly": 3, "annual": 12, "yearly": 12}
+
+
+def billing_cycle(subscription: Dict) -> str:
+    """A subscription's billing cycle ('period' as named by recurring.PERIODS), monthly if unknown"""
+    metadata = subscription.get('metadata') or {}
+    for field in ('billing_cycle', 'period'):
+        cycle = subscription.get(field) or metadata.get(field)
+        if cycle:
+            return str(cycle).lower()
+    return "monthly"
+
+
+def _add_months(d: date, months: int) -> date:
+    year, month = divmod(d.month - 1 + months, 12)
+    year, month = d.year + year, month + 1
+    # Jan 31 + 1 month -> Feb 28/29
+    return date(year, month, min(d.day, monthrange(year, month)[1]))
+
+
+def roll_forward(charge_date: date, cycle: str, not_before: date) -> date:
+    """
+    First charge on or after `not_before`, stepping whole billing cycles from
+    charge_date (several if runs were missed); short months clamp the day.
+    """
+    if charge_date >= not_before:
+        return charge_date
+    if cycle == "weekly":
+        weeks = -(-(not_before - charge_date).days // 7)
+        return charge_date + timedelta(weeks=weeks)
+    step = CYCLE_MONTHS.get(cycle, 1)
+    cycles = max(1, ((not_before.year - charge_date.year) * 12 + not_before.month - charge_date.month) // step)
+    candidate = _add_months(charge_date, cycles * step)
+    while candidate < not_before:
+        cycles += 1
+        candidate = _add_months(charge_date, cycles * step)
+    return candidate
+
+
+class RenewalCalendar:
+    """Day-bucketed index of subscription_id -> next charge date"""
+
+    def __init__(self, cache_service: CacheService = cache, key: str = CALENDAR_KEY):
+        self.cache = cache_service
+        self.key = key
+        self.staging_key = f"{key}:staging"
+        self.rebuilding_key = f"{key}:rebuilding"
+        # In-memory fallback: day ordinal -> subscription IDs, plus sorted days for range scans
+        self._buckets: Dict[int, Set[str]] = {}
+        self._days: List[int] = []
+        self._day_of: Dict[str, int] = {}
+        self._ready_until = 0.0
+
+    @property
+    def redis(self):
+        return self.cache.client if self.cache.enabled else None
+
+    def schedule(self, subscription_id: str, charge_date: date) -> None:
+        """Add or move a subscription to its next charge day"""
+        day = charge_date.toordinal()
+
+        redis = self.redis
+        if redis:
+            pipe = redis.pipeline()
+            pipe.zadd(self.key, {subscription_id: day})
+            pipe.exists(self.rebuilding_key)
+            if pipe.execute()[-1]:
+                # A rebuild is reading the DB right now; its snapshot may predate this write
+                redis.zadd(self.staging_key, {subscription_id: day})
+            return
+
+        self._remove_local(subscription_id)
+        bucket = self._buckets.get(day)
+        if bucket is None:
+            bucket = self._buckets[day] = set()
+            insort(self._days, day)
+        bucket.add(subscription_id)
+        self._day_of[subscription_id] = day
+
+    def unschedule(self, subscription_id: str) -> None:
+        """Drop a subscription (killed, or charge date unknown)"""
+        redis = self.redis
+        if redis:
+            pipe = redis.pipeline()
+            pipe.zrem(self.key, subscription_id)
+            pipe.zrem(self.staging_key, subscription_id)
+            pipe.execute()
+            return
+
+        self._remove_local(subscription_id)
+
+    def is_ready(self) -> bool:
+        """True while the last full rebuild is recent and no write-through has failed since"""
+        if self.redis:
+            return bool(self.redis.exists(f"{self.key}:ready"))
+        return time.time() < self._ready_until
+
+    def invalidate(self) -> None:
+        """Stop readers trusting the calendar until the next rebuild"""
+        if self.redis:
+            self.redis.delete(f"{self.key}:ready")
+        self._ready_until = 0.0
+
+    def due_between(self, start: date, end: date) -> List[str]:
+        """Subscription IDs charging between start and end, inclusive"""
+        lo, hi = start.toordinal(), end.toordinal()
+
+        if self.redis:
+            return self.redis.zrangebyscore(self.key, lo, hi)
+
+        result: List[str] = []
+        for day in self._days[bisect_left(self._days, lo):bisect_right(self._days, hi)]:
+            result.extend(self._buckets[day])
+        return result
+
+    def due_within(self, days: int, today: Optional[date] = None) -> List[str]:
+        """Subscription IDs charging in the next `days` days (today included)"""
+        today = today or date.today()
+        return self.due_between(today, today + timedelta(days=days))
+
+    def rebuild(self, entries: Iterable[Tuple[str, date]], chunk_size: int = 5000) -> int:
+        """
+        Replace the whole calendar, e.g. from a nightly DB range query. `entries`
+        may be a lazy generator over DB pages: writes that land while it is being
+        read go to the staging set too, so they survive the swap.
+        """
+        redis = self.redis
+        if redis:
+            pipe = redis.pipeline()
+            pipe.delete(self.staging_key)
+            pipe.set(self.rebuilding_key, 1, ex=3600)
+            pipe.execute()
+
+            count = 0
+            chunk: Dict[str, int] = {}
+            for sub_id, d in entries:
+                chunk[sub_id] = d.toordinal()
+                if len(chunk) >= chunk_size:
+                    redis.zadd(self.staging_key, chunk)
+                    count, chunk = count + len(chunk), {}
+            if chunk:
+                redis.zadd(self.staging_key, chunk)
+                count += len(chunk)
+
+            pipe = redis.pipeline()
+            if redis.exists(self.staging_key):
+                pipe.rename(self.staging_key, self.key)
+            else:
+                pipe.delete(self.key)
+            pipe.delete(self.rebuilding_key)
+            pipe.set(f"{self.key}:ready", 1, ex=READY_TTL)
+            pipe.execute()
+            return count
+
+        self._buckets, self._days, self._day_of = {}, [], {}
+        count = 0
+        for sub_id, d in entries:
+            self.schedule(sub_id, d)
+            count += 1
+        self._ready_until = time.time() + READY_TTL
+        return count
+
+    def size(self) -> int:
+        if self.redis:
+            return self.redis.zcard(self.key)
+        return len(self._day_of)
+
+    def _remove_local(self, subscription_id: str) -> None:
+        day = self._day_of.pop(subscription_id, None)
+        if day is None:
+            return
+
+        bucket = self._buckets[day]
+        bucket.discard(subscription_id)
+        if not bucket:
+            del self._buckets[day]
+            self._days.pop(bisect_left(self._days, day))
+
+
+# Global instance
+renewal_calendar = RenewalCalendar()
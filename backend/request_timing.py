@@ -0,0 +1,136 @@
+"""
+Per-request latency breakdown by dependency.
+track()/timed() attribute time spent in Redis, Supabase, Lithic, binlist,
+etc. to the current request; RequestTimingMiddleware emits the totals as a
+Server-Timing header and logs a breakdown for slow requests.
+Outside a request (Celery tasks, scripts) tracking is a no-op.
+"""
+import functools
+import inspect
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from logging_config import log_warning
+
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', '500'))
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+
+
+class RequestTimings:
+    """Accumulated time per dependency for one request"""
+
+    __slots__ = ('start', 'totals', 'counts', 'active')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        # Dependencies currently being timed, so nested calls aren't double-counted
+        self.active: Dict[str, int] = {}
+
+    def add(self, dependency: str, seconds: float) -> None:
+        self.totals[dependency] = self.totals.get(dependency, 0.0) + seconds
+        self.counts[dependency] = self.counts.get(dependency, 0) + 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def server_timing(self, total: float) -> str:
+        entries = [
+            f'{dep};dur={secs * 1000:.1f};desc="{self.counts[dep]} call{"s" if self.counts[dep] != 1 else ""}"'
+            for dep, secs in self.totals.items()
+        ]
+        entries.append(f'app;dur={total * 1000:.1f}')
+        return ', '.join(entries)
+
+    def breakdown_ms(self) -> Dict[str, float]:
+        return {dep: round(secs * 1000, 2) for dep, secs in self.totals.items()}
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar('request_timings', default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+@contextmanager
+def track(dependency: str):
+    """Attribute the enclosed block's wall time to `dependency`"""
+    timings = _current.get()
+    if timings is None or timings.active.get(dependency):
+        yield
+        return
+
+    timings.active[dependency] = 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(dependency, time.perf_counter() - start)
+        timings.active.pop(dependency, None)
+
+
+def timed(dependency: str):
+    """Decorator form of track() for sync and async functions"""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with track(dependency):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track(dependency):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RequestTimingMiddleware:
+    """Pure ASGI middleware: sets up per-request timings, adds Server-Timing, logs slow requests"""
+
+    def __init__(self, app, slow_ms: float = SLOW_REQUEST_MS, emit_header: bool = SERVER_TIMING_ENABLED):
+        self.app = app
+        self.slow_seconds = slow_ms / 1000
+        self.emit_header = emit_header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status = {"code": 500}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if self.emit_header:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timings.server_timing(timings.elapsed()).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            total = timings.elapsed()
+            if total >= self.slow_seconds:
+                breakdown = timings.breakdown_ms()
+                log_warning(
+                    "Slow request",
+                    method=scope.get("method"),
+                    path=scope.get("path"),
+                    status=status["code"],
+                    duration_ms=round(total * 1000, 2),
+                    unattributed_ms=round(total * 1000 - sum(breakdown.values()), 2),
+                    breakdown=breakdown,
+                )
@@ -0,0 +1,146 @@
+"""
+Scan jobs: progress and partial results for long Gmail and bank scans.
+POST /scan/jobs enqueues one worker task per part (the mailbox, each linked
+bank item) and returns at once; tasks append events to the job's Redis list
+as messages are analyzed and pages land, and the API streams that list to
+the app as Server-Sent Events. A bank part's 'progress' events carry the
+task attempt: a retry starts its page counts over, replacing earlier ones.
+"""
+import json
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from cache import cache, CacheService
+
+# Jobs and their event logs are kept this long after the last write
+SCAN_JOB_TTL = 3600
+# Cap on 'result' events per job so a huge mailbox can't grow a log without
+# bound; lifecycle events (part_started, part_done, complete) are always kept
+MAX_RESULT_EVENTS = 5000
+
+QUEUED, RUNNING, COMPLETE, FAILED = "queued", "running", "complete", "failed"
+
+
+class ScanJobStore:
+    """Job metadata and an append-only event log per job, in Redis or in memory"""
+
+    def __init__(self, cache_service: CacheService = cache, ttl: int = SCAN_JOB_TTL):
+        self.cache = cache_service
+        self.ttl = ttl
+        # In-memory fallback (single process, e.g. tasks run eagerly): job -> meta, job -> events
+        self._jobs: Dict[str, Dict] = {}
+        self._events: Dict[str, List[str]] = {}
+
+    @property
+    def redis(self):
+        return self.cache.client if self.cache.enabled else None
+
+    def create(self, user_id: str, parts: List[str]) -> str:
+        """New job waiting on `parts` ('gmail', 'bank:<item_id>'); returns its id"""
+        job_id = uuid.uuid4().hex
+        meta = {"user_id": user_id, "status": QUEUED, "pending": len(parts), "created_at": int(time.time())}
+        redis = self.redis
+        if redis:
+            pipe = redis.pipeline()
+            pipe.hset(f"scan:job:{job_id}", mapping=meta)
+            pipe.expire(f"scan:job:{job_id}", self.ttl)
+            pipe.execute()
+        else:
+            self._jobs[job_id] = meta
+        self.publish(job_id, "queued", {"job_id": job_id, "parts": parts})
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        redis = self.redis
+        if redis:
+            meta = redis.hgetall(f"scan:job:{job_id}")
+            if not meta:
+                return None
+            meta.update(pending=int(meta["pending"]), created_at=int(meta["created_at"]))
+        else:
+            meta = dict(self._jobs.get(job_id) or {})
+            if not meta:
+                return None
+        # Internal: already reflected in the final status / the event log
+        meta.pop("failed", None)
+        meta.pop("results", None)
+        return meta
+
+    def publish(self, job_id: str, event: str, data: Dict) -> None:
+        """Append one event to the job's log; results past MAX_RESULT_EVENTS are dropped"""
+        record = json.dumps({"event": event, "data": data}, separators=(',', ':'))
+        redis = self.redis
+        if redis:
+            if event == "result" and redis.hincrby(f"scan:job:{job_id}", "results", 1) > MAX_RESULT_EVENTS:
+                return
+            key = f"scan:job:{job_id}:events"
+            pipe = redis.pipeline()
+            pipe.rpush(key, record)
+            pipe.expire(key, self.ttl)
+            pipe.execute()
+            return
+        if event == "result":
+            meta = self._jobs.setdefault(job_id, {})
+            meta["results"] = meta.get("results", 0) + 1
+            if meta["results"] > MAX_RESULT_EVENTS:
+                return
+        self._events.setdefault(job_id, []).append(record)
+
+    def events(self, job_id: str, start: int = 0) -> List[Tuple[int, str, Dict]]:
+        """(index, event, data) for every event from `start` on"""
+        redis = self.redis
+        if redis:
+            records = redis.lrange(f"scan:job:{job_id}:events", start, -1)
+        else:
+            records = self._events.get(job_id, [])[start:]
+        decoded = [json.loads(record) for record in records]
+        return [(start + i, record["event"], record["data"]) for i, record in enumerate(decoded)]
+
+    def start_part(self, job_id: str, part: str) -> None:
+        self._set_status(job_id, RUNNING)
+        self.publish(job_id, "part_started", {"part": part})
+
+    def finish_part(self, job_id: str, part: str, status: str = COMPLETE, **result) -> None:
+        """Close one part; the last one to finish closes the job"""
+        self.publish(job_id, "part_done", {"part": part, "status": status, **result})
+        redis = self.redis
+        if redis:
+            key = f"scan:job:{job_id}"
+            pipe = redis.pipeline()
+            if status == FAILED:
+                pipe.hset(key, "failed", 1)
+            pipe.hincrby(key, "pending", -1)
+            pipe.hget(key, "failed")
+            *_, remaining, failed = pipe.execute()
+            failed = bool(failed)
+        else:
+            meta = self._jobs.get(job_id, {})
+            meta["pending"] = remaining = meta.get("pending", 1) - 1
+            if status == FAILED:
+                meta["failed"] = 1
+            failed = bool(meta.get("failed"))
+
+        # Exactly one finisher sees 0, so 'complete' is published once; it goes in
+        # the log before the status flips, so a stream that sees the final status
+        # has already been handed the event
+        if remaining == 0:
+            final = FAILED if failed else COMPLETE
+            self.publish(job_id, "complete", {"status": final})
+            self._set_status(job_id, final)
+
+    def _set_status(self, job_id: str, status: str) -> None:
+        redis = self.redis
+        if redis:
+            redis.hset(f"scan:job:{job_id}", "status", status)
+        elif job_id in self._jobs:
+            self._jobs[job_id]["status"] = status
+
+
+def sse(index: int, event: str, data: Dict) -> bytes:
+    """One Server-Sent Events message; `id` lets EventSource resume with Last-Event-ID"""
+    return f"id: {index}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+# Global instance
+scan_jobs = ScanJobStore()
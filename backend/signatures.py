@@ -1,9 +1,23 @@
+"""
+Signature database of known subscription vendors: category, cancel URL,
+matching keywords and plan-optimization tips, plus currency normalization.
+"""
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+from merchants import MerchantIndex
+
+# Optional "tips" per vendor: the first rule whose min_price the USD price exceeds
+# applies (no min_price = any price). Savings are a fixed amount or a rate of the price.
 SUBSCRIPTION_SIGNATURES = {
     # Video
     "Netflix": {
         "category": "Video",
         "cancel_url": "https://www.netflix.com/cancelplan",
         "keywords": ["netflix"],
+        "tips": [
+            {"min_price": 10.0, "tip": "Switch to Standard (Non-HD) to save $6.50", "savings": 6.50},
+        ],
     },
     "Disney+": {
         "category": "Video",
@@ -46,6 +60,9 @@ SUBSCRIPTION_SIGNATURES = {
         "category": "Music",
         "cancel_url": "https://www.spotify.com/account/subscription/",
         "keywords": ["spotify"],
+        "tips": [
+            {"tip": "Get the Student or Duo plan", "savings": 3.00},
+        ],
     },
     "Apple Music": {
         "category": "Music",
@@ -145,6 +162,9 @@ SUBSCRIPTION_SIGNATURES = {
         "category": "Lifestyle/Health",
         "cancel_url": "https://gympass.com/us/settings/subscription",
         "keywords": ["gympass"],
+        "tips": [
+            {"tip": "Try Pay-as-you-go instead", "savings": 15.00},
+        ],
     },
 
     # Storage/Utilities
@@ -175,6 +195,82 @@ SUBSCRIPTION_SIGNATURES = {
     },
 }
 
+# Tips for names outside the signature database, matched by keyword
+KEYWORD_TIPS = {
+    "gym": [{"tip": "Try Pay-as-you-go instead", "savings": 15.00}],
+    "fitness": [{"tip": "Try Pay-as-you-go instead", "savings": 15.00}],
+}
+
+# Checked after vendor/keyword rules for every subscription
+GENERIC_TIPS = [
+    {"min_price": 50.0, "tip": "Review annual billing options", "savings_rate": 0.15},
+]
+
+NO_TIP = ("No optimizations found", 0.0)
+
+# (min_price, tip, fixed savings, savings rate)
+TipRule = Tuple[float, str, float, float]
+
+def _compile_rules(rules: List[Dict]) -> Tuple[TipRule, ...]:
+    return tuple(
+        (rule.get("min_price", float("-inf")), rule["tip"], rule.get("savings", 0.0), rule.get("savings_rate", 0.0))
+        for rule in rules
+    )
+
+def _compile_tip_index() -> Dict[str, Tuple[TipRule, ...]]:
+    """Lower-cased vendor -> that vendor's own rules, for vendors that have any"""
+    return {
+        vendor.lower(): _compile_rules(data["tips"])
+        for vendor, data in SUBSCRIPTION_SIGNATURES.items() if data.get("tips")
+    }
+
+TIP_INDEX = _compile_tip_index()
+GENERIC_RULES = _compile_rules(GENERIC_TIPS)
+
+@lru_cache(maxsize=4096)
+def _tip_rules(name: str) -> Tuple[TipRule, ...]:
+    # Plan names ('Spotify Family', 'netflix basic') tip as their vendor
+    vendor = resolve_name(name)
+    rules = TIP_INDEX.get((vendor or name).lower())
+    if rules is not None:
+        return rules + GENERIC_RULES
+    # No tip of the vendor's own ('Peloton fitness'): the keyword rules still apply
+    name = name.lower()
+    keyword_rules = tuple(
+        rule for keyword, keyword_tips in KEYWORD_TIPS.items() if keyword in name
+        for rule in _compile_rules(keyword_tips)
+    )
+    return keyword_rules + GENERIC_RULES
+
+def get_optimization_tip(name: str, price: float) -> Tuple[str, float]:
+    """(tip, estimated monthly savings) for a vendor at a USD price"""
+    for min_price, tip, savings, rate in _tip_rules(name):
+        if price > min_price:
+            return tip, savings + price * rate
+    return NO_TIP
+
+def evaluate_tips(portfolio: Iterable[Tuple[str, float]]) -> List[Tuple[str, float]]:
+    """get_optimization_tip() for every (name, USD price) pair in a portfolio"""
+    return [get_optimization_tip(name, price) for name, price in portfolio]
+
+# Exact keywords, then fuzzy trigram matching for raw card descriptors
+VENDOR_INDEX = MerchantIndex(SUBSCRIPTION_SIGNATURES)
+
+def resolve_vendor(descriptor: str):
+    """Known vendor for a card or bank descriptor ('SPOTIFY P1A2B3' -> 'Spotify'), or None"""
+    return VENDOR_INDEX.lookup(descriptor or '')
+
+def resolve_name(name: str):
+    """Known vendor for a subscription or sender name, by exact keyword only ('Spotify Family' -> 'Spotify')"""
+    return VENDOR_INDEX.match_name(name or '')
+
+def detect_subscription_metadata(name: str):
+    """Matches a vendor name to our Signature Database."""
+    vendor = resolve_name(name)
+    if vendor is not None:
+        return vendor, SUBSCRIPTION_SIGNATURES[vendor]
+    return name, {"category": "Other", "cancel_url": None}
+
 EXCHANGE_RATES = {
     "USD": 1.0,
     "GBP": 0.79,
@@ -3,12 +3,33 @@ Celery background tasks for periodic operations.
 Handles Gmail scanning, trial expiration checks, and analytics.
 """
 import os
+import asyncio
+import datetime
+from functools import partial
+from typing import Dict, List, Optional
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_process_init, worker_process_shutdown
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Worker-side services only: nothing below may import main/FastAPI or Lithic,
+# and Plaid loads on the first bank sync. Imported once in the parent so prefork children inherit the loaded
+# modules; connections are opened lazily in each child (see init_worker_process).
+from database import db
+from cache import cache
+from logging_config import log_info, log_error, LogContext, setup_sentry
+from notification_service import notification_service
+from notification_dispatcher import NotificationDispatcher, get_push_provider
+from renewal_calendar import renewal_calendar, billing_cycle, roll_forward
+from analysis_pool import analysis_pipeline
+from recurring import detect_recurring_charges
+from plaid_sync import plaid_sync
+from leak_detector import leak_detector, event_from_lithic, SETTLED
+from scan_jobs import scan_jobs, FAILED
+from gmail_scanner import build_gmail_service, credentials_from_token, scan_mailbox, scan_mailbox_parallel
+
 # Configure Celery
 redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
 celery_app = Celery(
@@ -24,13 +45,46 @@ celery_app.conf.update(
     result_serializer='json',
     timezone='UTC',
     enable_utc=True,
-    task_track_started=True,
+    # Skipping the extra STARTED state write saves a backend round trip per task
+    task_track_started=os.getenv('CELERY_TRACK_STARTED', 'true').lower() == 'true',
     task_time_limit=300,  # 5 minutes max
-    worker_prefetch_multiplier=1,
+    # 1 suits the long scans; raise it for floods of short tasks (webhooks, alerts)
+    worker_prefetch_multiplier=int(os.getenv('CELERY_PREFETCH_MULTIPLIER', '1')),
+    worker_max_tasks_per_child=int(os.getenv('CELERY_MAX_TASKS_PER_CHILD', '0')) or None,
 )
 
+# Open Redis/Supabase connections when a child starts instead of on its first task
+WARM_CONNECTIONS = os.getenv('CELERY_WARM_CONNECTIONS', 'true').lower() == 'true'
+
+# Trial/renewal alerts fire at 3, 1 and 0 days out
+ALERT_LOOKAHEAD_DAYS = 3
+# How far ahead the renewal calendar is populated
+CALENDAR_HORIZON_DAYS = 31
+# History read for recurring-charge detection; over a year so annual plans show twice
+RECURRING_LOOKBACK_DAYS = 400
+# Transactions analysed per vectorized detection batch
+RECURRING_BATCH_SIZE = 200000
+# An unchanged duplicate group is not re-alerted within this window
+DUPLICATE_ALERT_TTL = 30 * 86400
+# Linked bank items enqueued per page by the nightly sync sweep
+PLAID_ITEMS_PAGE_SIZE = 1000
+# Scanned subscriptions stay cached until the next nightly scan has replaced them
+SCAN_RESULTS_TTL = 36 * 3600
+
 # Periodic task schedule
 celery_app.conf.beat_schedule = {
+    'roll-renewals-forward': {
+        'task': 'tasks.roll_renewals_forward',
+        'schedule': crontab(hour=0, minute=45),  # 12:45 AM daily, ahead of the calendar rebuild
+    },
+    'rebuild-renewal-calendar': {
+        'task': 'tasks.rebuild_renewal_calendar',
+        'schedule': crontab(hour=1, minute=0),  # 1 AM daily, ahead of the trial check
+    },
+    'sync-all-plaid-items': {
+        'task': 'tasks.sync_all_plaid_items',
+        'schedule': crontab(hour=0, minute=30),  # 12:30 AM daily, ahead of recurring detection
+    },
     'scan-all-users-gmail': {
         'task': 'tasks.scan_all_users',
         'schedule': crontab(hour=2, minute=0),  # 2 AM daily
@@ -39,27 +93,83 @@ celery_app.conf.beat_schedule = {
         'task': 'tasks.check_trials',
         'schedule': crontab(hour=10, minute=0),  # 10 AM daily
     },
+    'detect-duplicate-subscriptions': {
+        'task': 'tasks.detect_duplicates',
+        'schedule': crontab(hour=3, minute=0, day_of_week=1),  # 3 AM Mondays
+    },
+    'detect-recurring-charges': {
+        'task': 'tasks.detect_recurring_charges',
+        'schedule': crontab(hour=4, minute=0),  # 4 AM daily
+    },
+    'rescore-leak-holds': {
+        'task': 'tasks.rescore_leak_holds',
+        'schedule': crontab(minute=15),  # Hourly: authorizations go stale with time
+    },
     'update-analytics': {
         'task': 'tasks.update_analytics',
         'schedule': crontab(minute=0),  # Every hour
     },
 }
 
+# One event loop per worker process, reused by every task
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def run_async(coro):
+    """Run a DatabaseService coroutine without asyncio.run()'s per-call loop setup/teardown"""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coro)
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Per-child setup after fork; sockets must never be shared with the parent"""
+    from sentry_sdk.integrations.celery import CeleryIntegration
+    setup_sentry(integrations=[CeleryIntegration()])
+    
+    cache.close()
+    db.close()
+    if WARM_CONNECTIONS:
+        cache.connect()
+        db.client
+
+@worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    global _loop
+    analysis_pipeline.shutdown()
+    cache.close()
+    db.close()
+    if _loop is not None:
+        _loop.close()
+        _loop = None
+
 # Tasks
 @celery_app.task(name='tasks.scan_all_users')
 def scan_all_users():
-    """Scan Gmail for all users to detect new subscriptions"""
-    from database import db
-    from logging_config import log_info, log_error
+    """Enqueue a full Gmail scan for every user with a linked mailbox"""
+    page_size = 1000
     
     try:
         log_info("Starting Gmail scan for all users")
         
-        # This would iterate through all users
-        # For now, it's a placeholder
+        # One task per user: each fits task_time_limit, a bad mailbox fails alone,
+        # and the scans spread over every worker process
+        enqueued = 0
+        offset = 0
+        while True:
+            users = run_async(db.get_users(limit=page_size, offset=offset))
+            if not users:
+                break
+            
+            for user in users:
+                if (user.get('metadata') or {}).get('gmail_token'):
+                    scan_user_gmail.delay(user['id'], full_mailbox=True)
+                    enqueued += 1
+            
+            offset += page_size
         
-        log_info("Gmail scan completed")
-        return {"status": "success", "users_scanned": 0}
+        log_info("Gmail scans enqueued", users=enqueued)
+        return {"status": "success", "users": enqueued}
     except Exception as e:
         log_error("Gmail scan failed", error=e)
         raise
@@ -67,29 +177,260 @@ def scan_all_users():
 @celery_app.task(name='tasks.check_trials')
 def check_trial_expirations():
     """Check for expiring trials and notify users"""
-    from database import db
-    from logging_config import log_info, log_error
-    import datetime
+    page_size = 1000
+    today = datetime.date.today()
+    end = today + datetime.timedelta(days=ALERT_LOOKAHEAD_DAYS)
     
     try:
         log_info("Checking trial expirations")
         
-        # Get subscriptions with trials ending soon
-        # Send push notifications
+        dispatcher = NotificationDispatcher(get_push_provider())
+        sent = 0
         
-        log_info("Trial check completed")
-        return {"status": "success", "notifications_sent": 0}
+        def pages():
+            # Prefer the calendar while a recent rebuild vouches for it (subscription
+            # writes keep it current in between); otherwise the indexed DB range query
+            due_ids = renewal_calendar.due_between(today, end) if renewal_calendar.is_ready() else None
+            if due_ids is not None:
+                for start in range(0, len(due_ids), page_size):
+                    yield run_async(db.get_subscriptions_by_ids(due_ids[start:start + page_size]))
+                return
+            
+            after = None
+            while True:
+                page = run_async(db.get_subscriptions_due(today, end, limit=page_size, after=after))
+                if not page:
+                    return
+                yield page
+                after = (page[-1]['user_id'], page[-1]['id'])
+        
+        for page in pages():
+            for sub in page:
+                alerts = [
+                    notification_service.check_trial_alerts(sub),
+                    notification_service.check_renewal_reminder(sub),
+                ]
+                notification_service.enqueue(sub['user_id'], [n for n in alerts if n is not None])
+            
+            # Drain per page so the queue stays bounded
+            sent += dispatcher.drain(notification_service)["sent"]
+        
+        log_info("Trial check completed", notifications_sent=sent)
+        return {"status": "success", "notifications_sent": sent}
     except Exception as e:
         log_error("Trial check failed", error=e)
         raise
 
+def _charge_date_updates(sub: Dict, anchor: datetime.date, not_before: datetime.date) -> Optional[Dict]:
+    """Updates moving a subscription's next charge to the first one on or after not_before"""
+    next_charge = roll_forward(anchor, billing_cycle(sub), not_before)
+    if sub.get('next_charge_date') and next_charge.isoformat() == sub['next_charge_date'][:10]:
+        return None
+    updates = {"next_charge_date": next_charge.isoformat()}
+    if sub.get('is_trial') and sub.get('next_charge_date') and anchor < not_before:
+        # The trial's known end date has passed: it's a paid plan now
+        updates["is_trial"] = False
+    return updates
+
+@celery_app.task(name='tasks.roll_renewals_forward')
+def roll_renewals_forward():
+    """Move charge dates that have passed on by their billing cycle, and backfill missing ones"""
+    page_size = 1000
+    today = datetime.date.today()
+    yesterday = today - datetime.timedelta(days=1)
+    
+    def roll(fetch, anchor_of, not_before) -> int:
+        # Updated rows drop out of the query, but keyset pages don't shift as OFFSET would
+        rolled = 0
+        after = None
+        while True:
+            page = run_async(fetch(after))
+            if not page:
+                return rolled
+            after = (page[-1]['user_id'], page[-1]['id'])
+            for sub in page:
+                anchor = anchor_of(sub)
+                updates = _charge_date_updates(sub, anchor, not_before) if anchor else None
+                if updates:
+                    run_async(db.update_subscription(sub['id'], updates))
+                    rolled += 1
+    
+    def detected_on(sub):
+        detected_at = sub.get('detected_at') or sub.get('created_at')
+        return datetime.date.fromisoformat(detected_at[:10]) if detected_at else None
+    
+    try:
+        rolled = roll(
+            lambda after: db.get_subscriptions_due(None, yesterday, limit=page_size, after=after),
+            lambda sub: datetime.date.fromisoformat(sub['next_charge_date'][:10]),
+            today,
+        )
+        # Rows from before next_charge_date existed: billed on their detection
+        # anniversary, from tomorrow on so a guessed date never alerts "today"
+        backfilled = roll(
+            lambda after: db.get_subscriptions_without_charge_date(limit=page_size, after=after),
+            detected_on,
+            today + datetime.timedelta(days=1),
+        )
+        log_info("Renewals rolled forward", rolled=rolled, backfilled=backfilled)
+        return {"status": "success", "rolled": rolled, "backfilled": backfilled}
+    except Exception as e:
+        log_error("Renewal roll-forward failed", error=e)
+        raise
+
+@celery_app.task(name='tasks.rebuild_renewal_calendar')
+def rebuild_renewal_calendar():
+    """Reload the renewal calendar with every charge due in the coming window"""
+    page_size = 1000
+    today = datetime.date.today()
+    end = today + datetime.timedelta(days=CALENDAR_HORIZON_DAYS)
+    
+    def entries():
+        after = None
+        while True:
+            page = run_async(db.get_subscriptions_due(today, end, limit=page_size, after=after))
+            if not page:
+                return
+            for sub in page:
+                yield sub['id'], datetime.date.fromisoformat(sub['next_charge_date'][:10])
+            after = (page[-1]['user_id'], page[-1]['id'])
+    
+    try:
+        # Pages are read inside rebuild() so writes made meanwhile aren't lost in the swap
+        count = renewal_calendar.rebuild(entries())
+        log_info("Renewal calendar rebuilt", entries=count)
+        return {"status": "success", "entries": count}
+    except Exception as e:
+        log_error("Renewal calendar rebuild failed", error=e)
+        raise
+
+@celery_app.task(name='tasks.detect_duplicates')
+def detect_duplicate_subscriptions():
+    """Alert users paying for the same vendor more than once"""
+    page_size = 1000
+    
+    try:
+        log_info("Detecting duplicate subscriptions")
+        
+        dispatcher = NotificationDispatcher(get_push_provider())
+        alerted = 0
+        # user_id -> suppression keys to record once that user's push is delivered
+        unsent: Dict[str, List[tuple]] = {}
+        
+        def alert(user_subs):
+            nonlocal alerted
+            fresh = []
+            for notif in notification_service.check_duplicate_subscriptions(user_subs):
+                # Skip groups already reported with the same subscriptions
+                key = f"dupes:{notif.user_id}:{notif.subscription_name}"
+                ids = sorted(notif.metadata["subscription_ids"])
+                if cache.get(key) == ids:
+                    continue
+                unsent.setdefault(notif.user_id, []).append((key, ids))
+                fresh.append(notif)
+            if fresh:
+                alerted += notification_service.enqueue(fresh[0].user_id, fresh)
+        
+        def mark_sent(user_id):
+            for key, ids in unsent.pop(user_id, []):
+                cache.set(key, ids, ttl=DUPLICATE_ALERT_TTL)
+        
+        def drain():
+            # Failed or rate-limited pushes stay unsuppressed, so the next run alerts again
+            dispatcher.drain(notification_service, on_sent=mark_sent)
+            unsent.clear()
+        
+        # Pages are ordered by user_id, so each user's portfolio is contiguous:
+        # one linear pass with only the current user's subscriptions held in memory
+        current_user, user_subs = None, []
+        after = None
+        while True:
+            page = run_async(db.get_active_subscriptions(limit=page_size, after=after))
+            if not page:
+                break
+            after = (page[-1]['user_id'], page[-1]['id'])
+            for sub in page:
+                if sub['user_id'] != current_user:
+                    if user_subs:
+                        alert(user_subs)
+                    current_user, user_subs = sub['user_id'], []
+                user_subs.append(sub)
+            drain()
+        
+        if user_subs:
+            alert(user_subs)
+        drain()
+        
+        log_info("Duplicate detection completed", notifications=alerted)
+        return {"status": "success", "notifications": alerted}
+    except Exception as e:
+        log_error("Duplicate detection failed", error=e)
+        raise
+
+@celery_app.task(name='tasks.detect_recurring_charges')
+def detect_recurring_charges_task():
+    """Find recurring charges in transaction history and cache them as candidate subscriptions"""
+    page_size = 10000
+    since = datetime.datetime.utcnow() - datetime.timedelta(days=RECURRING_LOOKBACK_DAYS)
+    
+    try:
+        log_info("Detecting recurring charges")
+        
+        users, candidates_found = 0, 0
+        
+        def flush(rows):
+            nonlocal users, candidates_found
+            by_user = {row['user_id']: [] for row in rows if row.get('user_id')}
+            for candidate in detect_recurring_charges(rows):
+                by_user.setdefault(candidate['user_id'], []).append(candidate)
+            for user_id, candidates in by_user.items():
+                cache.cache_recurring_charges(user_id, candidates)
+                candidates_found += len(candidates)
+            users += len(by_user)
+        
+        # Rows arrive ordered by user, so everything before the last user in the
+        # buffer is complete and can be analysed in one vectorized batch
+        pending = []
+        after = None
+        while True:
+            page = run_async(db.get_transactions_page(since, limit=page_size, after=after))
+            if not page:
+                break
+            pending.extend(page)
+            after = (page[-1]['user_id'], page[-1]['id'])
+            
+            if len(pending) >= RECURRING_BATCH_SIZE:
+                last_user = pending[-1]['user_id']
+                split = len(pending)
+                while split and pending[split - 1]['user_id'] == last_user:
+                    split -= 1
+                if split:
+                    flush(pending[:split])
+                    pending = pending[split:]
+        
+        if pending:
+            flush(pending)
+        
+        log_info("Recurring charge detection completed", users=users, candidates=candidates_found)
+        return {"status": "success", "users": users, "candidates": candidates_found}
+    except Exception as e:
+        log_error("Recurring charge detection failed", error=e)
+        raise
+
+@celery_app.task(name='tasks.rescore_leak_holds')
+def rescore_leak_holds():
+    """Flag authorization holds that went stale since their card's last event"""
+    try:
+        cards = leak_detector.rescore_due_holds()
+        log_info("Leak holds rescored", cards=cards)
+        return {"status": "success", "cards": cards}
+    except Exception as e:
+        log_error("Leak hold rescore failed", error=e)
+        raise
+
 @celery_app.task(name='tasks.update_analytics')
 def update_analytics():
     """Update analytics and metrics"""
-    from database import db
-    from cache import cache
-    from logging_config import log_info, log_error
-    
     try:
         log_info("Updating analytics")
         
@@ -110,29 +451,125 @@ def update_analytics():
         log_error("Analytics update failed", error=e)
         raise
 
+def _publish_result(job_id: str, result: Dict, done: int, total: int) -> None:
+    scan_jobs.publish(job_id, "result", {"part": "gmail", "done": done, "total": total, "subscription": result})
+
+def _publish_progress(job_id: str, part: str, attempt: int, stats: Dict) -> None:
+    scan_jobs.publish(job_id, "progress", {"part": part, "attempt": attempt, **stats})
+
 @celery_app.task(name='tasks.scan_user_gmail')
-def scan_user_gmail(user_id: str):
-    """Scan Gmail for a specific user"""
-    from logging_config import log_info, log_error, LogContext
-    
-    with LogContext("scan_user_gmail", user_id=user_id):
+def scan_user_gmail(user_id: str, job_id: Optional[str] = None, full_mailbox: bool = False):
+    """
+    Scan Gmail for a specific user; with a job_id, results stream to the job as
+    they're analyzed. full_mailbox (the nightly scan) reads up to 500 messages
+    through the analysis pipeline instead of the latest 20.
+    """
+    with LogContext("scan_user_gmail", user_id=user_id, job_id=job_id):
+        on_result = partial(_publish_result, job_id) if job_id else None
+        if job_id:
+            scan_jobs.start_part(job_id, "gmail")
+
         try:
-            # Gmail scanning logic here
-            return {"status": "success", "subscriptions_found": 0}
+            user = run_async(db.get_user(user_id)) or {}
+            token = (user.get('metadata') or {}).get('gmail_token')
+            if not token:
+                log_info("Gmail not linked - skipping scan", user_id=user_id)
+                if job_id:
+                    scan_jobs.finish_part(job_id, "gmail", "skipped", subscriptions_found=0)
+                return {"status": "skipped", "subscriptions_found": 0}
+            
+            # Already-analyzed messages come from the parse cache, so retries are cheap
+            creds = credentials_from_token(token)
+            if full_mailbox:
+                found = scan_mailbox_parallel(creds, analysis_pipeline, on_result=on_result)
+            else:
+                found = scan_mailbox(build_gmail_service(creds), on_result=on_result)
+            cache.cache_user_subscriptions(user_id, found, ttl=SCAN_RESULTS_TTL)
+            
+            if job_id:
+                scan_jobs.finish_part(job_id, "gmail", subscriptions_found=len(found))
+            return {"status": "success", "subscriptions_found": len(found)}
         except Exception as e:
             log_error("User Gmail scan failed", error=e, user_id=user_id)
+            if job_id:
+                scan_jobs.finish_part(job_id, "gmail", FAILED, error="Gmail scan failed")
             raise
 
+@celery_app.task(name='tasks.sync_plaid_item', bind=True, max_retries=3)
+def sync_plaid_item(self, item_id: str, job_id: Optional[str] = None):
+    """Pull a bank item's transaction changes since its last sync cursor; progress goes to job_id if given"""
+    part = f"bank:{item_id}"
+    with LogContext("sync_plaid_item", item_id=item_id, job_id=job_id):
+        # A retry restarts from page 1 with fresh counts; the attempt tag tells
+        # clients to replace the part's progress rather than add to it
+        on_page = partial(_publish_progress, job_id, part, self.request.retries + 1) if job_id else None
+        if job_id and not self.request.retries:
+            scan_jobs.start_part(job_id, part)
+
+        try:
+            item = run_async(db.get_plaid_item(item_id))
+            if not item:
+                log_info("Plaid item not found - skipping sync", item_id=item_id)
+                if job_id:
+                    scan_jobs.finish_part(job_id, part, "skipped")
+                return {"status": "skipped"}
+            
+            stats = run_async(plaid_sync.sync_item(item, on_page=on_page))
+            # New bank history invalidates the user's recurring-charge candidates
+            if stats["added"] or stats["modified"] or stats["removed"]:
+                cache.delete(f"recurring:{item['user_id']}")
+            if job_id:
+                scan_jobs.finish_part(job_id, part, **stats)
+            return {"status": "success", **stats}
+        except Exception as e:
+            log_error("Plaid sync failed", error=e, item_id=item_id)
+            # A job waits through retries; only the final failure closes its part
+            if job_id and self.request.retries >= self.max_retries:
+                scan_jobs.finish_part(job_id, part, FAILED, error="Bank sync failed")
+            # The cursor was not advanced, so a retry resumes where this run started
+            raise self.retry(exc=e, countdown=60 * (self.request.retries + 1))
+
+@celery_app.task(name='tasks.sync_all_plaid_items')
+def sync_all_plaid_items():
+    """Enqueue an incremental sync for every linked bank item"""
+    try:
+        enqueued = 0
+        offset = 0
+        while True:
+            items = run_async(db.get_plaid_items(limit=PLAID_ITEMS_PAGE_SIZE, offset=offset))
+            if not items:
+                break
+            for item in items:
+                sync_plaid_item.delay(item['item_id'])
+            enqueued += len(items)
+            offset += PLAID_ITEMS_PAGE_SIZE
+        
+        log_info("Plaid syncs enqueued", items=enqueued)
+        return {"status": "success", "items": enqueued}
+    except Exception as e:
+        log_error("Plaid sync sweep failed", error=e)
+        raise
+
+def _charge_posted(subscription_id: str, timestamp: int) -> None:
+    """A renewal charged to the subscription's card: its next charge is one cycle on"""
+    sub = run_async(db.get_subscription(subscription_id))
+    if not sub or sub.get('status', 'active') != 'active':
+        return
+    charged_on = datetime.datetime.utcfromtimestamp(timestamp).date()
+    current = sub.get('next_charge_date')
+    anchor = datetime.date.fromisoformat(current[:10]) if current else charged_on
+    updates = _charge_date_updates(sub, anchor, charged_on + datetime.timedelta(days=1))
+    if updates:
+        run_async(db.update_subscription(subscription_id, updates))
+        log_info("Next charge date rolled forward", subscription_id=subscription_id, **updates)
+
 @celery_app.task(name='tasks.process_webhook')
 def process_webhook(event_type: str, payload: dict):
     """Process webhooks from Lithic asynchronously"""
-    from database import db
-    from logging_config import log_info, log_error
-    
     try:
         log_info("Processing webhook", event_type=event_type)
         
-        if event_type == "transaction.created":
+        if event_type in ("transaction.created", "transaction.updated"):
             # Save transaction to database
             card_id = payload.get('card_token')
             amount = payload.get('amount', 0) / 100
@@ -141,6 +578,15 @@ def process_webhook(event_type: str, payload: dict):
             
             # This would save to database
             log_info("Transaction processed", card_id=card_id, amount=amount)
+            
+            event = event_from_lithic(payload)
+            card = run_async(db.get_virtual_card(card_id)) if event else None
+            if card:
+                leaks = leak_detector.ingest(card['user_id'], event)
+                if leaks:
+                    log_info("Card leaks detected", card_id=card_id, leaks=len(leaks), top_risk=leaks[0]['risk'])
+                if event['status'] == SETTLED and card.get('subscription_id'):
+                    _charge_posted(card['subscription_id'], event['timestamp'])
         
         elif event_type == "card.state_changed":
             # Update card status
@@ -156,5 +602,10 @@ def process_webhook(event_type: str, payload: dict):
 
 if __name__ == '__main__':
     # Run worker: celery -A tasks worker --loglevel=info
+    # scan_all_users fans out one scan_user_gmail per user. Prefork children
+    # analyze each mailbox on one core (they can't start the analysis pool), so
+    # keep --concurrency at the core count; a solo worker spreads each mailbox
+    # over every core instead:
+    #   celery -A tasks worker --pool=solo --loglevel=info
     # Run beat: celery -A tasks beat --loglevel=info
     celery_app.start()
@@ -0,0 +1,35 @@
+"""Vendor resolution for names (exact keywords) and card descriptors (keywords, then fuzzy)."""
+import pytest
+
+from signatures import detect_subscription_metadata, resolve_name, resolve_vendor
+
+
+@pytest.mark.parametrize("descriptor, vendor", [
+    ("NETFLIX.COM 866-579-7172 CA", "Netflix"),
+    ("NETFLX P1A2B3", "Netflix"),
+    ("PAYPAL *SPOTIFYUSA 4029357733", "Spotify"),
+    ("SQUARESPAC*AB12CD", "Squarespace"),
+    ("HEADSPCE X1Y2Z3 CA", "Headspace"),
+    ("MICROSOFT*365 AB12CD", "Microsoft 365"),
+])
+def test_descriptors_resolve_to_their_vendor(descriptor, vendor):
+    assert resolve_vendor(descriptor) == vendor
+
+
+@pytest.mark.parametrize("text", ["Google", "Google Play", "Microsoft", "Deez Nuts"])
+def test_partial_vendor_names_do_not_match(text):
+    # A prefix of 'Google One', 'Microsoft 365' or 'Deezer' is a different product (or none)
+    assert resolve_name(text) is None
+    assert resolve_vendor(text) is None
+    assert resolve_vendor(text.upper()) is None
+
+
+@pytest.mark.parametrize("name", ["Google", "Google Play", "Microsoft", "Deez Nuts"])
+def test_unknown_names_keep_their_own_metadata(name):
+    assert detect_subscription_metadata(name) == (name, {"category": "Other", "cancel_url": None})
+
+
+def test_names_match_exact_keywords_only():
+    assert resolve_name("Spotify Family") == "Spotify"
+    assert resolve_name("Netflx") is None
+    assert resolve_vendor("NETFLX") == "Netflix"
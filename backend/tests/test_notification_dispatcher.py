@@ -0,0 +1,181 @@
+"""NotificationDispatcher against FakePushProvider, with rate limits on per-process buckets."""
+import httpx
+import pytest
+
+from cache import CacheService
+from metrics import PUSH_MESSAGES_TOTAL
+from notification_dispatcher import (
+    FakePushProvider, HttpPushProvider, NotificationDispatcher, PushProvider, UserRateLimiter
+)
+from notification_service import Notification, NotificationPriority, NotificationService, NotificationType
+from token_bucket import TokenBucketLimiter
+
+
+def offline_limiter(limit: str = "3/hour") -> UserRateLimiter:
+    """Redis explicitly off, so buckets live in this process"""
+    offline = CacheService()
+    offline.enabled = False
+    return UserRateLimiter(limit, TokenBucketLimiter(cache_service=offline))
+
+
+def notification(user_id, title="Trial ends soon", priority=NotificationPriority.MEDIUM, sub="sub-1"):
+    return Notification(
+        notification_type=NotificationType.TRIAL_ENDING_SOON,
+        title=title,
+        message=f"{title} for {sub}",
+        subscription_id=sub,
+        subscription_name=sub,
+        priority=priority,
+        user_id=user_id,
+    )
+
+
+@pytest.fixture
+def sleeps():
+    return []
+
+
+def make_dispatcher(provider, sleeps, limiter=None, **kwargs):
+    return NotificationDispatcher(
+        provider, rate_limiter=limiter or offline_limiter(), sleep=sleeps.append, **kwargs
+    )
+
+
+def test_coalesces_one_push_per_user_with_most_important_alert_first(sleeps):
+    provider = FakePushProvider()
+    dispatcher = make_dispatcher(provider, sleeps)
+
+    stats = dispatcher.dispatch([
+        notification("u1", "Renewal coming up", NotificationPriority.LOW, sub="a"),
+        notification("u2", "Price increase", NotificationPriority.MEDIUM),
+        notification("u1", "Trial ends today", NotificationPriority.URGENT, sub="b"),
+        notification(None, "No recipient"),
+    ])
+
+    assert stats == {"notifications": 4, "pushes": 2, "sent": 2, "failed": 0, "rate_limited": 0}
+    by_user = {p["user_id"]: p for p in provider.sent}
+    assert by_user["u1"]["title"] == "2 subscription alerts"
+    assert by_user["u1"]["message"] == "Trial ends today (+1 more)"
+    assert by_user["u1"]["priority"] == "urgent"
+    assert [n["subscription_id"] for n in by_user["u1"]["notifications"]] == ["b", "a"]
+    assert by_user["u2"]["title"] == "Price increase"
+
+
+def test_sends_in_batches(sleeps):
+    provider = FakePushProvider()
+    dispatcher = make_dispatcher(provider, sleeps, batch_size=2)
+
+    stats = dispatcher.dispatch([notification(f"u{i}") for i in range(5)])
+
+    assert stats["sent"] == 5
+    assert provider.batches == [2, 2, 1]
+    assert sleeps == []
+
+
+def test_retries_failed_pushes_with_backoff(sleeps):
+    provider = FakePushProvider(fail_user_ids=["u2"], fail_times=2)
+    dispatcher = make_dispatcher(provider, sleeps, backoff_base=0.5)
+
+    stats = dispatcher.dispatch([notification("u1"), notification("u2")])
+
+    assert stats["sent"] == 2 and stats["failed"] == 0
+    # u1 goes out once; only u2 is resent
+    assert provider.batches == [2, 1, 1]
+    assert sleeps == [0.5, 1.0]
+
+
+def test_gives_up_after_max_retries(sleeps):
+    provider = FakePushProvider(fail_user_ids=["u1"], fail_times=10)
+    dispatcher = make_dispatcher(provider, sleeps, max_retries=2)
+
+    stats = dispatcher.dispatch([notification("u1")])
+
+    assert stats["sent"] == 0 and stats["failed"] == 1
+    assert provider.batches == [1, 1, 1]
+    assert provider.sent == []
+
+
+def test_rate_limit_is_shared_across_dispatchers(sleeps):
+    # tasks build a new dispatcher per run; the budget must outlive each one
+    limiter = offline_limiter("2/hour")
+    provider = FakePushProvider()
+
+    results = [
+        make_dispatcher(provider, sleeps, limiter=limiter).dispatch([notification("u1")])
+        for _ in range(3)
+    ]
+
+    assert [r["sent"] for r in results] == [1, 1, 0]
+    assert results[2]["rate_limited"] == 1
+    assert len(provider.sent) == 2
+
+
+def test_undelivered_pushes_do_not_spend_the_budget(sleeps):
+    limiter = offline_limiter("1/hour")
+    failing = FakePushProvider(fail_user_ids=["u1"], fail_times=10)
+    assert make_dispatcher(failing, sleeps, limiter=limiter, max_retries=1).dispatch([notification("u1")])["failed"] == 1
+
+    provider = FakePushProvider()
+    stats = make_dispatcher(provider, sleeps, limiter=limiter).dispatch([notification("u1")])
+
+    assert stats["sent"] == 1 and stats["rate_limited"] == 0
+
+
+def test_provider_errors_refund_reserved_pushes(sleeps):
+    class BrokenProvider(FakePushProvider):
+        def send_batch(self, payloads):
+            raise RuntimeError("gateway exploded")
+
+    limiter = offline_limiter("1/hour")
+    with pytest.raises(RuntimeError):
+        make_dispatcher(BrokenProvider(), sleeps, limiter=limiter).dispatch([notification("u1")])
+
+    stats = make_dispatcher(FakePushProvider(), sleeps, limiter=limiter).dispatch([notification("u1")])
+    assert stats["sent"] == 1
+
+
+def test_drain_empties_the_service_queue(sleeps):
+    service = NotificationService()
+    service.notifications_queue = [notification("u1"), notification("u2")]
+    provider = FakePushProvider()
+
+    stats = make_dispatcher(provider, sleeps).drain(service)
+
+    assert stats["sent"] == 2
+    assert service.notifications_queue == []
+
+
+def test_on_sent_reports_only_delivered_users(sleeps):
+    provider = FakePushProvider(fail_user_ids=["u2"], fail_times=10)
+    delivered = []
+
+    make_dispatcher(provider, sleeps, max_retries=1).dispatch(
+        [notification("u1"), notification("u2")], on_sent=delivered.append
+    )
+
+    assert delivered == ["u1"]
+
+
+def test_rate_limited_pushes_are_counted(sleeps):
+    before = PUSH_MESSAGES_TOTAL.value(outcome="rate_limited")
+    limiter = offline_limiter("1/hour")
+    dispatcher = make_dispatcher(FakePushProvider(), sleeps, limiter=limiter)
+
+    dispatcher.dispatch([notification("u1")])
+    stats = dispatcher.dispatch([notification("u1")])
+
+    assert stats["rate_limited"] == 1
+    assert PUSH_MESSAGES_TOTAL.value(outcome="rate_limited") == before + 1
+
+
+def test_push_provider_is_abstract():
+    with pytest.raises(TypeError):
+        PushProvider()
+
+
+@pytest.mark.parametrize("body", [b"OK", b"[]"])
+def test_http_provider_retries_unreadable_success_bodies(body):
+    provider = HttpPushProvider("http://push.test/send")
+    provider.client = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body)))
+
+    assert provider.send_batch([{"user_id": "u1"}, {"user_id": "u2"}]) == ["u1", "u2"]
@@ -0,0 +1,25 @@
+"""Rolling next charge dates forward by billing cycle."""
+from datetime import date
+
+import pytest
+
+from renewal_calendar import billing_cycle, roll_forward
+
+
+@pytest.mark.parametrize("charge_date, cycle, not_before, expected", [
+    (date(2026, 10, 20), "monthly", date(2026, 10, 19), date(2026, 10, 20)),
+    (date(2026, 10, 16), "monthly", date(2026, 10, 19), date(2026, 11, 16)),
+    (date(2026, 1, 31), "monthly", date(2026, 2, 1), date(2026, 2, 28)),
+    (date(2026, 6, 5), "monthly", date(2026, 10, 19), date(2026, 11, 5)),
+    (date(2026, 10, 1), "weekly", date(2026, 10, 19), date(2026, 10, 22)),
+    (date(2026, 7, 10), "quarterly", date(2026, 10, 11), date(2027, 1, 10)),
+    (date(2025, 3, 15), "annual", date(2026, 10, 19), date(2027, 3, 15)),
+])
+def test_roll_forward(charge_date, cycle, not_before, expected):
+    assert roll_forward(charge_date, cycle, not_before) == expected
+
+
+def test_billing_cycle_reads_row_then_metadata():
+    assert billing_cycle({"billing_cycle": "Annual"}) == "annual"
+    assert billing_cycle({"metadata": {"period": "weekly"}}) == "weekly"
+    assert billing_cycle({}) == "monthly"
@@ -0,0 +1,20 @@
+"""Optimization tips: vendor rules, then keyword rules, then generic ones."""
+import pytest
+
+from signatures import NO_TIP, get_optimization_tip
+
+
+@pytest.mark.parametrize("name, price, tip", [
+    ("Spotify Family", 10.0, "Get the Student or Duo plan"),
+    ("Gym Pass", 30.0, "Try Pay-as-you-go instead"),
+    # Known vendor without tips of its own: keyword rules still apply
+    ("Peloton fitness", 40.0, "Try Pay-as-you-go instead"),
+    ("Local gym", 20.0, "Try Pay-as-you-go instead"),
+    ("Unknown Co", 80.0, "Review annual billing options"),
+])
+def test_tip_for_name(name, price, tip):
+    assert get_optimization_tip(name, price)[0] == tip
+
+
+def test_known_vendor_without_rules_gets_no_tip():
+    assert get_optimization_tip("Peloton", 40.0) == NO_TIP
@@ -0,0 +1,153 @@
+"""
+Token buckets for rate limiting, shared across processes through Redis.
+One atomic Lua script per check keeps the bucket in Redis, so every uvicorn
+worker, Celery worker and node draws from the same bucket with a single round
+trip. Falls back to per-process buckets while Redis is unavailable.
+No FastAPI here: the Celery worker uses this too (see rate_limit for the API side).
+"""
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Tuple
+
+from cache import cache, CacheService
+from request_timing import track
+
+# KEYS[1] = bucket; ARGV = capacity, refill tokens/sec, cost.
+# Redis TIME keeps every node on the same clock.
+TOKEN_BUCKET_LUA = """
+redis.replicate_commands()  -- allow writes after TIME on Redis < 5
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    -- A negative cost refunds tokens, never past capacity
+    tokens = math.min(capacity, tokens - cost)
+    allowed = 1
+else
+    retry_after = math.ceil((cost - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return {allowed, tostring(tokens), retry_after}
+"""
+
+PERIOD_SECONDS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+RATE_RE = re.compile(r'^\s*(\d+)\s*(?:/|per)\s*(second|minute|hour|day)s?\s*$', re.IGNORECASE)
+
+
+@lru_cache(maxsize=64)
+def parse_rate(limit: str) -> Tuple[int, float]:
+    """'5/minute' -> (capacity 5, refill 5/60 tokens per second)"""
+    match = RATE_RE.match(limit)
+    if not match:
+        raise ValueError(f"Invalid rate limit: {limit!r}")
+    capacity = int(match.group(1))
+    return capacity, capacity / PERIOD_SECONDS[match.group(2).lower()]
+
+
+class RateLimitResult:
+    __slots__ = ('allowed', 'remaining', 'retry_after', 'limit')
+
+    def __init__(self, allowed: bool, remaining: int, retry_after: float, limit: int):
+        self.allowed = allowed
+        self.remaining = remaining
+        self.retry_after = retry_after
+        self.limit = limit
+
+    def headers(self) -> dict:
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by caller, shared across processes through Redis"""
+
+    def __init__(
+        self,
+        cache_service: CacheService = cache,
+        prefix: str = "ratelimit",
+        enabled: bool = True,
+        local_size: int = 10000
+    ):
+        self.cache = cache_service
+        self.prefix = prefix
+        self.enabled = enabled
+        self.local_size = local_size
+        self._script = None
+        self._script_client = None
+        # Fallback buckets: key -> [tokens, last refill (monotonic seconds)]
+        self._local: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bucket_script(self, client):
+        # register_script() uses EVALSHA and reloads the script on NOSCRIPT
+        if self._script is None or self._script_client is not client:
+            self._script = client.register_script(TOKEN_BUCKET_LUA)
+            self._script_client = client
+        return self._script
+
+    def hit(self, key: str, limit: str, cost: int = 1) -> RateLimitResult:
+        """Take `cost` tokens from the bucket for `key` under `limit` (e.g. '5/minute')"""
+        capacity, rate = parse_rate(limit)
+        if not self.enabled:
+            return RateLimitResult(True, capacity, 0.0, capacity)
+
+        client = self.cache.client
+        if client is not None:
+            try:
+                with track("redis"):
+                    allowed, tokens, retry_ms = self._bucket_script(client)(
+                        keys=[f"{self.prefix}:{key}"], args=[capacity, rate, cost]
+                    )
+                return RateLimitResult(bool(allowed), int(float(tokens)), retry_ms / 1000, capacity)
+            except Exception as e:
+                print(f"Rate limit error: {e}")
+
+        return self._hit_local(key, capacity, rate, cost)
+
+    def refund(self, key: str, limit: str, cost: int = 1) -> None:
+        """Give back tokens taken by hit() for an action that didn't happen"""
+        self.hit(key, limit, -cost)
+
+    def _hit_local(self, key: str, capacity: int, rate: float, cost: int) -> RateLimitResult:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._local.get(key)
+            if bucket is None:
+                bucket = [float(capacity), now]
+                self._local[key] = bucket
+                if len(self._local) > self.local_size:
+                    self._local.popitem(last=False)
+            else:
+                self._local.move_to_end(key)
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+
+            if bucket[0] >= cost:
+                bucket[0] = min(capacity, bucket[0] - cost)
+                return RateLimitResult(True, int(bucket[0]), 0.0, capacity)
+            return RateLimitResult(False, int(bucket[0]), (cost - bucket[0]) / rate, capacity)
@@ -0,0 +1,43 @@
+"""
+Encryption at rest for provider credentials (Plaid access tokens).
+Fernet (AES-128-CBC + HMAC-SHA256) with keys from PLAID_TOKEN_KEYS: a
+comma-separated list, newest first, so a key can be rotated in while rows
+encrypted under the old one still decrypt.
+Generate a key with:  python -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"
+"""
+import os
+import threading
+from typing import Optional
+
+from cryptography.fernet import Fernet, MultiFernet
+
+
+class TokenCipher:
+    """Encrypts and decrypts stored tokens; keys are read from the environment on first use"""
+
+    def __init__(self, env_var: str = "PLAID_TOKEN_KEYS"):
+        self.env_var = env_var
+        self._fernet: Optional[MultiFernet] = None
+        self._lock = threading.Lock()
+
+    @property
+    def fernet(self) -> MultiFernet:
+        if self._fernet is None:
+            with self._lock:
+                if self._fernet is None:
+                    keys = [k.strip() for k in os.getenv(self.env_var, "").split(",") if k.strip()]
+                    if not keys:
+                        # Never fall back to storing credentials in plaintext
+                        raise RuntimeError(f"{self.env_var} is not configured")
+                    self._fernet = MultiFernet([Fernet(k) for k in keys])
+        return self._fernet
+
+    def encrypt(self, token: str) -> str:
+        return self.fernet.encrypt(token.encode()).decode()
+
+    def decrypt(self, ciphertext: str) -> str:
+        return self.fernet.decrypt(ciphertext.encode()).decode()
+
+
+# Global instance
+token_cipher = TokenCipher()
@@ -1,5 +1,7 @@
 import 'package:flutter/material.dart';
 import 'package:google_fonts/google_fonts.dart';
+import 'package:firebase_auth/firebase_auth.dart';
+import 'package:firebase_core/firebase_core.dart';
 import '../theme/app_theme.dart';
 import '../services/api_service.dart';
 import '../services/brand_service.dart';
@@ -55,7 +57,10 @@ class _ScannerScreenState extends State<ScannerScreen>
     });
 
     // Actual Backend Call
-    final leaks = await _apiService.getGlobalLeaks();
+    final userId = Firebase.apps.isNotEmpty
+        ? FirebaseAuth.instance.currentUser?.uid
+        : null;
+    final leaks = await _apiService.getGlobalLeaks(userId: userId);
 
     _controller.addStatusListener((status) {
       if (status == AnimationStatus.completed) {
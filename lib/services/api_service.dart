@@ -1,5 +1,7 @@
+import 'dart:async';
 import 'dart:convert';
 import 'dart:io';
+import 'dart:math';
 import 'package:flutter/foundation.dart';
 import 'package:http/http.dart' as http;
 import '../models/subscription.dart';
@@ -17,10 +19,48 @@ class ApiService {
     return _iosBaseUrl;
   }
 
-  Future<ScanResult> scanGmail() async {
+  /// Random key for one user action, sent as Idempotency-Key on every retry.
+  static String newIdempotencyKey() {
+    final random = Random.secure();
+    return List.generate(
+      16,
+      (_) => random.nextInt(256).toRadixString(16).padLeft(2, '0'),
+    ).join();
+  }
+
+  /// POST for actions that must run once: retries on network errors,
+  /// timeouts and 409 (first attempt still running) reuse one
+  /// Idempotency-Key, so the server replays instead of repeating the action.
+  Future<http.Response> _idempotentPost(
+    Uri url, {
+    Map<String, String>? headers,
+    Object? body,
+    Duration timeout = const Duration(seconds: 10),
+    int retries = 2,
+  }) async {
+    final allHeaders = {...?headers, 'Idempotency-Key': newIdempotencyKey()};
+    for (var attempt = 0;; attempt++) {
+      try {
+        final response =
+            await http.post(url, headers: allHeaders, body: body).timeout(timeout);
+        if (response.statusCode != 409 || attempt >= retries) return response;
+      } on SocketException {
+        if (attempt >= retries) rethrow;
+      } on TimeoutException {
+        if (attempt >= retries) rethrow;
+      }
+      await Future.delayed(Duration(milliseconds: 500 * (attempt + 1)));
+    }
+  }
+
+  /// [fields] limits each subscription to those keys (plus id) for list
+  /// views; missing keys fall back to the model defaults.
+  Future<ScanResult> scanGmail({List<String>? fields}) async {
     try {
       final response = await http
-          .get(Uri.parse('$baseUrl/scan'))
+          .get(Uri.parse('$baseUrl/scan').replace(
+            queryParameters: fields != null ? {'fields': fields.join(',')} : null,
+          ))
           .timeout(const Duration(seconds: 3));
 
       if (response.statusCode == 200) {
@@ -32,10 +72,12 @@ class ApiService {
     }
   }
 
-  Future<List<Map<String, dynamic>>> getGlobalLeaks() async {
+  Future<List<Map<String, dynamic>>> getGlobalLeaks({String? userId}) async {
     try {
       final response = await http
-          .get(Uri.parse('$baseUrl/global-scan'))
+          .get(Uri.parse('$baseUrl/global-scan').replace(
+            queryParameters: userId != null ? {'user_id': userId} : null,
+          ))
           .timeout(const Duration(seconds: 5));
       if (response.statusCode == 200) {
         return List<Map<String, dynamic>>.from(jsonDecode(response.body));
@@ -85,9 +127,10 @@ class ApiService {
 
   Future<bool> killSubscription(String id) async {
     try {
-      final response = await http
-          .post(Uri.parse('$baseUrl/kill-subscription/$id'))
-          .timeout(const Duration(seconds: 5));
+      final response = await _idempotentPost(
+        Uri.parse('$baseUrl/kill-subscription/$id'),
+        timeout: const Duration(seconds: 5),
+      );
       return response.statusCode == 200;
     } catch (e) {
       debugPrint("Kill Error (Fallback to Success for Demo): $e");
@@ -95,11 +138,91 @@ class ApiService {
     }
   }
 
+  // --- SCAN JOBS ---
+  /// Starts a background Gmail + bank scan; returns the job ID.
+  Future<String?> startScanJob({required String userId}) async {
+    try {
+      final response = await http
+          .post(
+            Uri.parse('$baseUrl/scan/jobs'),
+            headers: {'Content-Type': 'application/json'},
+            body: jsonEncode({'user_id': userId}),
+          )
+          .timeout(const Duration(seconds: 5));
+      if (response.statusCode == 202) {
+        return jsonDecode(response.body)['job_id'];
+      }
+    } catch (e) {
+      debugPrint("Scan Job Error: $e");
+    }
+    return null;
+  }
+
+  /// Server-Sent Events for a scan job as {'event': ..., 'data': {...}} maps:
+  /// 'result' carries each subscription as it's found; the stream ends
+  /// after 'complete'. The server closes long streams, and connections
+  /// drop: both reconnect with Last-Event-ID so no event is repeated or
+  /// missed. Gives up after [maxRetries] failed connections in a row.
+  Stream<Map<String, dynamic>> scanJobEvents(
+    String jobId, {
+    int maxRetries = 5,
+  }) async* {
+    final url = Uri.parse('$baseUrl/scan/jobs/$jobId/events');
+    String? lastEventId;
+    var failures = 0;
+    while (true) {
+      final client = http.Client();
+      try {
+        final request = http.Request('GET', url)
+          ..headers['Accept'] = 'text/event-stream';
+        if (lastEventId != null) request.headers['Last-Event-ID'] = lastEventId;
+        final response = await client.send(request);
+        if (response.statusCode == 404) {
+          throw StateError('Scan job $jobId not found or expired');
+        }
+        if (response.statusCode != 200) {
+          throw http.ClientException(
+            'Scan job events failed (${response.statusCode})',
+            url,
+          );
+        }
+        failures = 0;
+        String? id;
+        String? event;
+        await for (final line in response.stream
+            .transform(utf8.decoder)
+            .transform(const LineSplitter())) {
+          if (line.startsWith('id: ')) {
+            id = line.substring(4);
+          } else if (line.startsWith('event: ')) {
+            event = line.substring(7);
+          } else if (line.startsWith('data: ') && event != null) {
+            if (id != null) lastEventId = id;
+            yield {'event': event, 'data': jsonDecode(line.substring(6))};
+            if (event == 'complete') return;
+          } else if (line.isEmpty) {
+            id = null;
+            event = null;
+          }
+        }
+      } on SocketException {
+        if (++failures > maxRetries) rethrow;
+      } on http.ClientException {
+        if (++failures > maxRetries) rethrow;
+      } finally {
+        client.close();
+      }
+      await Future.delayed(Duration(seconds: max(failures, 1)));
+    }
+  }
+
   // --- PLAID ---
-  Future<String?> createPlaidLinkToken() async {
+  Future<String?> createPlaidLinkToken({required String userId}) async {
     try {
       final response = await http.post(
         Uri.parse('$baseUrl/api/v1/plaid/create-link-token'),
+        headers: {'Content-Type': 'application/json'},
+        body: jsonEncode({'user_id': userId}),
       );
       if (response.statusCode == 200) {
         return jsonDecode(response.body)['link_token'];
@@ -133,7 +256,7 @@ class ApiService {
     required String userId,
   }) async {
     try {
-      final response = await http.post(
+      final response = await _idempotentPost(
         Uri.parse('$baseUrl/api/v1/cards/create-virtual'),
         headers: {'Content-Type': 'application/json'},
         body: jsonEncode({